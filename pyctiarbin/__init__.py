@@ -1,4 +1,26 @@
-from .cycler_interface import CyclerInterface
-from .channel_interface import ChannelInterface
-from .messages import Msg
-from .messages import MessageABC
\ No newline at end of file
+import importlib
+
+# Public names and the modules they are defined in. Modules are imported on first access so
+# that `import pyctiarbin` stays fast, e.g. using only the codec does not import the sockets
+# and config validation the interfaces need.
+_LAZY_ATTRIBUTES = {
+    'CyclerInterface': '.cycler_interface',
+    'ChannelInterface': '.channel_interface',
+    'Msg': '.messages',
+    'MessageABC': '.messages',
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,266 @@
+import ast
+import logging
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AlertRule:
+    """
+    A declarative alert rule evaluated against channel readings. The expression is written
+    in terms of the channel status keys, e.g. `aux_temperature[2] > 45`, `status == 'Unsafe'`
+    or `not (2.5 <= voltage_v <= 4.2)`, and is compiled once into a Python function.
+    """
+
+    # Functions that may be called from a rule expression.
+    allowed_functions = {'abs': abs, 'min': min, 'max': max, 'len': len}
+
+    # Syntax that may appear in a rule expression. Anything else is rejected on compile.
+    allowed_nodes = tuple(node for node in (
+        ast.Expression, ast.Compare, ast.BoolOp, ast.UnaryOp, ast.BinOp, ast.Name, ast.Load,
+        ast.Constant, ast.Subscript, ast.Call, ast.Tuple, ast.List, ast.And, ast.Or, ast.Not,
+        ast.USub, ast.UAdd, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.Eq, ast.NotEq,
+        ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+        # Subscripts are wrapped in ast.Index on Python 3.8
+        getattr(ast, 'Index', None)
+    ) if node is not None)
+
+    def __init__(self, name: str, expression: str, for_s: float = 0.0, clear_expression: str = None, channels: list = None):
+        """
+        Creates and compiles an alert rule.
+
+        Parameters
+        ----------
+        name : str
+            The name of the rule. Reported with every alert.
+        expression : str
+            The condition that raises the alert.
+        for_s : *optional* : float
+            How long the condition must hold before the alert fires. Defaults to 0 seconds.
+        clear_expression : *optional* : str
+            The condition that clears a firing alert. Using a different threshold than the
+            raising condition adds hysteresis. Defaults to the raising condition no longer holding.
+        channels : *optional* : list
+            The channels the rule applies to, as reported in the channel readings. Defaults to all channels.
+        """
+        self.name = name
+        self.expression = expression
+        self.for_s = for_s
+        self.clear_expression = clear_expression
+        self.channels = set(channels) if channels is not None else None
+
+        self.predicate = self.compile_expression(expression)
+        self.clear_predicate = self.compile_expression(
+            clear_expression) if clear_expression else None
+
+    @classmethod
+    def compile_expression(cls, expression: str):
+        """
+        Compiles a rule expression into a function that takes a channel status dictionary.
+
+        Parameters
+        ----------
+        expression : str
+            The rule expression.
+
+        Returns
+        -------
+        predicate : function
+            The compiled expression.
+        """
+        try:
+            tree = ast.parse(expression, mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f'Invalid alert rule expression {expression}!') from e
+
+        for node in ast.walk(tree):
+            if not isinstance(node, cls.allowed_nodes):
+                raise ValueError(
+                    f'{type(node).__name__} is not allowed in alert rule expression {expression}!')
+            if isinstance(node, ast.Call) and \
+                    not (isinstance(node.func, ast.Name) and node.func.id in cls.allowed_functions):
+                raise ValueError(
+                    f'Only {list(cls.allowed_functions)} can be called in alert rule expression {expression}!')
+
+        # Turn every reading name into a lookup on the reading dictionary and wrap the
+        # expression in a lambda so it is evaluated as a plain function call.
+        body = ReadingNameTransformer(
+            set(cls.allowed_functions)).visit(tree.body)
+        func_tree = ast.Expression(body=ast.Lambda(
+            args=ast.arguments(posonlyargs=[], args=[ast.arg(arg=ReadingNameTransformer.reading_arg)],
+                               kwonlyargs=[], kw_defaults=[], defaults=[]),
+            body=body))
+        ast.fix_missing_locations(func_tree)
+        code = compile(func_tree, filename=f'<alert rule {expression}>', mode='eval')
+        return eval(code, {'__builtins__': {}, **cls.allowed_functions})
+
+
+class ReadingNameTransformer(ast.NodeTransformer):
+    """
+    Rewrites names in a rule expression into lookups on the reading dictionary.
+    """
+    reading_arg = '_reading'
+
+    def __init__(self, function_names: set):
+        self.__function_names = function_names
+
+    def visit_Name(self, node):
+        if node.id in self.__function_names:
+            return node
+        return ast.copy_location(ast.Subscript(
+            value=ast.Name(id=self.reading_arg, ctx=ast.Load()),
+            slice=self.__index(ast.Constant(value=node.id)),
+            ctx=ast.Load()), node)
+
+    @staticmethod
+    def __index(value):
+        # Python 3.8 wraps subscripts in ast.Index
+        if sys.version_info < (3, 9):
+            return ast.Index(value=value)
+        return value
+
+
+class AlertEngine:
+    """
+    Class for evaluating compiled alert rules on every channel reading. Alerts are
+    deduplicated so callbacks are only called when an alert starts firing and when it resolves.
+    """
+
+    def __init__(self, rules: list = None, callbacks: list = None):
+        """
+        Creates an alert engine.
+
+        Parameters
+        ----------
+        rules : *optional* : list
+            A list of `AlertRule`s to evaluate.
+        callbacks : *optional* : list
+            A list of functions to call with each alert dictionary.
+        """
+        self.__rules = []
+        self.__callbacks = list(callbacks) if callbacks else []
+        # Keyed on (rule name, channel). Holds when the condition started holding and whether the alert is firing.
+        self.__rule_states = {}
+
+        for rule in rules or []:
+            self.add_rule(rule)
+
+    def add_rule(self, rule: AlertRule):
+        """
+        Adds a rule to the engine.
+
+        Parameters
+        ----------
+        rule : AlertRule
+            The rule to add. Rule names must be unique.
+        """
+        if any(existing_rule.name == rule.name for existing_rule in self.__rules):
+            raise ValueError(f'Alert rule {rule.name} already exists!')
+        self.__rules.append(rule)
+
+    def add_callback(self, callback):
+        """
+        Adds a function to be called with each alert dictionary.
+
+        Parameters
+        ----------
+        callback : function
+            The function to call.
+        """
+        self.__callbacks.append(callback)
+
+    def get_active_alerts(self) -> list:
+        """
+        Returns the (rule name, channel) pairs of all currently firing alerts.
+        """
+        return [key for key, (_, firing) in self.__rule_states.items() if firing]
+
+    def evaluate(self, channel_status: dict, timestamp: float = None) -> list:
+        """
+        Evaluates every rule against a channel reading.
+
+        Parameters
+        ----------
+        channel_status : dict
+            A channel status dictionary as returned by `CyclerInterface.read_channel_status()`.
+        timestamp : *optional* : float
+            The time of the reading in seconds. Defaults to `time.monotonic()`.
+
+        Returns
+        -------
+        alerts : list
+            The alerts that started firing or resolved with this reading.
+        """
+        alerts = []
+        if not channel_status:
+            return alerts
+
+        if timestamp is None:
+            timestamp = time.monotonic()
+        channel = channel_status['channel']
+
+        for rule in self.__rules:
+            if rule.channels is not None and channel not in rule.channels:
+                continue
+
+            key = (rule.name, channel)
+            (holding_since, firing) = self.__rule_states.get(key, (None, False))
+
+            if not firing:
+                if self.__check(rule.predicate, channel_status):
+                    if holding_since is None:
+                        holding_since = timestamp
+                    if timestamp - holding_since >= rule.for_s:
+                        firing = True
+                        alerts.append(self.__alert(
+                            rule, channel, 'firing', timestamp, channel_status))
+                else:
+                    holding_since = None
+            else:
+                if rule.clear_predicate is not None:
+                    cleared = self.__check(rule.clear_predicate, channel_status)
+                else:
+                    cleared = not self.__check(rule.predicate, channel_status)
+                if cleared:
+                    holding_since = None
+                    firing = False
+                    alerts.append(self.__alert(
+                        rule, channel, 'resolved', timestamp, channel_status))
+
+            self.__rule_states[key] = (holding_since, firing)
+
+        for alert in alerts:
+            for callback in self.__callbacks:
+                try:
+                    callback(alert)
+                except Exception:
+                    logger.error(
+                        f'Error in alert callback for rule {alert["rule"]}', exc_info=True)
+
+        return alerts
+
+    @staticmethod
+    def __check(predicate, channel_status: dict) -> bool:
+        """
+        Evaluates a compiled predicate. Readings that are missing a referenced key or aux
+        index do not satisfy the predicate.
+        """
+        try:
+            return bool(predicate(channel_status))
+        except (KeyError, IndexError, TypeError):
+            return False
+
+    @staticmethod
+    def __alert(rule: AlertRule, channel: int, state: str, timestamp: float, channel_status: dict) -> dict:
+        """
+        Builds the alert dictionary passed to callbacks.
+        """
+        return {
+            'rule': rule.name,
+            'expression': rule.expression,
+            'channel': channel,
+            'state': state,
+            'timestamp': timestamp,
+            'reading': channel_status,
+        }
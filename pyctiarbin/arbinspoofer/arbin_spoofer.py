@@ -1,96 +1,33 @@
+import json
+import logging
 import socket
 import threading
-import struct
-import copy
-from pyctiarbin.messages import Msg, MessageABC
+from .channel_data import ChannelData
+from .replay import ReplayChannelData
+from .msg_handler import ClientMsgHandler
+from .event_server import SelectorServer
+from .simulation import CellSimulation
+from .faults import FaultInjector
+from .channel_state import ChannelStateMachine
+from .metrics import SpooferMetrics
+from pyctiarbin.http_text_server import TextHTTPServer
 
-
-class ChannelData:
-
-    __chan_readings_list = []
-    __chan_readings_lock = threading.Lock()
-
-    def __init__(self, num_channels):
-        """
-        Container class that will hold all of the specific channel data for ArbinSpoofer.
-
-        Parameters
-        ----------
-            num_channels : int
-                Number of channels in our hypothetical Arbin cycler.
-        """
-        self.num_channels = num_channels
-
-        # Create channel_readings for all of the channels.
-        for i in range(0, self.num_channels):
-            channel_readings = {}
-            for key, item in Msg.ChannelInfo.Server.msg_specific_template.items():
-                channel_readings[key] = copy.deepcopy(item['value'])
-            channel_readings['channel'] = i
-            with self.__chan_readings_lock:
-                self.__chan_readings_list.append(
-                    copy.deepcopy(channel_readings))
-
-    def fetch_channel_readings(self, channel) -> dict:
-        """
-        Returns the status message for a specified channel.
-
-        Parameters
-        ----------
-        channel : int
-            The channel to return the status for.
-
-        Returns
-        -------
-        status : dict
-            The status message for the requested channel. Empty if channel larger than number of channel
-        """
-        if channel > self.num_channels:
-            return {}
-        else:
-            with self.__chan_readings_lock:
-                return copy.deepcopy(self.__chan_readings_list[channel])
-
-    def update_channel_readings(self, channel, updated_readings):
-        """
-        Updates the stored channel readings for the specified channel.
-
-        Parameters
-        ----------
-        channel : int
-            The channel to update the readings for.
-        updated_status : dict
-            Complete or partial dictionary of status values to update.
-
-        Returns
-        -------
-        success : bool
-            Returns True if all values in the updated_status were used to update the channel_status_array.
-        """
-        if channel > self.num_channels:
-            return False
-        else:
-            for key in updated_readings.keys():
-                if key not in Msg.ChannelInfo.Server.msg_specific_template.keys():
-                    return False
-
-            with self.__chan_readings_lock:
-                for key in updated_readings.keys():
-                    self.__chan_readings_list[channel][key] = updated_readings[key]
+logger = logging.getLogger(__name__)
 
 
 class SocketWorker:
     """
-    Generic worker class that will respond to client socket requests.
-    Default setup as an echo server. Child classes should overwrite the
-    the `_process_client_msg()` method with their own responses.
+    Worker class that will respond to client socket requests from its own thread.
+    Responses are generated by the spoofer's `ClientMsgHandler` and sent through the
+    spoofer's `FaultInjector`, if it has one.
     """
     __receive_msg_timeout_s = 0.5
     __msg_buffer_size_bytes = 2**12
     __stop_lock = threading.Lock()
     __stop = False
 
-    def __init__(self, s: socket.socket, channel_data: ChannelData):
+    def __init__(self, s: socket.socket, msg_handler: ClientMsgHandler, fault_injector: FaultInjector = None,
+                 metrics: SpooferMetrics = None):
         """
         Creates the thread to service client requests.
 
@@ -98,8 +35,18 @@ class SocketWorker:
         ----------
         s : socket.socket
             Socket connection to client.
+        msg_handler : ClientMsgHandler
+            Generates the responses to client messages.
+        fault_injector : *optional* : FaultInjector
+            Sends the responses with injected network faults.
+        metrics : *optional* : SpooferMetrics
+            Records the client connection opening and closing.
         """
-        self.__channel_data = channel_data
+        self.__msg_handler = msg_handler
+        self.__fault_injector = fault_injector
+        self.__metrics = metrics
+        if self.__metrics is not None:
+            self.__metrics.connection_opened()
 
         self.stop = False
         self.__client_thread = threading.Thread(
@@ -122,83 +69,40 @@ class SocketWorker:
         """
         s.settimeout(self.__receive_msg_timeout_s)
 
-        rx_msg_length_format = MessageABC.base_template['msg_length']['format']
-        rx_msg_length_start_byte = MessageABC.base_template['msg_length']['start_byte']
-        rx_msg_length_end_byte = MessageABC.base_template['msg_length']['start_byte'] + struct.calcsize(
-            rx_msg_length_format)
-
+        rx_buffer = bytearray()
         while True:
             try:
-                rx_msg = s.recv(self.__msg_buffer_size_bytes)
-                if not rx_msg:
+                rx_chunk = s.recv(self.__msg_buffer_size_bytes)
+                if not rx_chunk:
                     break
-
-                # Keep reading message in pieces until rx_msg is as long as expected_rx_msg_len
-                expected_rx_msg_len = struct.unpack(
-                    rx_msg_length_format, rx_msg[rx_msg_length_start_byte:rx_msg_length_end_byte])[0]
-                while len(rx_msg) < expected_rx_msg_len:
-                    rx_msg += s.recv(self.__msg_buffer_size_bytes)
-
-                tx_msg = self.__process_client_msg(rx_msg)
-
-                s.sendall(tx_msg)
+                rx_buffer += rx_chunk
+
+                # Service every complete message in the buffer.
+                rx_msgs = self.__msg_handler.extract_client_msgs(rx_buffer)
+                if self.__fault_injector is not None:
+                    responses = [(rx_msg, self.__msg_handler.process_client_msg(rx_msg))
+                                 for rx_msg in rx_msgs]
+                    if not self.__fault_injector.send_responses(s, responses):
+                        break
+                    continue
+                for rx_msg in rx_msgs:
+                    tx_msg = self.__msg_handler.process_client_msg(rx_msg)
+                    s.sendall(tx_msg)
             except socket.timeout:
                 with self.__stop_lock:
                     if self.__stop:
                         break
+            except OSError:
+                break
+            except Exception:
+                # A malformed message only closes the connection it came from rather than
+                # stopping the worker with its socket left open.
+                logger.error('Failed to process client message! Closing connection.',
+                             exc_info=True)
+                break
         s.close()
-
-    def __process_client_msg(self, rx_msg):
-        """
-        Takes the incoming client message and generates a response.
-
-        Parameters
-        ----------
-        rx_msg : bytearray
-            The client message received.
-
-        Returns
-        -------
-        tx_msg : PyBytesObject
-            The client response.
-        """
-
-        # Determine command code to sort message
-        cmd_code_format = MessageABC.base_template['command_code']['format']
-        cmd_code_start_byte = MessageABC.base_template['command_code']['start_byte']
-        cmd_code_end_byte = MessageABC.base_template['command_code']['start_byte'] + + struct.calcsize(
-            cmd_code_format)
-        cmd_code = struct.unpack(
-            cmd_code_format, rx_msg[cmd_code_start_byte:cmd_code_end_byte])[0]
-
-        if cmd_code == Msg.Login.Client.command_code:
-            rx_msg_dict = Msg.Login.Client.unpack(rx_msg)
-            tx_msg = Msg.Login.Server.pack({'num_channels':self.__channel_data.num_channels})
-        elif cmd_code == Msg.ChannelInfo.Client.command_code:
-            rx_msg_dict = Msg.ChannelInfo.Client.unpack(rx_msg)
-            channel_values = self.__channel_data.fetch_channel_readings(
-                rx_msg_dict['channel'])
-            tx_msg = Msg.ChannelInfo.Server.pack(channel_values)
-        elif cmd_code == Msg.AssignSchedule.Client.command_code:
-            rx_msg_dict = Msg.AssignSchedule.Client.unpack(rx_msg)
-            tx_msg = Msg.AssignSchedule.Server.pack(
-                {'channel': rx_msg_dict['channel']})
-        elif cmd_code == Msg.StartSchedule.Client.command_code:
-            rx_msg_dict = Msg.StartSchedule.Client.unpack(rx_msg)
-            tx_msg = Msg.StartSchedule.Server.pack(
-                {'channel': rx_msg_dict['channel']})
-        elif cmd_code == Msg.StopSchedule.Client.command_code:
-            rx_msg_dict = Msg.StopSchedule.Client.unpack(rx_msg)
-            tx_msg = Msg.StopSchedule.Server.pack(
-                {'channel': rx_msg_dict['channel']})
-        elif cmd_code == Msg.SetMetaVariable.Client.command_code:
-            rx_msg_dict = Msg.SetMetaVariable.Client.unpack(rx_msg)
-            tx_msg = Msg.SetMetaVariable.Server.pack(
-                {'channel': rx_msg_dict['channel']})
-        else:
-            tx_msg = bytearray([])
-
-        return tx_msg
+        if self.__metrics is not None:
+            self.__metrics.connection_closed()
 
     def is_alive(self):
         """
@@ -229,9 +133,9 @@ class ArbinSpoofer:
 
     def __init__(self, config: dict):
         """
-        Class to mimic behavior of Arbin cycler MITSPro control server. The class is currently dumb
-        and just sends back basic channel messages without any notion of channel status.
-        It could be expanded in future.
+        Class to mimic behavior of Arbin cycler MITSPro control server. By default it sends back
+        basic channel messages without any notion of channel status. Set `simulation` in the
+        config to have the channel readings generated by a simulated cell on every channel.
 
         Parameters
         ----------
@@ -243,20 +147,149 @@ class ArbinSpoofer:
             `port`: The port to use for the server.
 
             `num_channels`: The number of channel our fictitious cycler has.
-        """
-        self.__channel_data = ChannelData(config['num_channels'])
 
-        self.__server_thread = threading.Thread(
-            target=self.__server_loop,
-            args=(config, SocketWorker,),
-            daemon=True
-        )
+            `cycler_sn`: *optional* : The cycler serial number sent in login responses.
+            Defaults to `00000000`.
+
+            `replay_capture`: *optional* : Path to a capture file written with
+            `pyctiarbin.capture.CaptureWriter`. If set, channel info requests are answered
+            with the recorded frames instead of the static channel readings.
+
+            `replay_mode`: *optional* : Either `sequential` (next recorded frame per channel on
+            every request) or `clock` (latest recorded frame at the replay clock). Defaults to `sequential`.
+
+            `replay_speed`: *optional* : How much faster than real time to run the replay clock.
+            Defaults to 1.
+
+            `replay_loop`: *optional* : Whether to loop the capture once it is exhausted. Defaults to True.
+
+            `server_mode`: *optional* : Either `threaded` (a thread per client connection) or
+            `selector` (every client connection served from a single event driven thread, with
+            immediate stop). Defaults to `threaded`.
+
+            `aux_counts`: *optional* : Aux reading counts to add to channel info responses, e.g.
+            `{'aux_voltage_count': 4, 'aux_temperature_count': 16}`. Either one dictionary for every
+            channel or a list with a dictionary per channel. Aux readings default to zero and can be
+            set with `update_channel_status()`.
+
+            `simulation`: *optional* : If set, a `CellSimulation` generates the channel readings.
+            Either True for the default simulation config or a simulation config dictionary.
+            Requires NumPy.
+
+            `stateful`: *optional* : If set, a `ChannelStateMachine` tracks the schedule, test state,
+            test name and meta variables of every channel, and requests get the feedback codes
+            MITS Pro would send, e.g. 'Channel is running'. Either True for the default config or a
+            state machine config dictionary. Otherwise every request succeeds.
+
+            `faults`: *optional* : A `FaultInjector` config dictionary. If set, responses are
+            sent with injected delays, split or coalesced writes, drops, disconnects and corrupt
+            checksums. Only supported by the `threaded` server mode.
+
+            `metrics`: *optional* : If set, `SpooferMetrics` records requests, bytes and service
+            times per command and open connections, see `get_metrics()`. Either True or a dictionary
+            with `http_port` and optionally `http_ip` (defaults to '127.0.0.1') to also serve the
+            metrics as text at `/metrics` and JSON at `/metrics.json`.
+        """
+        self.__selector_server = None
+        self.__server_thread = None
+        self.__simulation = None
+        self.__state_machine = None
+        self.__fault_injector = None
+        self.__metrics = None
+        self.__metrics_server = None
+        server_mode = config.get('server_mode', 'threaded')
+        if server_mode not in ('threaded', 'selector'):
+            raise ValueError(f'Unknown server mode {server_mode}!')
+
+        if config.get('faults'):
+            if server_mode != 'threaded':
+                raise ValueError(
+                    'Fault injection requires the threaded server mode!')
+            self.__fault_injector = FaultInjector(config['faults'])
+
+        if config.get('replay_capture'):
+            self.__channel_data = ReplayChannelData(
+                config['num_channels'],
+                config['replay_capture'],
+                mode=config.get('replay_mode', 'sequential'),
+                speed=config.get('replay_speed', 1.0),
+                loop=config.get('replay_loop', True))
+        else:
+            self.__channel_data = ChannelData(config['num_channels'])
+
+        aux_counts = config.get('aux_counts')
+        if aux_counts:
+            if isinstance(aux_counts, dict):
+                aux_counts = [aux_counts] * config['num_channels']
+            for channel, channel_aux_counts in enumerate(aux_counts):
+                if not self.__channel_data.update_channel_readings(channel, channel_aux_counts):
+                    raise ValueError(
+                        f'Invalid aux counts {channel_aux_counts} for channel {channel}!')
+
+        if config.get('simulation'):
+            simulation_config = config['simulation'] if isinstance(
+                config['simulation'], dict) else {}
+            self.__simulation = CellSimulation(
+                self.__channel_data, simulation_config)
+
+        if config.get('stateful'):
+            state_machine_config = config['stateful'] if isinstance(
+                config['stateful'], dict) else {}
+            self.__state_machine = ChannelStateMachine(
+                self.__channel_data, state_machine_config, self.__simulation)
+
+        metrics_config = config.get('metrics')
+        if metrics_config:
+            self.__metrics = SpooferMetrics()
+            if isinstance(metrics_config, dict) and metrics_config.get('http_port') is not None:
+                self.__metrics_server = TextHTTPServer(
+                    metrics_config.get('http_ip', '127.0.0.1'), metrics_config['http_port'], {
+                        '/metrics': ('text/plain; version=0.0.4', self.__metrics.to_text),
+                        '/metrics.json': ('application/json',
+                                          lambda: json.dumps(self.__metrics.get_metrics(), default=str)),
+                    })
+
+        self.__msg_handler = ClientMsgHandler(
+            self.__channel_data, self.__simulation, config.get('cycler_sn', '00000000'), self.__state_machine,
+            self.__metrics)
+
+        # Set once the server socket is listening (or failed to) so start() can wait on it.
+        self.__server_ready = threading.Event()
+        # The error binding or listening on the server socket, raised from start().
+        self.__server_error = None
+
+        if server_mode == 'selector':
+            self.__selector_server = SelectorServer(
+                config['ip'], config['port'], self.__msg_handler, self.__metrics)
+            self.__server_thread = threading.Thread(
+                target=self.__serve_selector,
+                daemon=True
+            )
+        else:
+            self.__server_thread = threading.Thread(
+                target=self.__server_loop,
+                args=(config, SocketWorker,),
+                daemon=True
+            )
 
     def start(self):
         """
-        Starts the server loops.
+        Starts the server loops. Returns once the server is accepting connections.
+
+        Raises
+        ------
+        OSError
+            If the server socket could not be bound or listened on, e.g. the port is in use.
         """
         self.__server_thread.start()
+        self.__server_ready.wait()
+        if self.__server_error is not None:
+            self.__server_thread.join()
+            raise self.__server_error
+        if self.__simulation is not None:
+            self.__simulation.start()
+        if self.__metrics_server is not None:
+            self.__metrics_server.start()
 
     def update_channel_status(self, channel, updated_readings):
         """
@@ -291,16 +324,23 @@ class ArbinSpoofer:
         client_workers = []
 
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        sock.bind((sock_config["ip"], sock_config["port"]))
-        sock.settimeout(self.__client_connect_timeout_s)
-        sock.listen()
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((sock_config["ip"], sock_config["port"]))
+            sock.settimeout(self.__client_connect_timeout_s)
+            sock.listen()
+        except OSError as e:
+            sock.close()
+            self.__server_error = e
+            return
+        finally:
+            self.__server_ready.set()
 
         while True:
             try:
                 client_connection = sock.accept()[0]
                 client_workers.append(
-                    Worker(client_connection, self.__channel_data))
+                    Worker(client_connection, self.__msg_handler, self.__fault_injector, self.__metrics))
             except socket.timeout:
                 with self.__stop_servers_lock:
                     # If stop command is issued then kill all workers.
@@ -316,13 +356,73 @@ class ArbinSpoofer:
 
         sock.close()
 
+    def __serve_selector(self):
+        """
+        Binds and runs the selector server, keeping any error binding its socket for start()
+        to raise.
+        """
+        try:
+            self.__selector_server.bind()
+        except OSError as e:
+            self.__server_error = e
+            return
+        finally:
+            self.__server_ready.set()
+        self.__selector_server.serve()
+
+    def get_simulation(self) -> CellSimulation:
+        """
+        Returns the cell simulation, or None if the spoofer is not simulating cells.
+        """
+        return self.__simulation
+
+    def get_metrics(self) -> dict:
+        """
+        Returns the spoofer traffic metrics. See `SpooferMetrics.get_metrics()`.
+
+        Returns
+        -------
+        metrics : dict
+            The metrics. Empty if the spoofer is not recording metrics.
+        """
+        return self.__metrics.get_metrics() if self.__metrics is not None else {}
+
+    def get_metrics_http_port(self) -> int:
+        """
+        Returns the port the metrics are served on, or None if they are not served.
+        """
+        return self.__metrics_server.get_port() if self.__metrics_server is not None else None
+
+    def get_state_machine(self) -> ChannelStateMachine:
+        """
+        Returns the channel state machine, or None if the spoofer is not stateful.
+        """
+        return self.__state_machine
+
+    def get_fault_injector(self) -> FaultInjector:
+        """
+        Returns the fault injector, or None if the spoofer is not injecting faults.
+        """
+        return self.__fault_injector
+
     def stop(self):
         """
         Stop the server loops.
         """
+        if self.__simulation is not None:
+            self.__simulation.stop()
+        if self.__selector_server is not None:
+            self.__selector_server.stop()
         with self.__stop_servers_lock:
             self.__stop_servers = True
-        self.__server_thread.join()
+        if self.__server_thread is not None and self.__server_thread.is_alive():
+            self.__server_thread.join()
+        if self.__selector_server is not None:
+            self.__selector_server.close()
+            self.__selector_server = None
+        if self.__metrics_server is not None:
+            self.__metrics_server.stop()
+            self.__metrics_server = None
 
     def __del__(self):
         self.stop()
\ No newline at end of file
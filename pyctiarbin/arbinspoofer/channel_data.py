@@ -0,0 +1,261 @@
+import threading
+import struct
+from pyctiarbin.messages import Msg
+
+
+class ChannelRecord:
+    """
+    The readings of a single channel, stored as a list of values in
+    `ChannelInfo.Server.msg_specific_template` order, along with the lock guarding them.
+    The aux readings are held separately, keyed on aux reading list name. Also holds the
+    channel's packed `ChannelInfo.Server` frame without its checksum, the byte sum of that
+    frame, and the complete frame once it has been requested.
+    """
+    __slots__ = ('values', 'aux', 'lock', 'frame', 'frame_sum', 'frame_bytes')
+
+    def __init__(self, values: list):
+        self.values = values
+        self.aux = {}
+        self.lock = threading.Lock()
+        self.frame = None
+        self.frame_sum = 0
+        self.frame_bytes = None
+
+
+class ChannelData:
+
+    # Names of the channel readings in ChannelInfo.Server.msg_specific_template order.
+    field_names = tuple(Msg.ChannelInfo.Server.msg_specific_template.keys())
+    field_index = {name: idx for idx, name in enumerate(field_names)}
+
+    # Precompiled packer, start byte and text encoding of each reading so frames can be
+    # packed and patched straight from a ChannelRecord without building a template dictionary.
+    field_packers = tuple(
+        (struct.Struct(item['format']),
+         item['start_byte'],
+         item['text_encoding'] if item['format'].endswith(('s', 'c')) else None)
+        for item in Msg.ChannelInfo.Server.msg_specific_template.values())
+
+    # Packed default frame without the checksum. Provides the base message fields.
+    base_frame = bytes(Msg.ChannelInfo.Server.pack()[:Msg.ChannelInfo.Server.msg_length])
+
+    aux_count_names = frozenset(Msg.ChannelInfo.Server.aux_count_names)
+    aux_list_names = frozenset(Msg.ChannelInfo.Server.aux_list_names)
+
+    def __init__(self, num_channels):
+        """
+        Container class that will hold all of the specific channel data for ArbinSpoofer.
+        Each instance has its own readings and each channel has its own lock.
+
+        Parameters
+        ----------
+            num_channels : int
+                Number of channels in our hypothetical Arbin cycler.
+        """
+        self.num_channels = num_channels
+
+        # Create channel_readings for all of the channels. Template values are immutable
+        # so the records can share them.
+        default_values = [item['value']
+                          for item in Msg.ChannelInfo.Server.msg_specific_template.values()]
+        channel_idx = self.field_index['channel']
+        self.__chan_records = []
+        for i in range(0, self.num_channels):
+            values = list(default_values)
+            values[channel_idx] = i
+            record = ChannelRecord(values)
+            record.frame = self.__pack_frame(values)
+            record.frame_sum = sum(record.frame)
+            self.__chan_records.append(record)
+
+    def fetch_channel_readings(self, channel) -> dict:
+        """
+        Returns the status message for a specified channel.
+
+        Parameters
+        ----------
+        channel : int
+            The channel to return the status for.
+
+        Returns
+        -------
+        status : dict
+            The status message for the requested channel. Empty if channel larger than number of channel
+        """
+        if not 0 <= channel < self.num_channels:
+            return {}
+        record = self.__chan_records[channel]
+        with record.lock:
+            readings = dict(zip(self.field_names, record.values))
+            for aux_list_name in Msg.ChannelInfo.Server.aux_list_names:
+                readings[aux_list_name] = list(
+                    record.aux.get(aux_list_name, []))
+            return readings
+
+    def fetch_channel_frame(self, channel) -> bytes:
+        """
+        Returns the packed `ChannelInfo.Server` response for a specified channel. The frame is
+        identical to `Msg.ChannelInfo.Server.pack(self.fetch_channel_readings(channel))` but is
+        cached, so it is only rebuilt after the channel readings change.
+
+        Parameters
+        ----------
+        channel : int
+            The channel to return the response for.
+
+        Returns
+        -------
+        frame : bytes
+            The packed channel info response.
+        """
+        if not 0 <= channel < self.num_channels:
+            return Msg.ChannelInfo.Server.pack()
+
+        record = self.__chan_records[channel]
+        with record.lock:
+            if record.frame_bytes is None:
+                record.frame_bytes = bytes(
+                    record.frame) + struct.pack('<H', record.frame_sum & 0xFFFF)
+            return record.frame_bytes
+
+    def update_channel_readings(self, channel, updated_readings):
+        """
+        Updates the stored channel readings for the specified channel.
+
+        Parameters
+        ----------
+        channel : int
+            The channel to update the readings for.
+        updated_status : dict
+            Complete or partial dictionary of status values to update. May include aux counts
+            such as `aux_voltage_count` and aux reading lists such as `aux_voltage` and
+            `aux_voltage_dt`. Aux reading lists are padded with zeros or truncated to their count.
+
+        Returns
+        -------
+        success : bool
+            Returns True if all values in the updated_status were used to update the channel_status_array.
+            Nothing is updated if any key is unknown, any value cannot be packed or any aux count
+            is negative.
+        """
+        if not 0 <= channel < self.num_channels:
+            return False
+
+        updates = []
+        aux_updates = []
+        for key, value in updated_readings.items():
+            if key in self.aux_list_names:
+                try:
+                    struct.pack(f'<{len(value)}f', *value)
+                except (struct.error, TypeError):
+                    return False
+                aux_updates.append((key, list(value)))
+                continue
+            if key not in self.field_index:
+                return False
+            idx = self.field_index[key]
+            packer, _, text_encoding = self.field_packers[idx]
+            try:
+                packer.pack(value.encode(text_encoding)
+                            if text_encoding else value)
+            except (struct.error, AttributeError):
+                return False
+            updates.append((idx, value))
+
+        record = self.__chan_records[channel]
+        with record.lock:
+            # Changing the aux readings can change the frame length so repack the whole frame.
+            if aux_updates or any(self.field_names[idx] in self.aux_count_names for idx, _ in updates):
+                values = list(record.values)
+                for idx, value in updates:
+                    values[idx] = value
+                try:
+                    aux = self.__fit_aux_to_counts(
+                        values, {**record.aux, **dict(aux_updates)})
+                except ValueError:
+                    return False
+                record.values[:] = values
+                record.aux = aux
+                record.frame = self.__pack_frame(record.values, record.aux)
+                record.frame_sum = sum(record.frame)
+                record.frame_bytes = None
+                return True
+
+            # Patch the changed readings into the cached frame and keep its byte sum current
+            # rather than repacking the whole frame.
+            for idx, value in updates:
+                record.values[idx] = value
+                packer, start_byte, text_encoding = self.field_packers[idx]
+                end_byte = start_byte + packer.size
+                record.frame_sum -= sum(record.frame[start_byte:end_byte])
+                packer.pack_into(record.frame, start_byte,
+                                 value.encode(text_encoding) if text_encoding else value)
+                record.frame_sum += sum(record.frame[start_byte:end_byte])
+            record.frame_bytes = None
+        return True
+
+    @classmethod
+    def __fit_aux_to_counts(cls, values: list, aux: dict) -> dict:
+        """
+        Pads with zeros or truncates aux reading lists to match the aux counts in the passed
+        channel readings.
+
+        Parameters
+        ----------
+        values : list
+            The channel readings in `field_names` order.
+        aux : dict
+            The aux reading lists keyed on aux reading list name.
+
+        Returns
+        -------
+        aux : dict
+            The fitted aux reading lists.
+
+        Raises
+        ------
+        ValueError
+            If an aux count is negative.
+        """
+        fitted_aux = {}
+        for count_name, reading_name in zip(Msg.ChannelInfo.Server.aux_count_names,
+                                            Msg.ChannelInfo.Server.aux_reading_names):
+            count = values[cls.field_index[count_name]]
+            if count < 0:
+                raise ValueError(f'Invalid {count_name} {count}!')
+            for aux_list_name in (reading_name, reading_name + '_dt'):
+                aux_list = aux.get(aux_list_name, [])
+                fitted_aux[aux_list_name] = aux_list[:count] + \
+                    [0.0] * (count - len(aux_list))
+        return fitted_aux
+
+    @classmethod
+    def __pack_frame(cls, values: list, aux: dict = None) -> bytearray:
+        """
+        Packs a `ChannelInfo.Server` frame, without its checksum, from channel readings.
+
+        Parameters
+        ----------
+        values : list
+            The channel readings in `field_names` order.
+        aux : *optional* : dict
+            The aux reading lists keyed on aux reading list name.
+
+        Returns
+        -------
+        frame : bytearray
+            The packed frame.
+        """
+        frame = bytearray(cls.base_frame)
+        for (packer, start_byte, text_encoding), value in zip(cls.field_packers, values):
+            packer.pack_into(frame, start_byte,
+                             value.encode(text_encoding) if text_encoding else value)
+
+        aux_bin = Msg.ChannelInfo.Server.pack_aux_readings(
+            {**dict(zip(cls.field_names, values)), **(aux or {})})
+        if aux_bin:
+            aux_start_byte = Msg.ChannelInfo.Server.aux_start_byte
+            frame[aux_start_byte:aux_start_byte] = aux_bin
+            struct.pack_into(Msg.ChannelInfo.Server.base_template['msg_length']['format'], frame,
+                             Msg.ChannelInfo.Server.base_template['msg_length']['start_byte'], len(frame))
+        return frame
@@ -0,0 +1,306 @@
+import logging
+import threading
+import time
+from pyctiarbin.messages import Msg
+from .channel_data import ChannelData
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelState:
+    """
+    The schedule and test state of a single channel.
+    """
+    __slots__ = ('schedule', 'state', 'test_name', 'mv_values', 'start_time')
+
+    def __init__(self):
+        self.schedule = ''
+        self.state = ChannelStateMachine.state_idle
+        self.test_name = ''
+        self.mv_values = {}
+        self.start_time = None
+
+
+class ChannelStateMachine:
+    """
+    Tracks the assigned schedule, test state, test name and meta variables of every channel
+    of an ArbinSpoofer, and decides the feedback code for each schedule, test and meta variable
+    request the way MITS Pro does. For example a schedule cannot be assigned to a running
+    channel and a test cannot be started on a channel without a schedule.
+
+    Each request method returns the feedback code to send, from the `AssignSchedule.Server`,
+    `StartSchedule.Server`, `StopSchedule.Server` and `SetMetaVariable.Server` code tables.
+    """
+
+    state_idle = 'idle'
+    state_running = 'running'
+    state_finished = 'finished'
+
+    # Channel status code reported for each state when there is no simulation driving the status.
+    state_status_codes = {
+        state_idle: 0,
+        state_running: 22,
+        state_finished: 15,
+    }
+
+    # Meta variable number for each meta variable code.
+    mv_nums = {mv_code: mv_num for mv_num,
+               mv_code in Msg.SetMetaVariable.Client.mv_channel_codes.items()}
+
+    default_config = {
+        'schedules': None,
+        'test_duration_s': None,
+    }
+
+    def __init__(self, channel_data: ChannelData, config: dict = {}, simulation=None):
+        """
+        Creates the state machine with every channel idle and without a schedule.
+
+        Parameters
+        ----------
+        channel_data : ChannelData
+            The channel readings to write the schedule, test name and status to.
+        config : *optional* : dict
+            A configuration dictionary. May contain the following keys:
+                schedules : *optional* : list
+                    The schedule names that exist. Assigning any other schedule fails with
+                    'Schedule name not found'. Defaults to every schedule existing.
+                test_duration_s : *optional* : float
+                    How long a test runs before the channel is finished. Defaults to tests
+                    running until stopped.
+        simulation : *optional* : CellSimulation
+            Notified of accepted requests. The simulation then drives the channel status.
+        """
+        unknown_keys = set(config.keys()) - set(self.default_config.keys())
+        if unknown_keys:
+            raise ValueError(
+                f'Unknown channel state config keys {unknown_keys}!')
+        config = {**self.default_config, **config}
+
+        self.__channel_data = channel_data
+        self.__num_channels = channel_data.num_channels
+        self.__simulation = simulation
+        self.__schedules = None if config['schedules'] is None else set(
+            config['schedules'])
+        self.__test_duration_s = config['test_duration_s']
+
+        self.__lock = threading.Lock()
+        self.__channel_states = [ChannelState()
+                                 for _ in range(self.__num_channels)]
+
+    def get_channel_state(self, channel: int) -> dict:
+        """
+        Returns the state of a channel.
+
+        Parameters
+        ----------
+        channel : int
+            The zero indexed channel.
+
+        Returns
+        -------
+        channel_state : dict
+            The `schedule`, `state` (`idle`, `running` or `finished`), `test_name` and `mv_values`
+            keyed on meta variable number. Empty if the channel does not exist.
+        """
+        if not 0 <= channel < self.__num_channels:
+            return {}
+        self.refresh(channel)
+        with self.__lock:
+            channel_state = self.__channel_states[channel]
+            return {
+                'schedule': channel_state.schedule,
+                'state': channel_state.state,
+                'test_name': channel_state.test_name,
+                'mv_values': dict(channel_state.mv_values),
+            }
+
+    def refresh(self, channel: int):
+        """
+        Finishes the test on a channel if it has run for the configured test duration.
+
+        Parameters
+        ----------
+        channel : int
+            The zero indexed channel.
+        """
+        if self.__test_duration_s is None or not 0 <= channel < self.__num_channels:
+            return
+        with self.__lock:
+            channel_state = self.__channel_states[channel]
+            if channel_state.state != self.state_running or \
+                    time.monotonic() - channel_state.start_time < self.__test_duration_s:
+                return
+            channel_state.state = self.state_finished
+        if self.__simulation:
+            self.__simulation.stop_test(channel)
+        self.__write_status(channel, self.state_finished)
+
+    def assign_schedule(self, channel: int, schedule_name: str) -> int:
+        """
+        Assigns a schedule to a channel.
+
+        Parameters
+        ----------
+        channel : int
+            The zero indexed channel.
+        schedule_name : str
+            The name of the schedule.
+
+        Returns
+        -------
+        result : int
+            The `AssignSchedule.Server` feedback code.
+        """
+        if not 0 <= channel < self.__num_channels:
+            return 16
+        schedule_name = schedule_name.rstrip('\x00')
+        if not schedule_name:
+            return 18
+        if self.__schedules is not None and schedule_name not in self.__schedules:
+            return 19
+
+        self.refresh(channel)
+        with self.__lock:
+            channel_state = self.__channel_states[channel]
+            if channel_state.state == self.state_running:
+                return 20
+            channel_state.schedule = schedule_name
+
+        self.__channel_data.update_channel_readings(
+            channel, {'schedule': schedule_name})
+        if self.__simulation:
+            self.__simulation.assign_schedule(channel, schedule_name)
+        return 0
+
+    def start_test(self, channels: list, test_name: str) -> tuple:
+        """
+        Starts a test on one or more channels. Either every channel is started or none are.
+
+        Parameters
+        ----------
+        channels : list
+            The zero indexed channels.
+        test_name : str
+            The name of the test.
+
+        Returns
+        -------
+        result : int
+            The `StartSchedule.Server` feedback code.
+        channel : int
+            The channel the result is for. The first channel that could not be started, or
+            the first channel if every channel was started.
+        """
+        if not channels:
+            return 31, 0
+        for channel in channels:
+            if not 0 <= channel < self.__num_channels:
+                return 16, channel
+        test_name = test_name.rstrip('\x00')
+        if not test_name:
+            return 35, channels[0]
+
+        for channel in channels:
+            self.refresh(channel)
+        with self.__lock:
+            for channel in channels:
+                channel_state = self.__channel_states[channel]
+                if channel_state.state == self.state_running:
+                    return 18, channel
+                if not channel_state.schedule:
+                    return 21, channel
+            start_time = time.monotonic()
+            for channel in channels:
+                channel_state = self.__channel_states[channel]
+                channel_state.state = self.state_running
+                channel_state.test_name = test_name
+                channel_state.mv_values = {}
+                channel_state.start_time = start_time
+
+        for channel in channels:
+            self.__channel_data.update_channel_readings(
+                channel, {'testname': test_name})
+            if self.__simulation:
+                self.__simulation.start_test(channel, test_name)
+            self.__write_status(channel, self.state_running)
+        return 0, channels[0]
+
+    def stop_test(self, channel: int, stop_all_channels: bool = False) -> int:
+        """
+        Stops the test on a channel, or on every channel. Stopping an idle channel succeeds.
+
+        Parameters
+        ----------
+        channel : int
+            The zero indexed channel.
+        stop_all_channels : *optional* : bool
+            Stop every channel rather than just the passed one.
+
+        Returns
+        -------
+        result : int
+            The `StopSchedule.Server` feedback code.
+        """
+        if stop_all_channels:
+            channels = list(range(self.__num_channels))
+        elif 0 <= channel < self.__num_channels:
+            channels = [channel]
+        else:
+            return 16
+
+        for channel in channels:
+            with self.__lock:
+                channel_state = self.__channel_states[channel]
+                was_running = channel_state.state == self.state_running
+                channel_state.state = self.state_idle
+            if self.__simulation:
+                self.__simulation.stop_test(channel)
+            if was_running:
+                self.__write_status(channel, self.state_idle)
+        return 0
+
+    def set_meta_variable(self, channel: int, mv_meta_code: int, mv_value: float) -> int:
+        """
+        Sets a meta variable on a running channel.
+
+        Parameters
+        ----------
+        channel : int
+            The zero indexed channel.
+        mv_meta_code : int
+            The meta variable code from `SetMetaVariable.Client.mv_channel_codes`.
+        mv_value : float
+            The meta variable value.
+
+        Returns
+        -------
+        result : int
+            The `SetMetaVariable.Server` feedback code.
+        """
+        if not 0 <= channel < self.__num_channels:
+            return 16
+        mv_num = self.mv_nums.get(mv_meta_code)
+        if mv_num is None:
+            return 18
+
+        self.refresh(channel)
+        with self.__lock:
+            channel_state = self.__channel_states[channel]
+            if channel_state.state != self.state_running:
+                return 17
+            channel_state.mv_values[mv_num] = mv_value
+
+        if self.__simulation:
+            self.__simulation.set_meta_variable(
+                channel, mv_meta_code, mv_value)
+        return 0
+
+    def __write_status(self, channel: int, state: str):
+        """
+        Writes the status of a state to the channel readings, unless a simulation is driving
+        the status.
+        """
+        if self.__simulation is None:
+            self.__channel_data.update_channel_readings(
+                channel, {'status': self.state_status_codes[state]})
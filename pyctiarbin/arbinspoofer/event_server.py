@@ -0,0 +1,219 @@
+import logging
+import selectors
+import socket
+import threading
+from .msg_handler import ClientMsgHandler
+from .metrics import SpooferMetrics
+
+logger = logging.getLogger(__name__)
+
+
+class ClientConnection:
+    """
+    The buffered state of a single client connection served by `SelectorServer`.
+    """
+    __slots__ = ('sock', 'rx_buffer', 'tx_buffer')
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.rx_buffer = bytearray()
+        self.tx_buffer = bytearray()
+
+
+class SelectorServer:
+    """
+    Event driven server that serves every client connection from a single thread using
+    non-blocking sockets and `selectors`. Nothing polls on a timeout, so an idle server
+    uses no CPU and `stop()` takes effect immediately.
+    """
+    __recv_size_bytes = 2**16
+
+    def __init__(self, ip: str, port: int, msg_handler: ClientMsgHandler, metrics: SpooferMetrics = None):
+        """
+        Creates the server. Call `bind()` and then `serve()` to start serving.
+
+        Parameters
+        ----------
+        ip : str
+            The server IP address to host from.
+        port : int
+            The port to use for the server.
+        msg_handler : ClientMsgHandler
+            Generates the responses to client messages.
+        metrics : *optional* : SpooferMetrics
+            Records client connections opening and closing.
+        """
+        self.__ip = ip
+        self.__port = port
+        self.__msg_handler = msg_handler
+        self.__metrics = metrics
+
+        self.__selector = selectors.DefaultSelector()
+        # Writing to the wakeup socket interrupts select() so stop() does not wait.
+        self.__wakeup_rx, self.__wakeup_tx = socket.socketpair()
+        self.__stop = threading.Event()
+        self.__num_connections = 0
+        self.__server_sock = None
+
+    def get_num_connections(self) -> int:
+        """
+        Returns the number of open client connections.
+        """
+        return self.__num_connections
+
+    def bind(self):
+        """
+        Binds and listens on the server socket.
+
+        Raises
+        ------
+        OSError
+            If the socket could not be bound or listened on, e.g. the port is in use.
+        """
+        server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server_sock.bind((self.__ip, self.__port))
+            server_sock.listen(socket.SOMAXCONN)
+            server_sock.setblocking(False)
+        except OSError:
+            server_sock.close()
+            raise
+        self.__server_sock = server_sock
+
+    def serve(self):
+        """
+        Serves client connections until `stop()` is called. Binds the server socket first if
+        `bind()` has not been called.
+        """
+        if self.__server_sock is None:
+            self.bind()
+        server_sock = self.__server_sock
+
+        self.__selector.register(server_sock, selectors.EVENT_READ, None)
+        self.__wakeup_rx.setblocking(False)
+        self.__selector.register(
+            self.__wakeup_rx, selectors.EVENT_READ, self.__wakeup_rx)
+
+        while not self.__stop.is_set():
+            for key, mask in self.__selector.select():
+                if key.data is None:
+                    self.__accept(server_sock)
+                elif key.data is self.__wakeup_rx:
+                    continue
+                else:
+                    if mask & selectors.EVENT_READ:
+                        self.__read(key.data)
+                    if mask & selectors.EVENT_WRITE:
+                        self.__write(key.data)
+
+        for key in list(self.__selector.get_map().values()):
+            if isinstance(key.data, ClientConnection):
+                self.__close(key.data)
+        self.__selector.unregister(server_sock)
+        self.__selector.unregister(self.__wakeup_rx)
+        server_sock.close()
+        self.__server_sock = None
+
+    def stop(self):
+        """
+        Stops serving and closes every client connection.
+        """
+        self.__stop.set()
+        try:
+            self.__wakeup_tx.send(b'\x00')
+        except OSError:
+            pass
+
+    def close(self):
+        """
+        Releases the selector and wakeup sockets. The server cannot be restarted afterwards.
+        """
+        self.__selector.close()
+        self.__wakeup_rx.close()
+        self.__wakeup_tx.close()
+
+    def __accept(self, server_sock: socket.socket):
+        """
+        Accepts every pending client connection.
+        """
+        while True:
+            try:
+                client_sock = server_sock.accept()[0]
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                # Out of file descriptors or similar. Try again on the next event.
+                logger.error(f'Failed to accept client connection! {e}')
+                return
+            client_sock.setblocking(False)
+            client_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.__selector.register(
+                client_sock, selectors.EVENT_READ, ClientConnection(client_sock))
+            self.__num_connections += 1
+            if self.__metrics is not None:
+                self.__metrics.connection_opened()
+
+    def __read(self, connection: ClientConnection):
+        """
+        Receives from a client and queues the responses to every complete message.
+        """
+        try:
+            rx_chunk = connection.sock.recv(self.__recv_size_bytes)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self.__close(connection)
+            return
+        if not rx_chunk:
+            self.__close(connection)
+            return
+
+        connection.rx_buffer += rx_chunk
+        try:
+            for rx_msg in self.__msg_handler.extract_client_msgs(connection.rx_buffer):
+                connection.tx_buffer += self.__msg_handler.process_client_msg(
+                    rx_msg)
+        except Exception:
+            # A malformed message only closes the connection it came from rather than
+            # stopping the server for every client.
+            logger.error('Failed to process client message! Closing connection.',
+                         exc_info=True)
+            self.__close(connection)
+            return
+
+        if connection.tx_buffer:
+            self.__write(connection)
+
+    def __write(self, connection: ClientConnection):
+        """
+        Sends as much of the queued responses as the client socket accepts. Waits for the
+        socket to become writable if some are left over.
+        """
+        try:
+            num_sent = connection.sock.send(connection.tx_buffer)
+        except (BlockingIOError, InterruptedError):
+            num_sent = 0
+        except OSError:
+            self.__close(connection)
+            return
+        del connection.tx_buffer[:num_sent]
+
+        events = selectors.EVENT_READ
+        if connection.tx_buffer:
+            events |= selectors.EVENT_WRITE
+        if self.__selector.get_key(connection.sock).events != events:
+            self.__selector.modify(connection.sock, events, connection)
+
+    def __close(self, connection: ClientConnection):
+        """
+        Closes a client connection.
+        """
+        try:
+            self.__selector.unregister(connection.sock)
+        except (KeyError, ValueError):
+            return
+        connection.sock.close()
+        self.__num_connections -= 1
+        if self.__metrics is not None:
+            self.__metrics.connection_closed()
@@ -0,0 +1,240 @@
+import json
+import logging
+import multiprocessing
+import os
+import queue
+from .arbin_spoofer import ArbinSpoofer
+
+logger = logging.getLogger(__name__)
+
+
+def generate_spoofer_configs(num_spoofers: int, base_port: int, num_channels: int = 16,
+                             ip: str = '127.0.0.1', **spoofer_config) -> list:
+    """
+    Generates configs for identical spoofers on consecutive ports, each with its own serial number.
+
+    Parameters
+    ----------
+    num_spoofers : int
+        The number of spoofers.
+    base_port : int
+        The port of the first spoofer. The other spoofers use the ports after it.
+    num_channels : *optional* : int
+        The number of channels on each spoofer.
+    ip : *optional* : str
+        The IP address to host every spoofer from.
+    spoofer_config : *optional*
+        Any other `ArbinSpoofer` config settings, used for every spoofer.
+
+    Returns
+    -------
+    spoofer_configs : list
+        An `ArbinSpoofer` config dictionary per spoofer.
+    """
+    return [{**spoofer_config,
+             'ip': ip,
+             'port': base_port + idx,
+             'num_channels': num_channels,
+             'cycler_sn': f'{idx + 1:08d}'}
+            for idx in range(num_spoofers)]
+
+
+def _serve_spoofers(spoofer_configs: list, status_queue, stop_event):
+    """
+    Runs in each farm process. Starts the passed spoofers, reports back once all of them
+    are accepting connections, and stops them once the stop event is set.
+
+    Parameters
+    ----------
+    spoofer_configs : list
+        The `ArbinSpoofer` config of each spoofer to serve from this process.
+    status_queue : multiprocessing.Queue
+        Receives `(pid, error)` once the spoofers are started. `error` is None on success.
+    stop_event : multiprocessing.Event
+        Set to stop the spoofers.
+    """
+    spoofers = []
+    try:
+        for config in spoofer_configs:
+            spoofer = ArbinSpoofer(config)
+            spoofer.start()
+            spoofers.append(spoofer)
+    except Exception as e:
+        status_queue.put((os.getpid(), f'{type(e).__name__}: {e}'))
+    else:
+        status_queue.put((os.getpid(), None))
+        try:
+            stop_event.wait()
+        except KeyboardInterrupt:
+            pass
+    finally:
+        for spoofer in spoofers:
+            spoofer.stop()
+
+
+class SpooferFarm:
+    """
+    Serves many `ArbinSpoofer` instances from a pool of processes, so a single machine can
+    stand in for a fleet of cyclers without every spoofer sharing one interpreter.
+    """
+
+    def __init__(self, spoofer_configs: list, num_processes: int = None, start_method: str = None):
+        """
+        Creates a spoofer farm. Call `start()` to launch the processes.
+
+        Parameters
+        ----------
+        spoofer_configs : list
+            An `ArbinSpoofer` config dictionary per spoofer. Each must have its own port.
+            See `generate_spoofer_configs()`.
+        num_processes : *optional* : int
+            The number of processes to spread the spoofers across. Defaults to the number of
+            CPUs, or the number of spoofers if there are fewer.
+        start_method : *optional* : str
+            The multiprocessing start method, e.g. `spawn`. Defaults to the platform default.
+        """
+        ports = [config['port'] for config in spoofer_configs]
+        if len(set(ports)) != len(ports):
+            raise ValueError('Every spoofer in a farm needs its own port!')
+
+        self.__spoofer_configs = [dict(config) for config in spoofer_configs]
+        if num_processes is None:
+            num_processes = os.cpu_count() or 1
+        self.__num_processes = max(
+            1, min(num_processes, len(self.__spoofer_configs)))
+
+        self.__context = multiprocessing.get_context(start_method)
+        self.__processes = []
+        self.__stop_event = None
+        self.__manifest = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self, timeout_s: float = 30.0) -> list:
+        """
+        Launches the farm processes and waits for every spoofer to accept connections.
+        Stops the farm and raises a RuntimeError if any spoofer fails to start.
+
+        Parameters
+        ----------
+        timeout_s : *optional* : float
+            How long to wait for the spoofers to start.
+
+        Returns
+        -------
+        manifest : list
+            The endpoint of every spoofer. See `get_manifest()`.
+        """
+        if self.__processes:
+            raise RuntimeError('Spoofer farm already started!')
+
+        status_queue = self.__context.Queue()
+        self.__stop_event = self.__context.Event()
+
+        # Deal the spoofers out round robin so every process serves a similar load.
+        process_configs = [self.__spoofer_configs[idx::self.__num_processes]
+                           for idx in range(self.__num_processes)]
+        for configs in process_configs:
+            process = self.__context.Process(
+                target=_serve_spoofers,
+                args=(configs, status_queue, self.__stop_event),
+                daemon=True)
+            process.start()
+            self.__processes.append(process)
+
+        errors = []
+        try:
+            for _ in self.__processes:
+                pid, error = status_queue.get(timeout=timeout_s)
+                if error:
+                    errors.append(f'Process {pid}: {error}')
+        except queue.Empty:
+            errors.append(
+                f'Spoofers did not start within {timeout_s} seconds.')
+
+        if errors:
+            self.stop()
+            raise RuntimeError(
+                'Failed to start spoofer farm! ' + ' '.join(errors))
+
+        self.__manifest = [
+            {'ip_address': config['ip'],
+             'port': config['port'],
+             'num_channels': config['num_channels'],
+             'cycler_sn': config.get('cycler_sn', '00000000'),
+             'pid': process.pid}
+            for process, configs in zip(self.__processes, process_configs)
+            for config in configs]
+        self.__manifest.sort(key=lambda endpoint: endpoint['port'])
+        logger.info(
+            f'Started {len(self.__manifest)} spoofers across {len(self.__processes)} processes.')
+        return self.get_manifest()
+
+    def get_manifest(self) -> list:
+        """
+        Returns the endpoint of every spoofer, sorted by port.
+
+        Returns
+        -------
+        manifest : list
+            A dictionary per spoofer with its `ip_address`, `port`, `num_channels`, `cycler_sn`
+            and the `pid` of the process serving it. Empty if the farm is not running.
+        """
+        return [dict(endpoint) for endpoint in self.__manifest]
+
+    def write_manifest(self, path: str):
+        """
+        Writes the manifest to a JSON file so other processes can find the spoofers.
+
+        Parameters
+        ----------
+        path : str
+            Path of the file to write.
+        """
+        with open(path, 'w') as f:
+            json.dump(self.get_manifest(), f, indent=4)
+
+    def stop(self, timeout_s: float = 10.0) -> dict:
+        """
+        Stops every spoofer and waits for the farm processes to exit. Processes that do not
+        exit in time are terminated.
+
+        Parameters
+        ----------
+        timeout_s : *optional* : float
+            How long to wait for each process to exit.
+
+        Returns
+        -------
+        summary : dict
+            The number of processes and spoofers, the exit code of each process keyed on pid,
+            and the number of processes that had to be terminated.
+        """
+        summary = {
+            'num_processes': len(self.__processes),
+            'num_spoofers': len(self.__manifest),
+            'exit_codes': {},
+            'terminated': 0,
+        }
+        if self.__stop_event is not None:
+            self.__stop_event.set()
+
+        for process in self.__processes:
+            process.join(timeout_s)
+            if process.is_alive():
+                logger.warning(
+                    f'Spoofer farm process {process.pid} did not stop. Terminating it.')
+                process.terminate()
+                process.join()
+                summary['terminated'] += 1
+            summary['exit_codes'][process.pid] = process.exitcode
+
+        self.__processes = []
+        self.__manifest = []
+        self.__stop_event = None
+        return summary
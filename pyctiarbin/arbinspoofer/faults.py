@@ -0,0 +1,266 @@
+import logging
+import random
+import socket
+import struct
+import threading
+import time
+from pyctiarbin.messages import MessageABC, COMMAND_NAMES
+
+logger = logging.getLogger(__name__)
+
+
+class FaultInjector:
+    """
+    Injects network faults into the responses an ArbinSpoofer sends: response delays drawn
+    from a distribution, responses split into small writes, responses coalesced into a single
+    write, dropped responses, disconnects part way through a response and corrupt checksums.
+    Every setting can be overridden per command.
+    """
+
+    # Name used in the config for each client command code.
+    command_names = COMMAND_NAMES
+
+    default_config = {
+        'delay_s': 0.0,
+        'split_write_bytes': 0,
+        'split_write_delay_s': 0.0,
+        'coalesce_responses': False,
+        'drop_probability': 0.0,
+        'disconnect_probability': 0.0,
+        'corrupt_checksum_probability': 0.0,
+    }
+
+    # The settings each delay distribution requires.
+    delay_distribution_keys = {
+        'constant': ('value_s',),
+        'uniform': ('low_s', 'high_s'),
+        'exponential': ('mean_s',),
+        'normal': ('mean_s', 'stddev_s'),
+    }
+
+    cmd_code_format = MessageABC.base_template['command_code']['format']
+    cmd_code_start_byte = MessageABC.base_template['command_code']['start_byte']
+
+    def __init__(self, config: dict):
+        """
+        Creates a fault injector.
+
+        Parameters
+        ----------
+        config : dict
+            A configuration dictionary. May contain the following keys:
+                delay_s : *optional* : float or dict
+                    How long to wait before sending a response. Either a fixed delay in seconds
+                    or a distribution: `{'distribution': 'uniform', 'low_s': 0.01, 'high_s': 0.05}`,
+                    `{'distribution': 'exponential', 'mean_s': 0.01}` or
+                    `{'distribution': 'normal', 'mean_s': 0.01, 'stddev_s': 0.002}`. Defaults to 0.
+                split_write_bytes : *optional* : int
+                    If non-zero, responses are sent in writes of at most this many bytes. Defaults to 0.
+                split_write_delay_s : *optional* : float
+                    How long to wait between split writes. Defaults to 0.
+                coalesce_responses : *optional* : bool
+                    Send the responses to every request received together in a single write.
+                    Defaults to False.
+                drop_probability : *optional* : float
+                    Probability a response is not sent. Defaults to 0.
+                disconnect_probability : *optional* : float
+                    Probability the connection is closed part way through sending a response.
+                    Defaults to 0.
+                corrupt_checksum_probability : *optional* : float
+                    Probability a response is sent with a corrupt checksum. Defaults to 0.
+                commands : *optional* : dict
+                    Settings that override the above for a single command, keyed on command name
+                    (`Login`, `ChannelInfo`, `AssignSchedule`, `StartSchedule`, `StopSchedule` or
+                    `SetMetaVariable`).
+                seed : *optional* : int
+                    Seed for the random number generator so faults are reproducible.
+        """
+        config = dict(config)
+        command_configs = config.pop('commands', {})
+        seed = config.pop('seed', None)
+
+        for command_config in [config, *command_configs.values()]:
+            unknown_keys = set(command_config.keys()) - \
+                set(self.default_config.keys())
+            if unknown_keys:
+                raise ValueError(f'Unknown fault config keys {unknown_keys}!')
+            if 'delay_s' in command_config:
+                self.__validate_delay(command_config['delay_s'])
+        unknown_commands = set(command_configs.keys()) - \
+            set(self.command_names.values())
+        if unknown_commands:
+            raise ValueError(f'Unknown fault commands {unknown_commands}!')
+
+        base_config = {**self.default_config, **config}
+        self.__command_configs = {
+            command_name: {**base_config, **command_configs.get(command_name, {})}
+            for command_name in self.command_names.values()}
+        self.__default_command_config = base_config
+
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+        self.__stats = {
+            'responses': 0,
+            'delayed': 0,
+            'split_writes': 0,
+            'coalesced': 0,
+            'dropped': 0,
+            'disconnects': 0,
+            'corrupted': 0,
+        }
+
+    def get_stats(self) -> dict:
+        """
+        Returns how many responses were sent and how many of each fault were injected.
+        """
+        with self.__lock:
+            return dict(self.__stats)
+
+    def send_responses(self, s: socket.socket, responses: list) -> bool:
+        """
+        Sends responses to a client, injecting the configured faults.
+
+        Parameters
+        ----------
+        s : socket.socket
+            Socket connection to client.
+        responses : list
+            (request, response) pairs in the order the requests were received.
+
+        Returns
+        -------
+        keep_open : bool
+            False if a disconnect was injected and the connection should be closed.
+        """
+        coalesced_tx_msg = bytearray()
+        num_coalesced = 0
+        for rx_msg, tx_msg in responses:
+            config = self.__command_config(rx_msg)
+
+            delay_s = self.__draw_delay(config['delay_s'])
+            if delay_s > 0:
+                self.__count('delayed')
+                time.sleep(delay_s)
+
+            if self.__chance(config['drop_probability']):
+                self.__count('dropped')
+                continue
+
+            tx_msg = bytearray(tx_msg)
+            if len(tx_msg) >= 2 and self.__chance(config['corrupt_checksum_probability']):
+                self.__count('corrupted')
+                checksum = struct.unpack_from('<H', tx_msg, len(tx_msg) - 2)[0]
+                struct.pack_into('<H', tx_msg, len(tx_msg) - 2,
+                                 (checksum + 1 + self.__randrange(0xFFFE)) & 0xFFFF)
+
+            if self.__chance(config['disconnect_probability']):
+                self.__count('disconnects')
+                self.__write(s, coalesced_tx_msg +
+                             tx_msg[:self.__randrange(len(tx_msg))], config)
+                return False
+
+            self.__count('responses')
+            if config['coalesce_responses']:
+                coalesced_tx_msg += tx_msg
+                num_coalesced += 1
+            else:
+                self.__write(s, tx_msg, config)
+
+        if coalesced_tx_msg:
+            if num_coalesced > 1:
+                self.__count('coalesced', num_coalesced)
+            self.__write(s, coalesced_tx_msg, self.__default_command_config)
+        return True
+
+    def __command_config(self, rx_msg: bytes) -> dict:
+        """
+        Returns the fault settings for the command of the passed request.
+        """
+        if len(rx_msg) < self.cmd_code_start_byte + struct.calcsize(self.cmd_code_format):
+            return self.__default_command_config
+        cmd_code = struct.unpack_from(
+            self.cmd_code_format, rx_msg, self.cmd_code_start_byte)[0]
+        command_name = self.command_names.get(cmd_code)
+        return self.__command_configs.get(command_name, self.__default_command_config)
+
+    def __write(self, s: socket.socket, tx_msg: bytes, config: dict):
+        """
+        Sends a response, split into several writes if configured.
+        """
+        split_write_bytes = config['split_write_bytes']
+        if not split_write_bytes or len(tx_msg) <= split_write_bytes:
+            s.sendall(tx_msg)
+            return
+
+        for start_idx in range(0, len(tx_msg), split_write_bytes):
+            if start_idx and config['split_write_delay_s']:
+                time.sleep(config['split_write_delay_s'])
+            s.sendall(tx_msg[start_idx:start_idx + split_write_bytes])
+            self.__count('split_writes')
+
+    @classmethod
+    def __validate_delay(cls, delay_s):
+        """
+        Checks a response delay is a number or a distribution with every setting it requires,
+        so a bad config is rejected up front rather than when the first response is sent.
+        """
+        if not isinstance(delay_s, dict):
+            if isinstance(delay_s, bool) or not isinstance(delay_s, (int, float)):
+                raise ValueError(f'Invalid fault delay {delay_s!r}!')
+            return
+
+        distribution = delay_s.get('distribution', 'constant')
+        required_keys = cls.delay_distribution_keys.get(distribution)
+        if required_keys is None:
+            raise ValueError(f'Unknown delay distribution {distribution}!')
+        unknown_keys = set(delay_s.keys()) - {'distribution', *required_keys}
+        if unknown_keys:
+            raise ValueError(
+                f'Unknown {distribution} delay settings {unknown_keys}!')
+        for key in required_keys:
+            value = delay_s.get(key)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(
+                    f'{distribution} delay requires a numeric {key}, got {value!r}!')
+        if distribution == 'exponential' and delay_s['mean_s'] <= 0:
+            raise ValueError('Exponential delay mean_s must be greater than zero!')
+
+    def __draw_delay(self, delay_s) -> float:
+        """
+        Draws a response delay from a fixed value or distribution.
+        """
+        if not isinstance(delay_s, dict):
+            return float(delay_s)
+
+        distribution = delay_s.get('distribution', 'constant')
+        with self.__lock:
+            if distribution == 'constant':
+                value_s = delay_s['value_s']
+            elif distribution == 'uniform':
+                value_s = self.__random.uniform(
+                    delay_s['low_s'], delay_s['high_s'])
+            elif distribution == 'exponential':
+                value_s = self.__random.expovariate(1 / delay_s['mean_s'])
+            elif distribution == 'normal':
+                value_s = self.__random.gauss(
+                    delay_s['mean_s'], delay_s['stddev_s'])
+            else:
+                raise ValueError(
+                    f'Unknown delay distribution {distribution}!')
+        return max(value_s, 0.0)
+
+    def __chance(self, probability: float) -> bool:
+        if probability <= 0:
+            return False
+        with self.__lock:
+            return self.__random.random() < probability
+
+    def __randrange(self, stop: int) -> int:
+        if stop <= 0:
+            return 0
+        with self.__lock:
+            return self.__random.randrange(stop)
+
+    def __count(self, stat: str, num: int = 1):
+        with self.__lock:
+            self.__stats[stat] += num
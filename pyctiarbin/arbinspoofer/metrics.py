@@ -0,0 +1,167 @@
+import threading
+import time
+from pyctiarbin.histogram import LatencyHistogram
+
+# Upper bounds of the service time buckets in seconds. Finer than the default latency buckets
+# as the spoofer answers most requests in microseconds.
+SERVICE_TIME_BUCKETS_S = (
+    0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+
+class CommandMetrics:
+    """
+    Traffic counters and service time histogram for a single command.
+    """
+    __slots__ = ('requests', 'bytes_in', 'bytes_out', 'service_time')
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.service_time = LatencyHistogram(SERVICE_TIME_BUCKETS_S)
+
+
+class SpooferMetrics:
+    """
+    Server side traffic metrics for an ArbinSpoofer: requests, bytes in and out and request
+    service times per command, plus open and total connections. Used to tell when the spoofer,
+    rather than the client, is the bottleneck of a load test.
+    """
+
+    def __init__(self):
+        """
+        Creates the metrics with every counter at zero.
+        """
+        self.__lock = threading.Lock()
+        self.__start_time = time.monotonic()
+        self.__commands = {}
+        self.__active_connections = 0
+        self.__total_connections = 0
+
+    def record_request(self, command_name: str, service_time_s: float, bytes_in: int, bytes_out: int):
+        """
+        Records a serviced request.
+
+        Parameters
+        ----------
+        command_name : str
+            The name of the request command, e.g. `ChannelInfo`.
+        service_time_s : float
+            How long it took to generate the response.
+        bytes_in : int
+            The size of the request.
+        bytes_out : int
+            The size of the response.
+        """
+        with self.__lock:
+            command_metrics = self.__commands.get(command_name)
+            if command_metrics is None:
+                command_metrics = self.__commands[command_name] = CommandMetrics()
+            command_metrics.requests += 1
+            command_metrics.bytes_in += bytes_in
+            command_metrics.bytes_out += bytes_out
+            command_metrics.service_time.record(service_time_s)
+
+    def connection_opened(self):
+        """
+        Records a client connecting.
+        """
+        with self.__lock:
+            self.__active_connections += 1
+            self.__total_connections += 1
+
+    def connection_closed(self):
+        """
+        Records a client connection closing.
+        """
+        with self.__lock:
+            self.__active_connections -= 1
+
+    def reset(self):
+        """
+        Resets the request counters and histograms, and restarts the rate interval. Connection
+        counts are kept.
+        """
+        with self.__lock:
+            self.__start_time = time.monotonic()
+            self.__commands = {}
+
+    def get_metrics(self) -> dict:
+        """
+        Returns the metrics since the spoofer started or the metrics were last reset.
+
+        Returns
+        -------
+        metrics : dict
+            The `interval_s` the metrics cover, `active_connections`, `total_connections`,
+            `requests`, `requests_per_s`, `bytes_in` and `bytes_out` over every command, and
+            `commands` with the same counters plus a `service_time` histogram summary keyed
+            on command name.
+        """
+        with self.__lock:
+            interval_s = time.monotonic() - self.__start_time
+            commands = {
+                command_name: {
+                    'requests': command_metrics.requests,
+                    'requests_per_s': command_metrics.requests / interval_s if interval_s > 0 else 0.0,
+                    'bytes_in': command_metrics.bytes_in,
+                    'bytes_out': command_metrics.bytes_out,
+                    'service_time': command_metrics.service_time.to_dict(),
+                }
+                for command_name, command_metrics in self.__commands.items()}
+            requests = sum(command['requests']
+                           for command in commands.values())
+            return {
+                'interval_s': interval_s,
+                'active_connections': self.__active_connections,
+                'total_connections': self.__total_connections,
+                'requests': requests,
+                'requests_per_s': requests / interval_s if interval_s > 0 else 0.0,
+                'bytes_in': sum(command['bytes_in'] for command in commands.values()),
+                'bytes_out': sum(command['bytes_out'] for command in commands.values()),
+                'commands': commands,
+            }
+
+    def to_text(self) -> str:
+        """
+        Returns the metrics as plain text, one `name{labels} value` line per value, in the
+        Prometheus exposition format.
+
+        Returns
+        -------
+        text : str
+            The metrics text.
+        """
+        metrics = self.get_metrics()
+        lines = [
+            '# TYPE pycti_spoofer_active_connections gauge',
+            f'pycti_spoofer_active_connections {metrics["active_connections"]}',
+            '# TYPE pycti_spoofer_connections_total counter',
+            f'pycti_spoofer_connections_total {metrics["total_connections"]}',
+        ]
+        for name, key in (('requests_total', 'requests'),
+                          ('bytes_in_total', 'bytes_in'),
+                          ('bytes_out_total', 'bytes_out')):
+            lines.append(f'# TYPE pycti_spoofer_{name} counter')
+            lines.extend(f'pycti_spoofer_{name}{{command="{command_name}"}} {command[key]}'
+                         for command_name, command in metrics['commands'].items())
+        lines.append('# TYPE pycti_spoofer_requests_per_second gauge')
+        lines.extend(f'pycti_spoofer_requests_per_second{{command="{command_name}"}} {command["requests_per_s"]}'
+                     for command_name, command in metrics['commands'].items())
+
+        lines.append('# TYPE pycti_spoofer_service_time_seconds histogram')
+        for command_name, command in metrics['commands'].items():
+            service_time = command['service_time']
+            cumulative_count = 0
+            for upper_s, bucket_count in service_time['buckets'].items():
+                cumulative_count += bucket_count
+                le = '+Inf' if upper_s == float('inf') else repr(upper_s)
+                lines.append(
+                    f'pycti_spoofer_service_time_seconds_bucket{{command="{command_name}",le="{le}"}} {cumulative_count}')
+            lines.append(
+                f'pycti_spoofer_service_time_seconds_sum{{command="{command_name}"}} {service_time["sum_s"]}')
+            lines.append(
+                f'pycti_spoofer_service_time_seconds_count{{command="{command_name}"}} {service_time["count"]}')
+        return '\n'.join(lines) + '\n'
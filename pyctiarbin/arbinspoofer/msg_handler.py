@@ -0,0 +1,201 @@
+import struct
+import time
+from pyctiarbin.messages import Msg, MessageABC, COMMAND_NAMES
+from .channel_data import ChannelData
+
+
+class ClientMsgHandler:
+    """
+    Generates the ArbinSpoofer responses to client messages. Shared by every connection to
+    a spoofer regardless of how the connections are served.
+    """
+
+    rx_msg_length_format = MessageABC.base_template['msg_length']['format']
+    rx_msg_length_start_byte = MessageABC.base_template['msg_length']['start_byte']
+    rx_msg_length_end_byte = MessageABC.base_template['msg_length']['start_byte'] + struct.calcsize(
+        rx_msg_length_format)
+
+    cmd_code_format = MessageABC.base_template['command_code']['format']
+    cmd_code_start_byte = MessageABC.base_template['command_code']['start_byte']
+
+    # Name of each client command code, used to configure and report per command behaviour.
+    command_names = COMMAND_NAMES
+
+    def __init__(self, channel_data: ChannelData, simulation=None, cycler_sn: str = '00000000',
+                 state_machine=None, metrics=None):
+        """
+        Creates a message handler.
+
+        Parameters
+        ----------
+        channel_data : ChannelData
+            The channel data to answer channel info requests from.
+        simulation : *optional* : CellSimulation
+            Notified of schedule assignments, test starts and stops, and meta variables
+            so the simulated channel readings can react to them.
+        cycler_sn : *optional* : str
+            The cycler serial number sent in login responses.
+        state_machine : *optional* : ChannelStateMachine
+            Tracks the schedule and test state of every channel and decides the result of
+            schedule, test and meta variable requests. It notifies the simulation itself.
+            Without it every request succeeds.
+        metrics : *optional* : SpooferMetrics
+            Records the command, size and service time of every request.
+        """
+        self.__channel_data = channel_data
+        self.__simulation = simulation
+        self.__cycler_sn = cycler_sn
+        self.__state_machine = state_machine
+        self.__metrics = metrics
+
+    @classmethod
+    def extract_client_msgs(cls, rx_buffer: bytearray) -> list:
+        """
+        Removes every complete client message from the front of the passed buffer. Client
+        messages can arrive split across several reads or several to a read when requests
+        are pipelined. The client message length does not include the header and length fields.
+
+        Parameters
+        ----------
+        rx_buffer : bytearray
+            Bytes received from the client. Complete messages are removed from it.
+
+        Returns
+        -------
+        rx_msgs : list
+            The complete messages in the order they were received.
+        """
+        rx_msgs = []
+        start_idx = 0
+        while len(rx_buffer) - start_idx >= cls.rx_msg_length_end_byte:
+            expected_rx_msg_len = struct.unpack_from(
+                cls.rx_msg_length_format, rx_buffer, start_idx + cls.rx_msg_length_start_byte)[0] + cls.rx_msg_length_end_byte
+            if len(rx_buffer) - start_idx < expected_rx_msg_len:
+                break
+            rx_msgs.append(
+                bytes(rx_buffer[start_idx:start_idx + expected_rx_msg_len]))
+            start_idx += expected_rx_msg_len
+        del rx_buffer[:start_idx]
+        return rx_msgs
+
+    def process_client_msg(self, rx_msg) -> bytes:
+        """
+        Takes the incoming client message and generates a response.
+
+        Parameters
+        ----------
+        rx_msg : bytearray
+            The client message received.
+
+        Returns
+        -------
+        tx_msg : PyBytesObject
+            The client response.
+        """
+
+        # Determine command code to sort message
+        if len(rx_msg) < self.cmd_code_start_byte + struct.calcsize(self.cmd_code_format):
+            return bytearray([])
+        cmd_code = struct.unpack_from(
+            self.cmd_code_format, rx_msg, self.cmd_code_start_byte)[0]
+
+        if self.__metrics is None:
+            return self.__generate_response(cmd_code, rx_msg)
+
+        start_time = time.perf_counter()
+        tx_msg = self.__generate_response(cmd_code, rx_msg)
+        self.__metrics.record_request(self.command_names.get(cmd_code, 'Unknown'),
+                                      time.perf_counter() - start_time, len(rx_msg), len(tx_msg))
+        return tx_msg
+
+    def __generate_response(self, cmd_code: int, rx_msg) -> bytes:
+        """
+        Generates the response to a client message.
+
+        Parameters
+        ----------
+        cmd_code : int
+            The command code of the client message.
+        rx_msg : bytearray
+            The client message received.
+
+        Returns
+        -------
+        tx_msg : PyBytesObject
+            The client response.
+        """
+        if cmd_code == Msg.Login.Client.command_code:
+            rx_msg_dict = Msg.Login.Client.unpack(rx_msg)
+            tx_msg = Msg.Login.Server.pack(
+                {'num_channels': self.__channel_data.num_channels, 'cycler_sn': self.__cycler_sn})
+        elif cmd_code == Msg.ChannelInfo.Client.command_code:
+            rx_msg_dict = Msg.ChannelInfo.Client.unpack(rx_msg)
+            if self.__state_machine:
+                self.__state_machine.refresh(rx_msg_dict['channel'])
+            tx_msg = self.__channel_data.fetch_channel_frame(
+                rx_msg_dict['channel'])
+        elif cmd_code == Msg.AssignSchedule.Client.command_code:
+            rx_msg_dict = Msg.AssignSchedule.Client.unpack(rx_msg)
+            if rx_msg_dict['assign_all_channels'] == '\x01':
+                # A separate response is sent for every channel when assigning all channels.
+                channels = list(range(self.__channel_data.num_channels))
+            else:
+                channels = [rx_msg_dict['channel']]
+            tx_msgs = []
+            for channel in channels:
+                result = 0
+                if self.__state_machine:
+                    result = self.__state_machine.assign_schedule(
+                        channel, rx_msg_dict['schedule'])
+                elif self.__simulation:
+                    self.__simulation.assign_schedule(
+                        channel, rx_msg_dict['schedule'])
+                tx_msgs.append(Msg.AssignSchedule.Server.pack(
+                    {'channel': channel, 'result': chr(result)}))
+            tx_msg = b''.join(tx_msgs)
+        elif cmd_code == Msg.StartSchedule.Client.command_code:
+            rx_msg_dict = Msg.StartSchedule.Client.unpack(rx_msg)
+            channels = Msg.StartSchedule.Client.unpack_channels(rx_msg)
+            result, channel = 0, rx_msg_dict['channel']
+            if self.__state_machine:
+                # The response names the channel that failed to start.
+                result, channel = self.__state_machine.start_test(
+                    channels, rx_msg_dict['test_name'])
+            elif self.__simulation:
+                for channel in channels:
+                    self.__simulation.start_test(
+                        channel, rx_msg_dict['test_name'])
+            tx_msg = Msg.StartSchedule.Server.pack(
+                {'channel': channel, 'result': chr(result)})
+        elif cmd_code == Msg.StopSchedule.Client.command_code:
+            rx_msg_dict = Msg.StopSchedule.Client.unpack(rx_msg)
+            stop_all_channels = rx_msg_dict['stop_all_channels'] not in (
+                '', '\x00')
+            result = 0
+            if self.__state_machine:
+                result = self.__state_machine.stop_test(
+                    rx_msg_dict['channel'], stop_all_channels)
+            elif self.__simulation:
+                if stop_all_channels:
+                    channels = list(range(self.__channel_data.num_channels))
+                else:
+                    channels = [rx_msg_dict['channel']]
+                for channel in channels:
+                    self.__simulation.stop_test(channel)
+            tx_msg = Msg.StopSchedule.Server.pack(
+                {'channel': rx_msg_dict['channel'], 'result': chr(result)})
+        elif cmd_code == Msg.SetMetaVariable.Client.command_code:
+            rx_msg_dict = Msg.SetMetaVariable.Client.unpack(rx_msg)
+            result = 0
+            if self.__state_machine:
+                result = self.__state_machine.set_meta_variable(
+                    rx_msg_dict['channel'], rx_msg_dict['mv_meta_code'], rx_msg_dict['mv_data'])
+            elif self.__simulation:
+                self.__simulation.set_meta_variable(
+                    rx_msg_dict['channel'], rx_msg_dict['mv_meta_code'], rx_msg_dict['mv_data'])
+            tx_msg = Msg.SetMetaVariable.Server.pack(
+                {'channel': rx_msg_dict['channel'], 'result': chr(result)})
+        else:
+            tx_msg = bytearray([])
+
+        return tx_msg
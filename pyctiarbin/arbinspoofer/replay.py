@@ -0,0 +1,143 @@
+import bisect
+import logging
+import struct
+import threading
+import time
+from pyctiarbin.capture import read_capture
+from pyctiarbin.messages import Msg, MessageABC
+from .channel_data import ChannelData
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayChannelData(ChannelData):
+    """
+    ChannelData that serves recorded `ChannelInfo.Server` frames from a capture file
+    instead of the static channel readings. Channels that do not appear in the capture
+    fall back to the static readings.
+    """
+
+    replay_modes = ('sequential', 'clock')
+
+    def __init__(self, num_channels, capture_path: str, mode: str = 'sequential', speed: float = 1.0, loop: bool = True):
+        """
+        Loads the capture file and groups the recorded frames by channel.
+
+        Parameters
+        ----------
+        num_channels : int
+            Number of channels in our hypothetical Arbin cycler.
+        capture_path : str
+            Path to a capture file written with `pyctiarbin.capture.CaptureWriter`.
+        mode : *optional* : str
+            `sequential` returns the next recorded frame for a channel on every request.
+            `clock` returns the latest frame recorded at or before the replay clock, which
+            starts on the first channel info request. Defaults to `sequential`.
+        speed : *optional* : float
+            How much faster than real time the replay clock runs in `clock` mode. Defaults to 1.
+        loop : *optional* : bool
+            Whether to start over from the beginning of the capture once it is exhausted.
+            Defaults to True.
+        """
+        super().__init__(num_channels)
+
+        if mode not in self.replay_modes:
+            raise ValueError(
+                f'Unknown replay mode {mode}! Must be one of {self.replay_modes}')
+        if speed <= 0:
+            raise ValueError('Replay speed must be greater than zero!')
+
+        self.__mode = mode
+        self.__speed = speed
+        self.__loop = loop
+        self.__replay_lock = threading.Lock()
+        self.__clock_start = None
+
+        self.__frames = {}
+        self.__timestamps = {}
+        self.__frame_idx = {}
+        self.__load_capture(capture_path)
+
+    def __load_capture(self, capture_path: str):
+        """
+        Reads all of the channel info frames out of the capture file.
+
+        Parameters
+        ----------
+        capture_path : str
+            Path to the capture file.
+        """
+        cmd_code_item = MessageABC.base_template['command_code']
+        channel_item = Msg.ChannelInfo.Server.msg_specific_template['channel']
+
+        records = []
+        for timestamp, frame in read_capture(capture_path):
+            cmd_code = struct.unpack_from(
+                cmd_code_item['format'], frame, cmd_code_item['start_byte'])[0]
+            if cmd_code != Msg.ChannelInfo.Server.command_code:
+                continue
+            channel = struct.unpack_from(
+                channel_item['format'], frame, channel_item['start_byte'])[0]
+            records.append((timestamp, channel, bytes(frame)))
+
+        # Frames are served per channel in timestamp order regardless of capture order.
+        records.sort(key=lambda record: record[0])
+        self.__capture_start = records[0][0] if records else 0.0
+        self.__capture_duration = (records[-1][0] - records[0][0]) if records else 0.0
+
+        for timestamp, channel, frame in records:
+            self.__frames.setdefault(channel, []).append(frame)
+            self.__timestamps.setdefault(channel, []).append(
+                timestamp - self.__capture_start)
+            self.__frame_idx[channel] = 0
+
+        logger.info(
+            f'Loaded {len(records)} channel info frames for {len(self.__frames)} channels from {capture_path}')
+
+    def replay_channels(self) -> list:
+        """
+        Returns the list of channels that have recorded frames in the capture.
+        """
+        return sorted(self.__frames.keys())
+
+    def fetch_channel_frame(self, channel) -> bytes:
+        """
+        Returns the recorded channel info frame for the specified channel. Falls back to
+        the static readings if the channel is not in the capture. Once the capture is
+        exhausted and looping is disabled the last recorded frame is held.
+
+        Parameters
+        ----------
+        channel : int
+            The channel to return the frame for.
+
+        Returns
+        -------
+        frame : bytes
+            The packed channel info response.
+        """
+        frames = self.__frames.get(channel)
+        if not frames:
+            return super().fetch_channel_frame(channel)
+
+        with self.__replay_lock:
+            if self.__mode == 'sequential':
+                idx = self.__frame_idx[channel]
+                if idx >= len(frames):
+                    if not self.__loop:
+                        return frames[-1]
+                    idx = 0
+                self.__frame_idx[channel] = idx + 1
+            else:
+                if self.__clock_start is None:
+                    self.__clock_start = time.perf_counter()
+                replay_time = (time.perf_counter() -
+                               self.__clock_start) * self.__speed
+                if self.__loop and self.__capture_duration > 0:
+                    replay_time %= self.__capture_duration
+                # Latest frame at or before the replay clock. Before the first frame of a
+                # channel we serve its first frame.
+                idx = max(bisect.bisect_right(
+                    self.__timestamps[channel], replay_time) - 1, 0)
+
+        return frames[idx]
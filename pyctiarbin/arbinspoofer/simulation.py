@@ -0,0 +1,345 @@
+import logging
+import threading
+from pyctiarbin.messages import Msg
+from .channel_data import ChannelData
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+class CellSimulation:
+    """
+    Simulates a cell on every channel of an ArbinSpoofer with a first order equivalent circuit
+    model: an open circuit voltage that depends on state of charge, a series resistance and a
+    single RC pair. All channels are advanced together as NumPy arrays on a background clock
+    and the results are written to the spoofer's channel readings.
+
+    A started channel is driven at the current set by the `current_mv` meta variable, positive
+    for charge. Current is cut off when the terminal voltage reaches `max_voltage_v` on charge
+    or `min_voltage_v` on discharge, or the cell is full or empty. Requires NumPy.
+    """
+
+    # Meta variable number for each meta variable code.
+    mv_nums = {mv_code: mv_num for mv_num,
+               mv_code in Msg.SetMetaVariable.Client.mv_channel_codes.items()}
+
+    # Channel status codes reported by the simulation.
+    status_idle = 0
+    status_charge = 2
+    status_discharge = 3
+    status_rest = 4
+
+    default_config = {
+        'time_step_s': 1.0,
+        'speed': 1.0,
+        'capacity_ah': 2.0,
+        'initial_soc': 0.5,
+        'series_resistance_ohm': 0.02,
+        'rc_resistance_ohm': 0.015,
+        'rc_capacitance_f': 2000.0,
+        'ocv_min_v': 3.0,
+        'ocv_max_v': 4.15,
+        'min_voltage_v': 2.5,
+        'max_voltage_v': 4.2,
+        'current_mv': 1,
+        'default_current_a': 0.0,
+    }
+
+    def __init__(self, channel_data: ChannelData, config: dict = {}):
+        """
+        Creates the simulation and writes the initial readings. Call `start()` to run the clock.
+
+        Parameters
+        ----------
+        channel_data : ChannelData
+            The channel readings to write the simulated values to.
+        config : *optional* : dict
+            A configuration dictionary. May contain the following keys:
+                time_step_s : *optional* : float
+                    Simulated seconds advanced per tick. Defaults to 1 second.
+                speed : *optional* : float
+                    Simulated seconds per wall clock second. Defaults to 1.
+                capacity_ah : *optional* : float or list
+                    Cell capacity in Ah. Defaults to 2 Ah.
+                initial_soc : *optional* : float or list
+                    Starting state of charge between 0 and 1. Defaults to 0.5.
+                series_resistance_ohm : *optional* : float or list
+                    Series resistance. Defaults to 0.02 ohm.
+                rc_resistance_ohm : *optional* : float or list
+                    RC pair resistance. Defaults to 0.015 ohm.
+                rc_capacitance_f : *optional* : float or list
+                    RC pair capacitance. Defaults to 2000 F.
+                ocv_min_v : *optional* : float or list
+                    Open circuit voltage at 0% state of charge. Defaults to 3.0 V.
+                ocv_max_v : *optional* : float or list
+                    Open circuit voltage at 100% state of charge. Defaults to 4.15 V.
+                min_voltage_v : *optional* : float or list
+                    Discharge cut off voltage. Defaults to 2.5 V.
+                max_voltage_v : *optional* : float or list
+                    Charge cut off voltage. Defaults to 4.2 V.
+                current_mv : *optional* : int
+                    The meta variable that sets the current in A. Defaults to 1.
+                default_current_a : *optional* : float
+                    The current of a started channel before its current meta variable is set.
+                    Defaults to 0 A.
+            Cell parameters can be a single value for every channel or a list with a value per channel.
+        """
+        if np is None:
+            raise ImportError(
+                'The ArbinSpoofer cell simulation requires NumPy. Install it with `pip install pycti-arbin[simulation]`.')
+
+        unknown_keys = set(config.keys()) - set(self.default_config.keys())
+        if unknown_keys:
+            raise ValueError(f'Unknown simulation config keys {unknown_keys}!')
+        config = {**self.default_config, **config}
+
+        self.__channel_data = channel_data
+        self.__num_channels = channel_data.num_channels
+        self.__time_step_s = float(config['time_step_s'])
+        self.__speed = float(config['speed'])
+        self.__current_mv = config['current_mv']
+        self.__default_current_a = float(config['default_current_a'])
+
+        def channel_array(value):
+            return np.broadcast_to(np.asarray(value, dtype=np.float64), (self.__num_channels,)).copy()
+
+        self.__capacity_ah = channel_array(config['capacity_ah'])
+        self.__r0_ohm = channel_array(config['series_resistance_ohm'])
+        self.__r1_ohm = channel_array(config['rc_resistance_ohm'])
+        self.__tau_s = self.__r1_ohm * channel_array(config['rc_capacitance_f'])
+        self.__ocv_min_v = channel_array(config['ocv_min_v'])
+        self.__ocv_max_v = channel_array(config['ocv_max_v'])
+        self.__min_voltage_v = channel_array(config['min_voltage_v'])
+        self.__max_voltage_v = channel_array(config['max_voltage_v'])
+
+        n = self.__num_channels
+        self.__soc = np.clip(channel_array(config['initial_soc']), 0.0, 1.0)
+        self.__v_rc = np.zeros(n)
+        self.__running = np.zeros(n, dtype=bool)
+        self.__setpoint_a = np.zeros(n)
+        self.__current_a = np.zeros(n)
+        self.__voltage_v = self.__ocv(self.__soc)
+        self.__dvdt_vbys = np.zeros(n)
+        self.__test_time_s = np.zeros(n)
+        self.__charge_capacity_ah = np.zeros(n)
+        self.__discharge_capacity_ah = np.zeros(n)
+        self.__charge_energy_wh = np.zeros(n)
+        self.__discharge_energy_wh = np.zeros(n)
+        self.__mv_values = np.zeros((n, len(self.mv_nums)))
+
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__clock_thread = None
+
+        self.__write_readings()
+
+    def start(self):
+        """
+        Starts the background clock that advances the simulation.
+        """
+        if self.__clock_thread is not None and self.__clock_thread.is_alive():
+            return
+        self.__stop.clear()
+        self.__clock_thread = threading.Thread(
+            target=self.__clock_loop, daemon=True)
+        self.__clock_thread.start()
+
+    def stop(self):
+        """
+        Stops the background clock.
+        """
+        self.__stop.set()
+        if self.__clock_thread is not None:
+            self.__clock_thread.join()
+            self.__clock_thread = None
+
+    def step(self, dt_s: float = None):
+        """
+        Advances every channel by one time step and writes the new readings.
+
+        Parameters
+        ----------
+        dt_s : *optional* : float
+            The simulated time to advance in seconds. Defaults to `time_step_s`.
+        """
+        dt_s = self.__time_step_s if dt_s is None else dt_s
+        with self.__lock:
+            current_a = np.where(self.__running, self.__setpoint_a, 0.0)
+
+            # Cut the current off once the terminal voltage would pass the voltage limits
+            # or the cell is completely full or empty.
+            voltage_v = self.__ocv(self.__soc) + self.__v_rc + \
+                current_a * self.__r0_ohm
+            cut_off = ((current_a > 0) & ((voltage_v >= self.__max_voltage_v) | (self.__soc >= 1.0))) | \
+                ((current_a < 0) & ((voltage_v <= self.__min_voltage_v) | (self.__soc <= 0.0)))
+            current_a[cut_off] = 0.0
+
+            self.__soc = np.clip(
+                self.__soc + current_a * dt_s / 3600 / self.__capacity_ah, 0.0, 1.0)
+            decay = np.exp(-dt_s / self.__tau_s)
+            self.__v_rc = decay * self.__v_rc + \
+                self.__r1_ohm * (1 - decay) * current_a
+            voltage_v = self.__ocv(self.__soc) + self.__v_rc + \
+                current_a * self.__r0_ohm
+
+            charge_a = np.maximum(current_a, 0.0)
+            discharge_a = np.maximum(-current_a, 0.0)
+            self.__charge_capacity_ah += charge_a * dt_s / 3600
+            self.__discharge_capacity_ah += discharge_a * dt_s / 3600
+            self.__charge_energy_wh += charge_a * voltage_v * dt_s / 3600
+            self.__discharge_energy_wh += discharge_a * voltage_v * dt_s / 3600
+            self.__test_time_s += np.where(self.__running, dt_s, 0.0)
+
+            self.__dvdt_vbys = (voltage_v - self.__voltage_v) / dt_s
+            self.__voltage_v = voltage_v
+            self.__current_a = current_a
+
+        self.__write_readings()
+
+    def assign_schedule(self, channel: int, schedule_name: str):
+        """
+        Handles a schedule being assigned to a channel.
+
+        Parameters
+        ----------
+        channel : int
+            The zero indexed channel.
+        schedule_name : str
+            The name of the assigned schedule.
+        """
+        if 0 <= channel < self.__num_channels:
+            self.__channel_data.update_channel_readings(
+                channel, {'schedule': schedule_name})
+
+    def start_test(self, channel: int, test_name: str):
+        """
+        Handles a test being started on a channel. Resets the test time, capacities and energies.
+
+        Parameters
+        ----------
+        channel : int
+            The zero indexed channel.
+        test_name : str
+            The name of the test.
+        """
+        if not 0 <= channel < self.__num_channels:
+            return
+        with self.__lock:
+            self.__running[channel] = True
+            self.__setpoint_a[channel] = self.__default_current_a
+            self.__test_time_s[channel] = 0.0
+            self.__charge_capacity_ah[channel] = 0.0
+            self.__discharge_capacity_ah[channel] = 0.0
+            self.__charge_energy_wh[channel] = 0.0
+            self.__discharge_energy_wh[channel] = 0.0
+        self.__channel_data.update_channel_readings(
+            channel, {'testname': test_name})
+        self.__write_readings()
+
+    def stop_test(self, channel: int):
+        """
+        Handles the test on a channel being stopped.
+
+        Parameters
+        ----------
+        channel : int
+            The zero indexed channel.
+        """
+        if not 0 <= channel < self.__num_channels:
+            return
+        with self.__lock:
+            self.__running[channel] = False
+            self.__setpoint_a[channel] = 0.0
+            self.__current_a[channel] = 0.0
+        self.__write_readings()
+
+    def set_meta_variable(self, channel: int, mv_meta_code: int, mv_value: float):
+        """
+        Handles a meta variable being set on a channel. Meta variables are only applied
+        while the channel is running.
+
+        Parameters
+        ----------
+        channel : int
+            The zero indexed channel.
+        mv_meta_code : int
+            The meta variable code from `SetMetaVariable.Client.mv_channel_codes`.
+        mv_value : float
+            The meta variable value.
+        """
+        mv_num = self.mv_nums.get(mv_meta_code)
+        if (mv_num is None) or not (0 <= channel < self.__num_channels):
+            return
+        with self.__lock:
+            if not self.__running[channel]:
+                return
+            self.__mv_values[channel, mv_num - 1] = mv_value
+            if mv_num == self.__current_mv:
+                self.__setpoint_a[channel] = mv_value
+
+    def get_meta_variables(self, channel: int) -> dict:
+        """
+        Returns the meta variable values of a channel keyed on meta variable number.
+        """
+        with self.__lock:
+            return {mv_num: float(self.__mv_values[channel, mv_num - 1]) for mv_num in sorted(self.mv_nums.values())}
+
+    def get_soc(self) -> list:
+        """
+        Returns the state of charge of every channel.
+        """
+        with self.__lock:
+            return self.__soc.tolist()
+
+    def __ocv(self, soc):
+        """
+        Open circuit voltage as a function of state of charge, with a steeper knee at low
+        state of charge.
+        """
+        shape = 0.85 * soc + 0.15 * (1 - np.exp(-10 * soc))
+        return self.__ocv_min_v + (self.__ocv_max_v - self.__ocv_min_v) * shape
+
+    def __write_readings(self):
+        """
+        Writes the simulated values of every channel to the channel readings.
+        """
+        with self.__lock:
+            status = np.where(
+                self.__running,
+                np.where(self.__current_a > 0, self.status_charge,
+                         np.where(self.__current_a < 0, self.status_discharge, self.status_rest)),
+                self.status_idle)
+            columns = {
+                'status': status.tolist(),
+                'test_time_s': self.__test_time_s.tolist(),
+                'step_time_s': self.__test_time_s.tolist(),
+                'voltage_v': self.__voltage_v.tolist(),
+                'current_a': self.__current_a.tolist(),
+                'power_w': (self.__voltage_v * self.__current_a).tolist(),
+                'charge_capacity_ah': self.__charge_capacity_ah.tolist(),
+                'discharge_capacity_ah': self.__discharge_capacity_ah.tolist(),
+                'charge_energy_wh': self.__charge_energy_wh.tolist(),
+                'discharge_energy_wh': self.__discharge_energy_wh.tolist(),
+                'internal_resistance_ohm': self.__r0_ohm.tolist(),
+                'dvdt_vbys': self.__dvdt_vbys.tolist(),
+            }
+
+        names = list(columns.keys())
+        for channel, values in enumerate(zip(*columns.values())):
+            self.__channel_data.update_channel_readings(
+                channel, dict(zip(names, values)))
+
+    def __clock_loop(self):
+        """
+        Advances the simulation every `time_step_s / speed` wall clock seconds until stopped.
+        """
+        period_s = self.__time_step_s / self.__speed
+        while not self.__stop.wait(period_s):
+            try:
+                self.step()
+            except Exception:
+                logger.error('Cell simulation step failed!', exc_info=True)
@@ -0,0 +1,272 @@
+import argparse
+import datetime
+import json
+import platform
+import time
+import tracemalloc
+from pyctiarbin.messages import Msg, MessageABC
+
+# Number of aux readings to benchmark ChannelInfo.Server with.
+CHANNEL_INFO_AUX_COUNTS = (0, 16, 128)
+
+
+def codec_cases() -> list:
+    """
+    Returns the message classes and message values to benchmark: every client and server
+    message under `Msg` with its default values, plus `ChannelInfo.Server` with aux readings.
+
+    Returns
+    -------
+    cases : list
+        A `(name, msg_class, msg_values)` tuple per case.
+    """
+    cases = []
+    for msg_name, msg_group in vars(Msg).items():
+        if not isinstance(msg_group, type):
+            continue
+        for side in ('Client', 'Server'):
+            msg_class = getattr(msg_group, side, None)
+            if not (isinstance(msg_class, type) and issubclass(msg_class, MessageABC)):
+                continue
+            if msg_class is Msg.ChannelInfo.Server:
+                for aux_count in CHANNEL_INFO_AUX_COUNTS:
+                    msg_values = {'aux_temperature_count': aux_count,
+                                  'aux_temperature': [25.0] * aux_count,
+                                  'aux_temperature_dt': [0.0] * aux_count}
+                    cases.append(
+                        (f'{msg_name}.{side}[aux={aux_count}]', msg_class, msg_values))
+            else:
+                cases.append((f'{msg_name}.{side}', msg_class, {}))
+    return cases
+
+
+def time_op(op, min_time_s: float = 0.2, repeat: int = 5) -> dict:
+    """
+    Times a function that takes no arguments. The number of calls per batch is calibrated so
+    each batch runs for at least `min_time_s / repeat`, and the fastest batch is reported as
+    it is the least disturbed by the rest of the system.
+
+    Parameters
+    ----------
+    op : callable
+        The function to time.
+    min_time_s : *optional* : float
+        The minimum total time to spend timing.
+    repeat : *optional* : int
+        The number of batches.
+
+    Returns
+    -------
+    timing : dict
+        The `iterations` per batch, `ns_per_op` of the fastest batch and the resulting `ops_per_s`.
+    """
+    batch_time_s = min_time_s / repeat
+    iterations = 1
+    while True:
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            op()
+        elapsed_s = time.perf_counter() - start_time
+        if elapsed_s >= batch_time_s:
+            break
+        iterations *= 2 if elapsed_s <= 0 else max(
+            2, min(10, int(batch_time_s / elapsed_s) + 1))
+
+    best_s = elapsed_s
+    for _ in range(repeat - 1):
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            op()
+        best_s = min(best_s, time.perf_counter() - start_time)
+
+    ns_per_op = best_s / iterations * 1e9
+    return {
+        'iterations': iterations,
+        'ns_per_op': ns_per_op,
+        'ops_per_s': 1e9 / ns_per_op if ns_per_op > 0 else None,
+    }
+
+
+def measure_allocations(op) -> dict:
+    """
+    Measures the memory a single call to a function allocates with `tracemalloc`.
+
+    Parameters
+    ----------
+    op : callable
+        The function to measure.
+
+    Returns
+    -------
+    allocations : dict
+        The `peak_alloc_bytes` allocated at once during the call, and the `retained_bytes`
+        still allocated after it.
+    """
+    op()
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        start_bytes = tracemalloc.get_traced_memory()[0]
+        result = op()
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return {
+        'peak_alloc_bytes': peak_bytes - start_bytes,
+        'retained_bytes': current_bytes - start_bytes,
+    }
+
+
+def run_codec_benchmarks(min_time_s: float = 0.2, repeat: int = 5, name_filter: str = None) -> dict:
+    """
+    Benchmarks `pack()` and `unpack()` of every message class.
+
+    Parameters
+    ----------
+    min_time_s : *optional* : float
+        The minimum time to spend timing each operation.
+    repeat : *optional* : int
+        The number of timed batches of each operation.
+    name_filter : *optional* : str
+        Only run cases whose name contains this string.
+
+    Returns
+    -------
+    results : dict
+        `metadata` describing the run and `results` keyed on `<case>.pack` and `<case>.unpack`,
+        each with the `msg_bytes`, timing and allocations of the operation.
+    """
+    results = {}
+    for name, msg_class, msg_values in codec_cases():
+        if name_filter and name_filter not in name:
+            continue
+        msg_bin = bytes(msg_class.pack(msg_values))
+        for op_name, op in (('pack', lambda: msg_class.pack(msg_values)),
+                            ('unpack', lambda: msg_class.unpack(msg_bin))):
+            results[f'{name}.{op_name}'] = {
+                'msg_bytes': len(msg_bin),
+                **time_op(op, min_time_s, repeat),
+                **measure_allocations(op),
+            }
+
+    return {
+        'metadata': {
+            'benchmark': 'codec',
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'min_time_s': min_time_s,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare_results(baseline: dict, current: dict) -> dict:
+    """
+    Compares the timings of two benchmark runs, e.g. from two commits.
+
+    Parameters
+    ----------
+    baseline : dict
+        The results of the baseline run.
+    current : dict
+        The results of the run to compare against the baseline.
+
+    Returns
+    -------
+    comparison : dict
+        The baseline and current `ns_per_op` and the `change` as a fraction of the baseline,
+        negative if faster, keyed on operation. Only operations in both runs are compared.
+    """
+    comparison = {}
+    for name, result in current['results'].items():
+        baseline_result = baseline['results'].get(name)
+        if baseline_result is None:
+            continue
+        comparison[name] = {
+            'baseline_ns_per_op': baseline_result['ns_per_op'],
+            'ns_per_op': result['ns_per_op'],
+            'change': result['ns_per_op'] / baseline_result['ns_per_op'] - 1,
+        }
+    return comparison
+
+
+def format_results(results: dict, comparison: dict = None) -> str:
+    """
+    Formats benchmark results as a table.
+
+    Parameters
+    ----------
+    results : dict
+        The results from `run_codec_benchmarks()`.
+    comparison : *optional* : dict
+        The comparison from `compare_results()` to add a change column.
+
+    Returns
+    -------
+    table : str
+        The formatted table.
+    """
+    lines = [f'{"operation":<40} {"bytes":>7} {"ns/op":>12} {"ops/s":>12} {"peak alloc":>11}' +
+             (f' {"change":>8}' if comparison is not None else '')]
+    for name, result in results['results'].items():
+        line = (f'{name:<40} {result["msg_bytes"]:>7} {result["ns_per_op"]:>12.0f} '
+                f'{result["ops_per_s"]:>12.0f} {result["peak_alloc_bytes"]:>11}')
+        if comparison is not None:
+            change = comparison.get(name, {}).get('change')
+            line += f' {change:>+8.1%}' if change is not None else f' {"":>8}'
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the codec benchmark arguments to an argument parser.
+    """
+    parser.add_argument('--output', '-o',
+                        help='Path of a JSON file to write the results to.')
+    parser.add_argument('--compare',
+                        help='Path of a JSON results file to compare against.')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='Minimum seconds to spend timing each operation.')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of timed batches of each operation.')
+    parser.add_argument('--filter',
+                        help='Only run cases whose name contains this string.')
+
+
+def run(args: argparse.Namespace) -> dict:
+    """
+    Runs the codec benchmarks from parsed arguments, prints the results and writes them to
+    the output file if one was given.
+    """
+    results = run_codec_benchmarks(
+        min_time_s=args.min_time, repeat=args.repeat, name_filter=args.filter)
+
+    comparison = None
+    if args.compare:
+        with open(args.compare) as f:
+            comparison = compare_results(json.load(f), results)
+    print(format_results(results, comparison))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+    return results
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark pack() and unpack() of every pycti-arbin message.')
+    add_arguments(parser)
+    run(parser.parse_args(argv))
+
+
+if __name__ == '__main__':
+    main()
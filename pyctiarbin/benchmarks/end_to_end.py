@@ -0,0 +1,291 @@
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import socket
+import threading
+import time
+from pyctiarbin import CyclerInterface
+from pyctiarbin.arbinspoofer import ArbinSpoofer
+
+# Relative weight of each request type when no request mix is passed.
+DEFAULT_REQUEST_MIX = {
+    'read_channel_status': 0.9,
+    'set_meta_variable': 0.1,
+}
+
+REQUEST_TYPES = ('read_channel_status', 'set_meta_variable',
+                 'assign_schedule', 'start_test')
+
+# Percentiles reported for every latency distribution.
+LATENCY_PERCENTILES = (50, 90, 99, 99.9)
+
+
+def find_free_port(ip: str = '127.0.0.1') -> int:
+    """
+    Returns a port that is free to bind to on the passed IP address.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((ip, 0))
+        return s.getsockname()[1]
+
+
+def summarize_latencies(latencies_s: list) -> dict:
+    """
+    Summarizes latencies with exact nearest rank percentiles.
+
+    Parameters
+    ----------
+    latencies_s : list
+        The latencies in seconds.
+
+    Returns
+    -------
+    summary : dict
+        The `count`, `mean_s`, `max_s` and a `p<percentile>_s` entry for each of
+        `LATENCY_PERCENTILES`, e.g. `p99.9_s`. Latencies are None if there are none.
+    """
+    latencies_s = sorted(latencies_s)
+    count = len(latencies_s)
+    summary = {
+        'count': count,
+        'mean_s': sum(latencies_s) / count if count else None,
+        'max_s': latencies_s[-1] if count else None,
+    }
+    for percent in LATENCY_PERCENTILES:
+        # Round off float error so e.g. p99.9 of 1000 values is the 999th value.
+        rank = max(1, math.ceil(round(percent / 100 * count, 6)))
+        summary[f'p{percent:g}_s'] = latencies_s[rank - 1] if count else None
+    return summary
+
+
+def run_end_to_end_benchmark(num_connections: int = 4, num_channels: int = 16, duration_s: float = 5.0,
+                             warmup_s: float = 1.0, request_mix: dict = None, server_mode: str = 'threaded',
+                             seed: int = 0, spoofer_config: dict = {}) -> dict:
+    """
+    Starts an `ArbinSpoofer` on localhost and drives it with `CyclerInterface` connections,
+    each from its own thread, issuing a random mix of requests back to back.
+
+    Parameters
+    ----------
+    num_connections : *optional* : int
+        The number of client connections.
+    num_channels : *optional* : int
+        The number of spoofer channels. Requests are spread across every channel.
+    duration_s : *optional* : float
+        How long to measure for, after the warm up.
+    warmup_s : *optional* : float
+        How long to issue requests for before measuring.
+    request_mix : *optional* : dict
+        The relative weight of each request type keyed on request type, one of
+        `read_channel_status`, `set_meta_variable`, `assign_schedule` or `start_test`.
+        Defaults to `DEFAULT_REQUEST_MIX`.
+    server_mode : *optional* : str
+        The spoofer server mode, `threaded` or `selector`.
+    seed : *optional* : int
+        Seed for the request mix so runs are reproducible.
+    spoofer_config : *optional* : dict
+        Any other `ArbinSpoofer` config settings, e.g. `faults`.
+
+    Returns
+    -------
+    results : dict
+        `metadata` describing the run, the total `requests`, `errors` and `requests_per_s`,
+        a `latency` summary (see `summarize_latencies()`), the same per request type under
+        `requests_by_type`, and the spoofer's own view of the load under `spoofer`.
+    """
+    request_mix = dict(request_mix or DEFAULT_REQUEST_MIX)
+    unknown_types = set(request_mix.keys()) - set(REQUEST_TYPES)
+    if unknown_types:
+        raise ValueError(f'Unknown request types {unknown_types}!')
+    request_types = list(request_mix.keys())
+    request_weights = list(request_mix.values())
+
+    # The spoofer accepts any credentials.
+    os.environ.setdefault('ARBIN_CTI_USERNAME', 'benchmark')
+    os.environ.setdefault('ARBIN_CTI_PASSWORD', 'benchmark')
+
+    ip = '127.0.0.1'
+    port = find_free_port(ip)
+    arbin_spoofer = ArbinSpoofer({**spoofer_config, 'ip': ip, 'port': port, 'num_channels': num_channels,
+                                  'server_mode': server_mode, 'metrics': True})
+    arbin_spoofer.start()
+
+    cycler_interfaces = [CyclerInterface({'ip_address': ip, 'port': port})
+                         for _ in range(num_connections)]
+    start_barrier = threading.Barrier(num_connections + 1)
+    # One (request type, latency, success) list per connection so threads never share state.
+    connection_records = [[] for _ in range(num_connections)]
+    times = {}
+
+    def connection_loop(idx: int):
+        cycler_interface = cycler_interfaces[idx]
+        rng = random.Random(seed * 1000003 + idx)
+        records = connection_records[idx]
+        start_barrier.wait()
+        while time.perf_counter() < times['end']:
+            request_type = rng.choices(request_types, request_weights)[0]
+            channel = rng.randrange(num_channels) + 1
+            start_time = time.perf_counter()
+            if request_type == 'read_channel_status':
+                success = bool(cycler_interface.read_channel_status(channel))
+            elif request_type == 'set_meta_variable':
+                success = cycler_interface.set_meta_variables_on_channels(
+                    {channel: {1: rng.random()}}) == {channel: {1: 'success'}}
+            elif request_type == 'assign_schedule':
+                success = cycler_interface.assign_schedule_to_channels(
+                    [channel], 'benchmark.sdx')[channel] is not None
+            else:
+                success = cycler_interface.start_test_on_channels(
+                    [channel], 'benchmark')[channel] is not None
+            end_time = time.perf_counter()
+            if start_time >= times['measure']:
+                records.append(
+                    (request_type, end_time - start_time, success))
+
+    threads = [threading.Thread(target=connection_loop, args=(idx,), daemon=True)
+               for idx in range(num_connections)]
+    for thread in threads:
+        thread.start()
+
+    times['measure'] = time.perf_counter() + warmup_s
+    times['end'] = times['measure'] + duration_s
+    start_barrier.wait()
+    time.sleep(warmup_s)
+    spoofer_metrics_start = arbin_spoofer.get_metrics()
+    for thread in threads:
+        thread.join()
+    spoofer_metrics_end = arbin_spoofer.get_metrics()
+
+    del cycler_interfaces
+    arbin_spoofer.stop()
+
+    records = [record for records in connection_records for record in records]
+    requests_by_type = {}
+    for request_type in request_types:
+        type_records = [
+            record for record in records if record[0] == request_type]
+        requests_by_type[request_type] = {
+            'requests': len(type_records),
+            'errors': sum(not record[2] for record in type_records),
+            'requests_per_s': len(type_records) / duration_s,
+            'latency': summarize_latencies([record[1] for record in type_records]),
+        }
+
+    spoofer_requests = spoofer_metrics_end['requests'] - \
+        spoofer_metrics_start['requests']
+    return {
+        'metadata': {
+            'benchmark': 'end_to_end',
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'num_connections': num_connections,
+            'num_channels': num_channels,
+            'duration_s': duration_s,
+            'warmup_s': warmup_s,
+            'request_mix': request_mix,
+            'server_mode': server_mode,
+            'seed': seed,
+        },
+        'requests': len(records),
+        'errors': sum(not record[2] for record in records),
+        'requests_per_s': len(records) / duration_s,
+        'latency': summarize_latencies([record[1] for record in records]),
+        'requests_by_type': requests_by_type,
+        'spoofer': {
+            'requests': spoofer_requests,
+            'requests_per_s': spoofer_requests / duration_s,
+            'service_time_p99_s': {command_name: command['service_time']['p99_s']
+                                   for command_name, command in spoofer_metrics_end['commands'].items()},
+        },
+    }
+
+
+def format_results(results: dict) -> str:
+    """
+    Formats end to end benchmark results as a table with a row per request type.
+
+    Parameters
+    ----------
+    results : dict
+        The results from `run_end_to_end_benchmark()`.
+
+    Returns
+    -------
+    table : str
+        The formatted table.
+    """
+    def row(name, requests, errors, requests_per_s, latency):
+        def us(value_s):
+            return f'{value_s * 1e6:.0f}' if value_s is not None else '-'
+        return (f'{name:<22} {requests:>9} {errors:>7} {requests_per_s:>10.0f} ' +
+                ' '.join(f'{us(latency[f"p{percent:g}_s"]):>9}' for percent in LATENCY_PERCENTILES))
+
+    lines = [f'{"request":<22} {"requests":>9} {"errors":>7} {"req/s":>10} ' +
+             ' '.join(f'{f"p{percent:g} us":>9}' for percent in LATENCY_PERCENTILES)]
+    for request_type, result in results['requests_by_type'].items():
+        lines.append(row(request_type, result['requests'], result['errors'],
+                         result['requests_per_s'], result['latency']))
+    lines.append(row('total', results['requests'], results['errors'],
+                     results['requests_per_s'], results['latency']))
+    return '\n'.join(lines)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the end to end benchmark arguments to an argument parser.
+    """
+    parser.add_argument('--connections', type=int, default=4,
+                        help='Number of client connections.')
+    parser.add_argument('--channels', type=int, default=16,
+                        help='Number of spoofer channels.')
+    parser.add_argument('--duration', type=float, default=5.0,
+                        help='Seconds to measure for.')
+    parser.add_argument('--warmup', type=float, default=1.0,
+                        help='Seconds to run before measuring.')
+    parser.add_argument('--mix', default=None,
+                        help='Request mix as JSON, e.g. \'{"read_channel_status": 9, "set_meta_variable": 1}\'.')
+    parser.add_argument('--server-mode', choices=['threaded', 'selector'], default='threaded',
+                        help='Spoofer server mode.')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed for the request mix.')
+    parser.add_argument('--output', '-o',
+                        help='Path of a JSON file to write the results to.')
+
+
+def run(args: argparse.Namespace) -> dict:
+    """
+    Runs the end to end benchmark from parsed arguments, prints the results and writes them
+    to the output file if one was given.
+    """
+    results = run_end_to_end_benchmark(
+        num_connections=args.connections,
+        num_channels=args.channels,
+        duration_s=args.duration,
+        warmup_s=args.warmup,
+        request_mix=json.loads(args.mix) if args.mix else None,
+        server_mode=args.server_mode,
+        seed=args.seed)
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+    return results
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark CyclerInterface requests against a local ArbinSpoofer.')
+    add_arguments(parser)
+    run(parser.parse_args(argv))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+
+# Import statements to benchmark keyed on case name.
+IMPORT_CASES = {
+    'package': 'import pyctiarbin',
+    'codec': 'from pyctiarbin import Msg',
+    'cycler_interface': 'from pyctiarbin import CyclerInterface',
+    'channel_interface': 'from pyctiarbin import ChannelInterface',
+}
+
+# Slow to import dependencies that should only be imported on first use, not by any of the
+# import cases.
+LAZY_MODULES = ('pydantic', 'dotenv')
+
+# Runs in a fresh interpreter so nothing is already imported.
+_MEASURE_SCRIPT = '''
+import json, sys, time
+modules_before = set(sys.modules)
+start_time = time.perf_counter()
+exec(sys.argv[1])
+import_time_s = time.perf_counter() - start_time
+print(json.dumps({'import_time_s': import_time_s,
+                  'modules': sorted(set(sys.modules) - modules_before)}))
+'''
+
+
+def measure_import(statement: str, repeat: int = 5) -> dict:
+    """
+    Measures how long an import statement takes in a fresh interpreter.
+
+    Parameters
+    ----------
+    statement : str
+        The import statement, e.g. `import pyctiarbin`.
+    repeat : *optional* : int
+        The number of interpreters to measure in. The fastest is reported.
+
+    Returns
+    -------
+    result : dict
+        The `import_time_s` of the fastest run, the number of `modules` the statement
+        imported and which of `LAZY_MODULES` it imported under `lazy_modules_imported`.
+    """
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', _MEASURE_SCRIPT, statement],
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    fastest_run = min(runs, key=lambda run: run['import_time_s'])
+    return {
+        'import_time_s': fastest_run['import_time_s'],
+        'modules': len(fastest_run['modules']),
+        'lazy_modules_imported': sorted({module.split('.')[0] for module in fastest_run['modules']}
+                                        & set(LAZY_MODULES)),
+    }
+
+
+def run_import_benchmarks(repeat: int = 5) -> dict:
+    """
+    Measures every case in `IMPORT_CASES`.
+
+    Parameters
+    ----------
+    repeat : *optional* : int
+        The number of interpreters to measure each case in.
+
+    Returns
+    -------
+    results : dict
+        `metadata` describing the run and `results` keyed on case name, see `measure_import()`.
+    """
+    return {
+        'metadata': {
+            'benchmark': 'import_time',
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+        },
+        'results': {case_name: {'statement': statement, **measure_import(statement, repeat)}
+                    for case_name, statement in IMPORT_CASES.items()},
+    }
+
+
+def format_results(results: dict) -> str:
+    """
+    Formats import time benchmark results as a table.
+
+    Parameters
+    ----------
+    results : dict
+        The results from `run_import_benchmarks()`.
+
+    Returns
+    -------
+    table : str
+        The formatted table.
+    """
+    lines = [f'{"case":<20} {"ms":>8} {"modules":>8}  lazy modules imported']
+    for case_name, result in results['results'].items():
+        lines.append(f'{case_name:<20} {result["import_time_s"] * 1e3:>8.1f} {result["modules"]:>8}  '
+                     f'{", ".join(result["lazy_modules_imported"]) or "-"}')
+    return '\n'.join(lines)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the import time benchmark arguments to an argument parser.
+    """
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of interpreters to measure each import in.')
+    parser.add_argument('--output', '-o',
+                        help='Path of a JSON file to write the results to.')
+
+
+def run(args: argparse.Namespace) -> dict:
+    """
+    Runs the import time benchmarks from parsed arguments, prints the results and writes them
+    to the output file if one was given.
+    """
+    results = run_import_benchmarks(repeat=args.repeat)
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+    return results
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(
+        description='Measure how long importing pycti-arbin takes in a fresh interpreter.')
+    add_arguments(parser)
+    run(parser.parse_args(argv))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from pyctiarbin import CyclerInterface
+from pyctiarbin.arbinspoofer.farm import SpooferFarm, generate_spoofer_configs
+from pyctiarbin.benchmarks.end_to_end import find_free_port
+
+# Default growth allowed over a soak test before it fails.
+DEFAULT_MAX_RSS_GROWTH_BYTES = 16 * 2**20
+DEFAULT_MAX_TRACED_GROWTH_BYTES = 256 * 2**10
+
+
+def get_rss_bytes() -> int:
+    """
+    Returns the resident set size of this process. Falls back to the peak resident set size
+    where the current size is not available, and None where neither is.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def run_soak_test(num_requests: int = 200000, num_channels: int = 16, warmup_requests: int = 1000,
+                  sample_interval: int = 10000, top_sites: int = 10) -> dict:
+    """
+    Polls a spoofer with `CyclerInterface.read_channel_status()` from a single connection while
+    tracking the memory of this process. The spoofer runs in its own process so only client
+    side memory is measured. Memory is traced with `tracemalloc` from the end of the warm up,
+    so growth is attributed to the lines that allocated it.
+
+    Parameters
+    ----------
+    num_requests : *optional* : int
+        The number of requests to measure, after the warm up.
+    num_channels : *optional* : int
+        The number of spoofer channels. Requests cycle through every channel.
+    warmup_requests : *optional* : int
+        The number of requests made before measuring, so caches and buffers are filled.
+    sample_interval : *optional* : int
+        The number of requests between memory samples.
+    top_sites : *optional* : int
+        The number of call sites with the most memory growth to report.
+
+    Returns
+    -------
+    results : dict
+        `metadata` describing the run, the `requests`, `errors`, `duration_s` and
+        `requests_per_s`, the `rss` and `traced` memory at the `start_bytes` and `end_bytes`
+        of the run with the `growth_bytes` between them, the `samples` taken along the way,
+        `gc` collections per generation, and the `top_sites` with the most traced memory
+        growth, each with its growth in bytes, in blocks and in bytes per request.
+    """
+    # The spoofer accepts any credentials.
+    os.environ.setdefault('ARBIN_CTI_USERNAME', 'benchmark')
+    os.environ.setdefault('ARBIN_CTI_PASSWORD', 'benchmark')
+
+    ip = '127.0.0.1'
+    spoofer_farm = SpooferFarm(generate_spoofer_configs(
+        1, find_free_port(ip), num_channels=num_channels, ip=ip), num_processes=1)
+    spoofer_config = spoofer_farm.start()[0]
+
+    tracing = tracemalloc.is_tracing()
+    errors = 0
+    samples = []
+    try:
+        cycler_interface = CyclerInterface(
+            {'ip_address': ip, 'port': spoofer_config['port']})
+        for idx in range(warmup_requests):
+            cycler_interface.read_channel_status(idx % num_channels + 1)
+
+        gc.collect()
+        if not tracing:
+            tracemalloc.start()
+        snapshot_filters = (tracemalloc.Filter(False, tracemalloc.__file__),
+                            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                            tracemalloc.Filter(False, '<unknown>'))
+        start_snapshot = tracemalloc.take_snapshot().filter_traces(snapshot_filters)
+        start_gc_counts = [generation['collections']
+                           for generation in gc.get_stats()]
+
+        def sample(requests: int):
+            samples.append({'requests': requests,
+                            'rss_bytes': get_rss_bytes(),
+                            'traced_bytes': tracemalloc.get_traced_memory()[0]})
+
+        sample(0)
+        start_time = time.perf_counter()
+        for idx in range(num_requests):
+            if not cycler_interface.read_channel_status(idx % num_channels + 1):
+                errors += 1
+            if (idx + 1) % sample_interval == 0:
+                sample(idx + 1)
+        duration_s = time.perf_counter() - start_time
+
+        gc.collect()
+        sample(num_requests)
+        end_snapshot = tracemalloc.take_snapshot().filter_traces(snapshot_filters)
+        gc_counts = [generation['collections'] - start_count
+                     for generation, start_count in zip(gc.get_stats(), start_gc_counts)]
+        del cycler_interface
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+        spoofer_farm.stop()
+
+    site_stats = end_snapshot.compare_to(start_snapshot, 'lineno')
+    site_stats.sort(key=lambda stat: stat.size_diff, reverse=True)
+    top_site_stats = [stat for stat in site_stats if stat.size_diff > 0][:top_sites]
+
+    def memory_summary(key: str) -> dict:
+        start_bytes, end_bytes = samples[0][key], samples[-1][key]
+        return {
+            'start_bytes': start_bytes,
+            'end_bytes': end_bytes,
+            'growth_bytes': end_bytes - start_bytes if start_bytes is not None else None,
+        }
+
+    return {
+        'metadata': {
+            'benchmark': 'soak',
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'num_requests': num_requests,
+            'num_channels': num_channels,
+            'warmup_requests': warmup_requests,
+        },
+        'requests': num_requests,
+        'errors': errors,
+        'duration_s': duration_s,
+        'requests_per_s': num_requests / duration_s if duration_s > 0 else None,
+        'rss': memory_summary('rss_bytes'),
+        'traced': memory_summary('traced_bytes'),
+        'samples': samples,
+        'gc': {
+            'collections': gc_counts,
+            'collections_per_1k_requests': [count / num_requests * 1000 for count in gc_counts],
+        },
+        'top_sites': [{
+            'site': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+            'size_diff_bytes': stat.size_diff,
+            'count_diff': stat.count_diff,
+            'bytes_per_request': stat.size_diff / num_requests,
+        } for stat in top_site_stats],
+    }
+
+
+def check_results(results: dict, max_rss_growth_bytes: int = DEFAULT_MAX_RSS_GROWTH_BYTES,
+                  max_traced_growth_bytes: int = DEFAULT_MAX_TRACED_GROWTH_BYTES) -> list:
+    """
+    Checks soak test results against growth thresholds.
+
+    Parameters
+    ----------
+    results : dict
+        The results from `run_soak_test()`.
+    max_rss_growth_bytes : *optional* : int
+        The most the resident set size may grow by.
+    max_traced_growth_bytes : *optional* : int
+        The most the memory traced by `tracemalloc` may grow by.
+
+    Returns
+    -------
+    failures : list
+        A message per failed check. Empty if every check passed.
+    """
+    failures = []
+    if results['errors']:
+        failures.append(f'{results["errors"]} requests failed')
+    rss_growth_bytes = results['rss']['growth_bytes']
+    if rss_growth_bytes is not None and rss_growth_bytes > max_rss_growth_bytes:
+        failures.append(
+            f'RSS grew by {rss_growth_bytes} bytes, more than {max_rss_growth_bytes}')
+    traced_growth_bytes = results['traced']['growth_bytes']
+    if traced_growth_bytes > max_traced_growth_bytes:
+        failures.append(
+            f'Traced memory grew by {traced_growth_bytes} bytes, more than {max_traced_growth_bytes}')
+    return failures
+
+
+def format_results(results: dict) -> str:
+    """
+    Formats soak test results as a summary followed by a table of the call sites with the
+    most memory growth.
+
+    Parameters
+    ----------
+    results : dict
+        The results from `run_soak_test()`.
+
+    Returns
+    -------
+    report : str
+        The formatted report.
+    """
+    def kib(value_bytes):
+        return f'{value_bytes / 1024:.1f} KiB' if value_bytes is not None else '-'
+
+    lines = [
+        f'requests: {results["requests"]}  errors: {results["errors"]}  '
+        f'req/s: {results["requests_per_s"]:.0f}',
+        f'rss: {kib(results["rss"]["start_bytes"])} -> {kib(results["rss"]["end_bytes"])} '
+        f'(growth {kib(results["rss"]["growth_bytes"])})',
+        f'traced: {kib(results["traced"]["start_bytes"])} -> {kib(results["traced"]["end_bytes"])} '
+        f'(growth {kib(results["traced"]["growth_bytes"])})',
+        'gc collections per 1k requests: ' +
+        ' '.join(f'{count:.2f}' for count in results['gc']['collections_per_1k_requests']),
+        '',
+        f'{"site":<60} {"growth":>10} {"blocks":>8} {"bytes/req":>10}',
+    ]
+    for site in results['top_sites']:
+        lines.append(f'{site["site"][-60:]:<60} {site["size_diff_bytes"]:>10} '
+                     f'{site["count_diff"]:>8} {site["bytes_per_request"]:>10.3f}')
+    return '\n'.join(lines)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the soak test arguments to an argument parser.
+    """
+    parser.add_argument('--requests', type=int, default=200000,
+                        help='Number of requests to measure.')
+    parser.add_argument('--channels', type=int, default=16,
+                        help='Number of spoofer channels.')
+    parser.add_argument('--warmup', type=int, default=1000,
+                        help='Number of requests to make before measuring.')
+    parser.add_argument('--sample-interval', type=int, default=10000,
+                        help='Number of requests between memory samples.')
+    parser.add_argument('--top', type=int, default=10,
+                        help='Number of call sites to report.')
+    parser.add_argument('--max-rss-growth', type=int, default=DEFAULT_MAX_RSS_GROWTH_BYTES,
+                        help='Bytes the RSS may grow by before failing.')
+    parser.add_argument('--max-traced-growth', type=int, default=DEFAULT_MAX_TRACED_GROWTH_BYTES,
+                        help='Bytes the traced memory may grow by before failing.')
+    parser.add_argument('--output', '-o',
+                        help='Path of a JSON file to write the results to.')
+
+
+def run(args: argparse.Namespace) -> dict:
+    """
+    Runs the soak test from parsed arguments, prints the results and any failed checks, and
+    writes the results to the output file if one was given. The failed checks are added to
+    the results under `failures`.
+    """
+    results = run_soak_test(
+        num_requests=args.requests,
+        num_channels=args.channels,
+        warmup_requests=args.warmup,
+        sample_interval=args.sample_interval,
+        top_sites=args.top)
+    results['failures'] = check_results(
+        results, args.max_rss_growth, args.max_traced_growth)
+    print(format_results(results))
+    for failure in results['failures']:
+        print(f'FAILED: {failure}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+    return results
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(
+        description='Check CyclerInterface for memory growth over a long run against a local ArbinSpoofer.')
+    add_arguments(parser)
+    results = run(parser.parse_args(argv))
+    sys.exit(1 if results['failures'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import struct
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Each capture record is a little-endian float64 timestamp followed by a uint32 frame length
+# and then the raw frame bytes exactly as they came off the wire.
+CAPTURE_RECORD_HEADER = struct.Struct('<dI')
+
+
+class CaptureWriter:
+    """
+    Class for recording raw CTI frames to a capture file that can later be replayed
+    with the `ArbinSpoofer`.
+    """
+
+    def __init__(self, capture_path: str):
+        """
+        Opens a capture file for appending frames to.
+
+        Parameters
+        ----------
+        capture_path : str
+            The path of the capture file to write to. Frames are appended if the file exists.
+        """
+        self.__capture_path = capture_path
+        self.__file = open(capture_path, mode='ab')
+
+    def write(self, frame: bytes, timestamp: float = None):
+        """
+        Appends a raw frame to the capture file.
+
+        Parameters
+        ----------
+        frame : bytes
+            The raw frame to record.
+        timestamp : *optional* : float
+            The time the frame was received in seconds since the epoch. Defaults to now.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        self.__file.write(CAPTURE_RECORD_HEADER.pack(timestamp, len(frame)))
+        self.__file.write(frame)
+
+    def flush(self):
+        """
+        Flushes any buffered frames to disk.
+        """
+        self.__file.flush()
+
+    def close(self):
+        """
+        Closes the capture file.
+        """
+        if not self.__file.closed:
+            self.__file.close()
+            logger.debug(f'Closed capture file {self.__capture_path}')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_capture(capture_path: str):
+    """
+    Generator that reads back the frames recorded in a capture file.
+
+    Parameters
+    ----------
+    capture_path : str
+        The path of the capture file to read.
+
+    Yields
+    ------
+    record : tuple(float, bytes)
+        The timestamp and raw frame of each record in the order they were written.
+    """
+    with open(capture_path, mode='rb') as file:
+        while True:
+            record_header = file.read(CAPTURE_RECORD_HEADER.size)
+            if len(record_header) < CAPTURE_RECORD_HEADER.size:
+                break
+            timestamp, frame_length = CAPTURE_RECORD_HEADER.unpack(
+                record_header)
+            frame = file.read(frame_length)
+            if len(frame) < frame_length:
+                logger.warning(
+                    f'Truncated record at end of capture file {capture_path}')
+                break
+            yield (timestamp, frame)
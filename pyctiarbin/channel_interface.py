@@ -1,7 +1,5 @@
 import logging
 import os
-from pydantic import BaseModel
-from pydantic import field_validator
 from .messages import Msg
 
 from .cycler_interface import CyclerInterface
@@ -14,7 +12,7 @@ class ChannelInterface(CyclerInterface):
     Class for interfacing with Arbin battery cycler at a channel level.
     """
 
-    def __init__(self, config: dict, env_path: str = os.path.join(os.getcwd(), '.env')):
+    def __init__(self, config: dict, env_path: str = os.path.join(os.getcwd(), '.env'), request_hooks: list = None):
         """
         Creates a class instance for interfacing with Arbin battery cycler at a channel level.
 
@@ -40,9 +38,13 @@ class ChannelInterface(CyclerInterface):
         env_path : *optional* : str
             The path to the `.env` file containing the Arbin CTI username,`ARBIN_CTI_USERNAME`, and password, `ARBIN_CTI_PASSWORD`.
             Defaults to looking in the working directory.
+        request_hooks : *optional* : list
+            Request hooks to install before logging in, so the login is also reported. Defaults to none.
+            See `add_request_hook()`.
         """
+        from .config import ChannelInterfaceConfig
         self.__config = ChannelInterfaceConfig(**config)
-        super().__init__(self.__config.model_dump(), env_path)
+        super().__init__(self.__config.model_dump(), env_path, request_hooks)
 
     def read_channel_status(self) -> dict:
         """
@@ -56,6 +58,24 @@ class ChannelInterface(CyclerInterface):
         # Add to channel value to account for zero indexing subtraction in parent method.
         return super().read_channel_status(channel=(self.__config.channel+1))
 
+    def get_cached_channel_status(self, max_age_s: float = None) -> dict:
+        """
+        Returns the most recent status read for the channel defined in the config without
+        communicating with the cycler.
+
+        Parameters
+        ----------
+        max_age_s : *optional* : float
+            The oldest reading to return in seconds. Defaults to returning any reading.
+
+        Returns
+        -------
+        status : dict
+            A dictionary detailing the status of the channel. Empty if there is no reading
+            or the reading is older than `max_age_s`.
+        """
+        return super().get_cached_channel_status(channel=(self.__config.channel+1), max_age_s=max_age_s)
+
     def assign_schedule(self) -> bool:
         """
         Method to assign a schedule to the channel defined in the config.
@@ -71,14 +91,18 @@ class ChannelInterface(CyclerInterface):
             logger.error("Schedule name undefined!")
             return success
 
+        event = self._start_request(
+            Msg.AssignSchedule.Client.command_code, [self.__config.channel+1])
         assign_schedule_msg_tx_bin = Msg.AssignSchedule.Client.pack(
             {'channel': self.__config.channel, 'schedule': self.__config.schedule_name})
         response_msg_bin = self._send_receive_msg(
-            assign_schedule_msg_tx_bin)
+            assign_schedule_msg_tx_bin, event)
 
+        assign_schedule_msg_rx_dict = None
         if response_msg_bin:
             assign_schedule_msg_rx_dict = Msg.AssignSchedule.Server.unpack(
                 response_msg_bin)
+            self._invalidate_cached_channel_status(self.__config.channel+1)
             if assign_schedule_msg_rx_dict['result'] == 'success':
                 success = True
                 logger.info(
@@ -88,12 +112,23 @@ class ChannelInterface(CyclerInterface):
                 logger.error(
                     f'Failed to assign schedule {self.__config.schedule_name}! Issue: {assign_schedule_msg_rx_dict["result"]}')
 
+        self._finish_request(event, assign_schedule_msg_rx_dict)
         return success
 
-    def start_test(self) -> bool:
+    def start_test(self, skip_assigned_schedule: bool = False, max_status_age_s: float = None) -> bool:
         """
         Starts channel on method specified in config.  
 
+        Parameters
+        ----------
+        skip_assigned_schedule : *optional* : bool
+            If True, the schedule is only assigned if the channel status shows a different
+            schedule assigned to the channel. Defaults to False, always assigning the schedule.
+        max_status_age_s : *optional* : float
+            How old a cached channel status can be in seconds to be used for the schedule check.
+            If there is no cached status that recent, a fresh status is read. Defaults to always
+            reading a fresh status.
+
         Returns
         -------
         success : bool
@@ -105,26 +140,71 @@ class ChannelInterface(CyclerInterface):
             logger.error("Test name undefined!")
             return success
 
-        # Make sure the schedule is assigned before starting the test to avoid any funny business
-        if self.assign_schedule():
-            start_test_msg_tx_bin = Msg.StartSchedule.Client.pack(
-                {'channel': self.__config.channel, 'test_name': self.__config.test_name})
-            response_msg_bin = self._send_receive_msg(start_test_msg_tx_bin)
-
-            if response_msg_bin:
-                start_test_msg_rx_dict = Msg.StartSchedule.Server.unpack(
-                    response_msg_bin)
-                if start_test_msg_rx_dict['result'] == 'success':
-                    success = True
-                    logger.info(
-                        f'Successfully started test {self.__config.test_name} with schedule {self.__config.schedule_name} on channel {self.__config.channel}')
-                    logger.debug(start_test_msg_rx_dict)
-                else:
-                    logger.error(
-                        f'Failed to start test {self.__config.test_name} with schedule {self.__config.schedule_name} on channel {self.__config.channel}. Issue: {start_test_msg_rx_dict["result"]}')
+        # Hold the communication lock so no other thread using this interface can change the
+        # channel between checking the assigned schedule and starting the test.
+        with self._comm_lock:
+            if skip_assigned_schedule and self.__is_schedule_assigned(max_status_age_s):
+                logger.info(
+                    f'Schedule {self.__config.schedule_name} already assigned to channel {self.__config.channel}')
+                schedule_assigned = True
+            else:
+                # Make sure the schedule is assigned before starting the test to avoid any funny business
+                schedule_assigned = self.assign_schedule()
+
+            if schedule_assigned:
+                event = self._start_request(
+                    Msg.StartSchedule.Client.command_code, [self.__config.channel+1])
+                start_test_msg_tx_bin = Msg.StartSchedule.Client.pack(
+                    {'channel': self.__config.channel, 'test_name': self.__config.test_name})
+                response_msg_bin = self._send_receive_msg(
+                    start_test_msg_tx_bin, event)
+                self._invalidate_cached_channel_status(self.__config.channel+1)
+
+                start_test_msg_rx_dict = None
+                if response_msg_bin:
+                    start_test_msg_rx_dict = Msg.StartSchedule.Server.unpack(
+                        response_msg_bin)
+                    if start_test_msg_rx_dict['result'] == 'success':
+                        success = True
+                        logger.info(
+                            f'Successfully started test {self.__config.test_name} with schedule {self.__config.schedule_name} on channel {self.__config.channel}')
+                        logger.debug(start_test_msg_rx_dict)
+                    else:
+                        logger.error(
+                            f'Failed to start test {self.__config.test_name} with schedule {self.__config.schedule_name} on channel {self.__config.channel}. Issue: {start_test_msg_rx_dict["result"]}')
+
+                self._finish_request(event, start_test_msg_rx_dict)
 
         return success
 
+    def __is_schedule_assigned(self, max_status_age_s: float = None) -> bool:
+        """
+        Checks whether the schedule in the config is the one assigned to the channel.
+
+        Parameters
+        ----------
+        max_status_age_s : *optional* : float
+            How old a cached channel status can be in seconds. Defaults to reading a fresh status.
+
+        Returns
+        -------
+        assigned : bool
+            True if the channel status shows the configured schedule assigned to the channel.
+        """
+        if not self.__config.schedule_name:
+            return False
+
+        channel_status = {}
+        if max_status_age_s is not None:
+            channel_status = self.get_cached_channel_status(max_status_age_s)
+        if not channel_status:
+            channel_status = self.read_channel_status()
+        if not channel_status:
+            return False
+
+        # Schedule file names are not case sensitive on the Windows host.
+        return channel_status['schedule'].casefold() == self.__config.schedule_name.casefold()
+
     def stop_test(self) -> bool:
         """
         Stops the test running on the channel specified in the config.
@@ -137,14 +217,18 @@ class ChannelInterface(CyclerInterface):
         """
         success = False
 
+        event = self._start_request(
+            Msg.StopSchedule.Client.command_code, [self.__config.channel+1])
         stop_test_msg_tx_bin = Msg.StopSchedule.Client.pack(
             {'channel': self.__config.channel})
         response_msg_bin = self._send_receive_msg(
-            stop_test_msg_tx_bin)
+            stop_test_msg_tx_bin, event)
 
+        stop_test_msg_rx_dict = None
         if response_msg_bin:
             stop_test_msg_rx_dict = Msg.StopSchedule.Server.unpack(
                 response_msg_bin)
+            self._invalidate_cached_channel_status(self.__config.channel+1)
             if stop_test_msg_rx_dict['result'] == 'success':
                 success = True
                 logger.info(
@@ -154,6 +238,7 @@ class ChannelInterface(CyclerInterface):
                 logger.error(
                     f'Failed to stop test on channel {self.__config.channel}! Issue: {stop_test_msg_rx_dict["result"]}')
 
+        self._finish_request(event, stop_test_msg_rx_dict)
         return success
 
     def set_meta_variable(self, mv_num: int, mv_value: float) -> bool:
@@ -174,6 +259,8 @@ class ChannelInterface(CyclerInterface):
         """
         success = False
 
+        event = self._start_request(
+            Msg.SetMetaVariable.Client.command_code, [self.__config.channel+1])
         updated_msg_vals = {}
         updated_msg_vals['channel'] = self.__config.channel
         updated_msg_vals['mv_meta_code'] = Msg.SetMetaVariable.Client.mv_channel_codes[mv_num]
@@ -181,8 +268,9 @@ class ChannelInterface(CyclerInterface):
 
         set_mv_msg_tx_bin = Msg.SetMetaVariable.Client.pack(updated_msg_vals)
         response_msg_bin = self._send_receive_msg(
-            set_mv_msg_tx_bin)
+            set_mv_msg_tx_bin, event)
 
+        set_mv_msg_rx_dict = None
         if response_msg_bin:
             set_mv_msg_rx_dict = Msg.SetMetaVariable.Server.unpack(
                 response_msg_bin)
@@ -195,40 +283,36 @@ class ChannelInterface(CyclerInterface):
                 logger.error(
                     f'Failed to set meta variable {mv_num} to a value of {mv_value}! Issue: {set_mv_msg_rx_dict["result"]}')
 
+        self._finish_request(event, set_mv_msg_rx_dict)
         return success
 
-class ChannelInterfaceConfig(BaseModel):
-    '''
-    Holds channel config information for the CyclerInterface class.
-
-    Parameters
-    ----------
-        channel : int
-            The channel to target with the ChannelInterface class instance.
-        test_name : *optional*
-            The test name to use if using the ChannelInterface to start a test.
-        schedule_name : str
-            The name of the schedule file to use if using the ChannelInterface to start a test.
-        ip_address : str 
-            The IP address of the Arbin host computer.
-        port : int 
-            The TCP port to communicate through.
-        timeout_s : float 
-            How long to wait before timing out on TCP communication. Defaults to 3 seconds. 
-        msg_buffer_size : int 
-             How big of a message buffer to use for sending/receiving messages. 
-            A minimum of 1024 bytes is recommended. Defaults to 4096 bytes. 
-    '''
-    channel: int
-    test_name: str = None
-    schedule_name: str = None
-    ip_address: str
-    port: int
-    timeout_s: float = 3.0
-    msg_buffer_size: int = 4096
-
-    @field_validator('channel')
-    def username_alphanumeric(cls, v):
-        if v < 1:
-            raise ValueError('Channel must be greater than zero!')
-        return v-1
\ No newline at end of file
+    def set_meta_variables(self, mv_values: dict) -> dict:
+        """
+        Sets several meta variables on the channel specified in the config in a single
+        round trip. Note the test must be running.
+
+        Parameters
+        ----------
+        mv_values : dict
+            The meta variable values to set keyed on meta variable number. Meta variable
+            numbers must be between 1 and 16 (inclusive).
+
+        Returns
+        -------
+        results : dict
+            The set meta variable result for each meta variable number, `success` if the
+            meta variable was set. None if no response was received for the meta variable.
+        """
+        results = self.set_meta_variables_on_channels(
+            {self.__config.channel + 1: mv_values})[self.__config.channel + 1]
+        logger.info(
+            f'Set {list(results.values()).count("success")} of {len(results)} meta variables')
+        return results
+
+
+def __getattr__(name: str):
+    # The config model used to be defined here, keep importing it from here working.
+    if name == 'ChannelInterfaceConfig':
+        from .config import ChannelInterfaceConfig
+        return ChannelInterfaceConfig
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,339 @@
+import argparse
+import csv
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# Benchmark modules under `pyctiarbin.benchmarks` keyed on `pycti bench` name.
+BENCHMARKS = {
+    'end-to-end': 'end_to_end',
+    'codec': 'codec',
+    'soak': 'soak',
+    'import-time': 'import_time',
+}
+
+# Channel status fields streamed by `pycti watch` unless others are passed.
+DEFAULT_WATCH_FIELDS = ('status', 'voltage_v', 'current_a', 'power_w', 'test_time_s')
+
+
+def parse_channels(channels: str) -> list:
+    """
+    Parses a channel selection such as `1-4,7` into a list of channels.
+
+    Parameters
+    ----------
+    channels : str
+        Comma separated channels and inclusive channel ranges, numbered from 1.
+
+    Returns
+    -------
+    channels : list
+        The selected channels in the order given.
+    """
+    parsed_channels = []
+    for part in channels.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        try:
+            first = int(first)
+            last = int(last) if last else first
+        except ValueError:
+            raise argparse.ArgumentTypeError(f'Invalid channels {channels!r}!')
+        if first < 1 or last < first:
+            raise argparse.ArgumentTypeError(f'Invalid channels {channels!r}!')
+        parsed_channels.extend(range(first, last + 1))
+    return parsed_channels
+
+
+def poll_times(interval_s: float, count: int = None, duration_s: float = None):
+    """
+    Generator that sleeps until each poll is due. Polls are scheduled against absolute deadlines
+    so the rate does not drift with the time each poll takes. A poll that overruns is followed
+    straight away by the next one.
+
+    Parameters
+    ----------
+    interval_s : float
+        The time between polls.
+    count : *optional* : int
+        The number of polls. Polls forever if neither `count` nor `duration_s` is set.
+    duration_s : *optional* : float
+        How long to poll for.
+
+    Yields
+    ------
+    timestamp : float
+        The time of the poll in seconds since the epoch.
+    """
+    start_time = time.monotonic()
+    poll_idx = 0
+    while count is None or poll_idx < count:
+        deadline = start_time + poll_idx * interval_s
+        if duration_s is not None and deadline - start_time >= duration_s:
+            break
+        sleep_s = deadline - time.monotonic()
+        if sleep_s > 0:
+            time.sleep(sleep_s)
+        yield time.time()
+        poll_idx += 1
+
+
+def _add_connection_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--ip', default='127.0.0.1',
+                        help='IP address of the Arbin host computer.')
+    parser.add_argument('--port', type=int, default=9031,
+                        help='CTI port of the Arbin host computer.')
+    parser.add_argument('--timeout', type=float, default=3.0,
+                        help='Seconds to wait for a response.')
+    parser.add_argument('--env', default=os.path.join(os.getcwd(), '.env'),
+                        help='Path of the .env file holding ARBIN_CTI_USERNAME and ARBIN_CTI_PASSWORD.')
+    parser.add_argument('--channels', type=parse_channels,
+                        help='Channels to read, e.g. 1-4,7. Defaults to every channel.')
+
+
+def _connect(args: argparse.Namespace):
+    """
+    Connects to the cycler given by the connection arguments and returns the interface and
+    the channels to read.
+    """
+    from pyctiarbin import CyclerInterface
+    cycler_interface = CyclerInterface(
+        {'ip_address': args.ip, 'port': args.port, 'timeout_s': args.timeout}, env_path=args.env)
+    channels = args.channels or list(
+        range(1, cycler_interface.get_num_channels() + 1))
+    return cycler_interface, channels
+
+
+def _status(args: argparse.Namespace) -> int:
+    cycler_interface, channels = _connect(args)
+    print(f'{"channel":>7} {"status":<24} {"voltage_v":>10} {"current_a":>10} {"test_time_s":>12} '
+          f'{"schedule":<24} {"testname":<24}', flush=True)
+    failures = 0
+    for channel in channels:
+        status = cycler_interface.read_channel_status(channel)
+        if not status:
+            failures += 1
+            print(f'{channel:>7} {"no response":<24}', flush=True)
+            continue
+        print(f'{channel:>7} {status["status"]:<24} {status["voltage_v"]:>10.4f} {status["current_a"]:>10.4f} '
+              f'{status["test_time_s"]:>12.1f} {status["schedule"]:<24} {status["testname"]:<24}', flush=True)
+    return 1 if failures else 0
+
+
+def _watch(args: argparse.Namespace) -> int:
+    cycler_interface, channels = _connect(args)
+    fields = args.fields.split(',') if args.fields else list(
+        DEFAULT_WATCH_FIELDS)
+
+    csv_writer = None
+    if args.format == 'csv':
+        csv_writer = csv.writer(sys.stdout, lineterminator='\n')
+        csv_writer.writerow(['timestamp', 'channel', *fields])
+        sys.stdout.flush()
+
+    for timestamp in poll_times(args.interval, args.count, args.duration):
+        for channel in channels:
+            status = cycler_interface.read_channel_status(channel)
+            if not status:
+                logger.warning(f'No response reading channel {channel}')
+                continue
+            values = [status.get(field) for field in fields]
+            if csv_writer is not None:
+                csv_writer.writerow([timestamp, channel, *values])
+            else:
+                sys.stdout.write(json.dumps(
+                    {'timestamp': timestamp, 'channel': channel, **dict(zip(fields, values))}) + '\n')
+        sys.stdout.flush()
+    return 0
+
+
+def _capture(args: argparse.Namespace) -> int:
+    from pyctiarbin.capture import CaptureWriter
+    cycler_interface, channels = _connect(args)
+
+    num_frames = 0
+    with CaptureWriter(args.output) as writer:
+        for _ in poll_times(args.interval, args.count, args.duration):
+            for channel in channels:
+                frame = cycler_interface.read_channel_frame(channel)
+                if not frame:
+                    logger.warning(f'No response reading channel {channel}')
+                    continue
+                writer.write(frame)
+                num_frames += 1
+            writer.flush()
+            print(f'Captured {num_frames} frames', file=sys.stderr, flush=True)
+    return 0
+
+
+def _spoof(args: argparse.Namespace) -> int:
+    from pyctiarbin.arbinspoofer import ArbinSpoofer
+    spoofer_config = {}
+    if args.config:
+        with open(args.config) as f:
+            spoofer_config = json.load(f)
+    spoofer_config.update({'ip': args.ip, 'port': args.port,
+                           'num_channels': args.num_channels, 'server_mode': args.server_mode})
+    if args.stateful:
+        spoofer_config['stateful'] = True
+    if args.replay:
+        spoofer_config['replay_capture'] = args.replay
+    if args.metrics_port is not None:
+        spoofer_config['metrics'] = {'http_port': args.metrics_port}
+
+    arbin_spoofer = ArbinSpoofer(spoofer_config)
+    arbin_spoofer.start()
+    print(f'Serving {args.num_channels} channels on {args.ip}:{args.port}', flush=True)
+    if args.metrics_port is not None:
+        print(
+            f'Serving metrics on port {arbin_spoofer.get_metrics_http_port()}', flush=True)
+    try:
+        if args.duration is None:
+            while True:
+                time.sleep(1.0)
+        else:
+            time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        arbin_spoofer.stop()
+    return 0
+
+
+def _bench(args: argparse.Namespace) -> int:
+    # The benchmark name is optional, so it is picked out of the arguments here rather than
+    # by the `bench` parser, which would otherwise take an option value for the name.
+    benchmark_args = list(args.benchmark_args)
+    benchmark_name = 'end-to-end'
+    if benchmark_args and benchmark_args[0] in BENCHMARKS:
+        benchmark_name = benchmark_args.pop(0)
+
+    # The benchmark modules are imported here rather than when building the parser so that
+    # the other subcommands start quickly.
+    benchmark = importlib.import_module(
+        f'pyctiarbin.benchmarks.{BENCHMARKS[benchmark_name]}')
+    parser = argparse.ArgumentParser(
+        prog=f'pycti bench {benchmark_name}',
+        epilog=f'Benchmarks: {", ".join(BENCHMARKS)}. Defaults to end-to-end.')
+    benchmark.add_arguments(parser)
+    results = benchmark.run(parser.parse_args(benchmark_args))
+    return 1 if results.get('failures') else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the `pycti` argument parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog='pycti', description='Poll, capture, spoof and benchmark Arbin cyclers over CTI.')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='Log progress as well as warnings.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    status_parser = subparsers.add_parser(
+        'status', help='Print a table of the status of every channel.')
+    _add_connection_arguments(status_parser)
+    status_parser.set_defaults(handler=_status)
+
+    watch_parser = subparsers.add_parser(
+        'watch', help='Stream channel readings as JSON lines or CSV.')
+    _add_connection_arguments(watch_parser)
+    watch_parser.add_argument('--interval', type=float, default=1.0,
+                              help='Seconds between readings of every channel.')
+    watch_parser.add_argument('--count', type=int,
+                              help='Number of readings of every channel. Defaults to reading until interrupted.')
+    watch_parser.add_argument('--duration', type=float,
+                              help='Seconds to read for. Defaults to reading until interrupted.')
+    watch_parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl',
+                              help='Output format.')
+    watch_parser.add_argument('--fields',
+                              help=f'Comma separated status fields to output. Defaults to {",".join(DEFAULT_WATCH_FIELDS)}.')
+    watch_parser.set_defaults(handler=_watch)
+
+    capture_parser = subparsers.add_parser(
+        'capture', help='Record raw channel info frames for replay with the spoofer.')
+    _add_connection_arguments(capture_parser)
+    capture_parser.add_argument('--output', '-o', required=True,
+                                help='Path of the capture file. Frames are appended if it exists.')
+    capture_parser.add_argument('--interval', type=float, default=1.0,
+                                help='Seconds between readings of every channel.')
+    capture_parser.add_argument('--count', type=int,
+                                help='Number of readings of every channel. Defaults to reading until interrupted.')
+    capture_parser.add_argument('--duration', type=float,
+                                help='Seconds to record for. Defaults to recording until interrupted.')
+    capture_parser.set_defaults(handler=_capture)
+
+    spoof_parser = subparsers.add_parser(
+        'spoof', help='Serve a spoofed Arbin cycler.')
+    spoof_parser.add_argument('--ip', default='127.0.0.1',
+                              help='IP address to serve from.')
+    spoof_parser.add_argument('--port', type=int, default=9031,
+                              help='Port to serve from.')
+    spoof_parser.add_argument('--num-channels', type=int, default=16,
+                              help='Number of channels.')
+    spoof_parser.add_argument('--server-mode', choices=['threaded', 'selector'], default='threaded',
+                              help='Server mode.')
+    spoof_parser.add_argument('--stateful', action='store_true',
+                              help='Track assigned schedules and running tests.')
+    spoof_parser.add_argument('--replay',
+                              help='Path of a capture file to answer channel info requests from.')
+    spoof_parser.add_argument('--metrics-port', type=int,
+                              help='Port to serve spoofer metrics from.')
+    spoof_parser.add_argument('--config',
+                              help='Path of a JSON file with any other spoofer config settings.')
+    spoof_parser.add_argument('--duration', type=float,
+                              help='Seconds to serve for. Defaults to serving until interrupted.')
+    spoof_parser.set_defaults(handler=_spoof)
+
+    # Help is left to the benchmark's own parser so `pycti bench codec --help` lists its options.
+    bench_parser = subparsers.add_parser(
+        'bench', add_help=False,
+        help='Run a benchmark, the end to end throughput benchmark by default. '
+             'Pass --help after the benchmark name for its options.')
+    bench_parser.set_defaults(handler=_bench)
+
+    return parser
+
+
+def main(argv: list = None) -> int:
+    """
+    Runs the `pycti` command line tool.
+
+    Parameters
+    ----------
+    argv : *optional* : list
+        The command line arguments. Defaults to `sys.argv[1:]`.
+
+    Returns
+    -------
+    exit_code : int
+        0 on success.
+    """
+    parser = build_parser()
+    # Arguments the `bench` parser does not know are passed on to the benchmark.
+    args, unknown_args = parser.parse_known_args(argv)
+    if args.command == 'bench':
+        args.benchmark_args = unknown_args
+    elif unknown_args:
+        parser.error(f'unrecognized arguments: {" ".join(unknown_args)}')
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    try:
+        return args.handler(args)
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # The reader went away, e.g. output piped into `head`.
+        sys.stderr.close()
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
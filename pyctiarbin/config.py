@@ -0,0 +1,61 @@
+from pydantic import BaseModel
+from pydantic import field_validator
+
+
+class CyclerInterfaceConfig(BaseModel):
+    '''
+    Holds channel config information for the CyclerInterface class.
+
+    Parameters
+    ----------
+        ip_address : str 
+            The IP address of the Arbin host computer.
+        port : int 
+            The TCP port to communicate through.
+        timeout_s : float 
+            How long to wait before timing out on TCP communication. Defaults to 3 seconds. 
+        msg_buffer_size : int 
+             How big of a message buffer to use for sending/receiving messages. 
+            A minimum of 1024 bytes is recommended. Defaults to 4096 bytes. 
+    '''
+    ip_address: str
+    port: int
+    timeout_s: float = 3.0
+    msg_buffer_size: int = 4096
+
+
+class ChannelInterfaceConfig(BaseModel):
+    '''
+    Holds channel config information for the CyclerInterface class.
+
+    Parameters
+    ----------
+        channel : int
+            The channel to target with the ChannelInterface class instance.
+        test_name : *optional*
+            The test name to use if using the ChannelInterface to start a test.
+        schedule_name : str
+            The name of the schedule file to use if using the ChannelInterface to start a test.
+        ip_address : str 
+            The IP address of the Arbin host computer.
+        port : int 
+            The TCP port to communicate through.
+        timeout_s : float 
+            How long to wait before timing out on TCP communication. Defaults to 3 seconds. 
+        msg_buffer_size : int 
+             How big of a message buffer to use for sending/receiving messages. 
+            A minimum of 1024 bytes is recommended. Defaults to 4096 bytes. 
+    '''
+    channel: int
+    test_name: str = None
+    schedule_name: str = None
+    ip_address: str
+    port: int
+    timeout_s: float = 3.0
+    msg_buffer_size: int = 4096
+
+    @field_validator('channel')
+    def username_alphanumeric(cls, v):
+        if v < 1:
+            raise ValueError('Channel must be greater than zero!')
+        return v-1
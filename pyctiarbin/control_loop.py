@@ -0,0 +1,237 @@
+import logging
+import threading
+import time
+from collections import deque
+from .histogram import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+class ControlLoop:
+    """
+    Class for running a closed-loop controller on a channel at a fixed period. Each iteration
+    reads the channel status, passes it to the controller and writes the meta variables the
+    controller returns in a single round trip. Iterations are scheduled against absolute
+    deadlines so timing errors do not accumulate, and the timing of every iteration is recorded.
+    """
+
+    def __init__(self, channel_interface, controller, period_s: float = 0.1, history_size: int = 1000):
+        """
+        Creates a control loop.
+
+        Parameters
+        ----------
+        channel_interface : ChannelInterface
+            The interface to the channel under control.
+        controller : function
+            Called with the channel status dictionary every iteration. Returns a dictionary of
+            meta variable values to set keyed on meta variable number, or None to set nothing.
+        period_s : *optional* : float
+            The control period in seconds. Defaults to 0.1 seconds.
+        history_size : *optional* : int
+            How many of the most recent iteration records to keep. Defaults to 1000.
+        """
+        if period_s <= 0:
+            raise ValueError('Control period must be greater than zero!')
+
+        self.__channel_interface = channel_interface
+        self.__controller = controller
+        self.__period_s = period_s
+
+        self.__stats_lock = threading.Lock()
+        self.__history = deque(maxlen=history_size)
+        self.__reset_stats()
+
+        self.__stop_event = threading.Event()
+        self.__loop_thread = None
+
+    def run(self, num_iterations: int = None, duration_s: float = None):
+        """
+        Runs the control loop in the calling thread until the number of iterations or the
+        duration is reached, or `stop()` is called.
+
+        Parameters
+        ----------
+        num_iterations : *optional* : int
+            The number of iterations to run. Defaults to no limit.
+        duration_s : *optional* : float
+            How long to run in seconds. Defaults to no limit.
+        """
+        self.__stop_event.clear()
+        start_time = time.perf_counter()
+        deadline = start_time
+        iteration = 0
+
+        while not self.__stop_event.is_set():
+            if num_iterations is not None and iteration >= num_iterations:
+                break
+            if duration_s is not None and (deadline - start_time) >= duration_s:
+                break
+
+            # Event.wait rather than sleep so stop() takes effect immediately.
+            wait_s = deadline - time.perf_counter()
+            if wait_s > 0 and self.__stop_event.wait(wait_s):
+                break
+
+            self.__run_iteration(iteration, deadline)
+            iteration += 1
+
+            # Schedule against absolute deadlines so there is no drift. If the iteration ran past
+            # one or more deadlines, count the overrun and skip to the next deadline in the future.
+            deadline += self.__period_s
+            now = time.perf_counter()
+            if now > deadline:
+                missed_periods = int((now - deadline) // self.__period_s) + 1
+                deadline += missed_periods * self.__period_s
+                with self.__stats_lock:
+                    self.__stats['overruns'] += 1
+                    self.__stats['missed_periods'] += missed_periods
+                logger.warning(
+                    f'Control loop iteration {iteration - 1} overran, skipping {missed_periods} period(s)')
+
+    def start(self):
+        """
+        Runs the control loop in a background thread until `stop()` is called.
+        """
+        if self.__loop_thread is not None and self.__loop_thread.is_alive():
+            raise RuntimeError('Control loop is already running!')
+        self.__stop_event.clear()
+        self.__loop_thread = threading.Thread(target=self.run, daemon=True)
+        self.__loop_thread.start()
+
+    def stop(self):
+        """
+        Stops the control loop and waits for the current iteration to finish.
+        """
+        self.__stop_event.set()
+        if self.__loop_thread is not None:
+            self.__loop_thread.join()
+            self.__loop_thread = None
+
+    def get_stats(self) -> dict:
+        """
+        Returns the timing statistics of the control loop.
+
+        Returns
+        -------
+        stats : dict
+            The iteration, overrun, missed period and error counts along with summaries of the
+            read latency, compute time, write latency, iteration time and jitter histograms.
+        """
+        with self.__stats_lock:
+            stats = dict(self.__stats)
+            for name, histogram in self.__histograms.items():
+                stats[name] = histogram.to_dict()
+        stats['period_s'] = self.__period_s
+        return stats
+
+    def get_history(self) -> list:
+        """
+        Returns the records of the most recent iterations, oldest first.
+        """
+        with self.__stats_lock:
+            return list(self.__history)
+
+    def reset_stats(self):
+        """
+        Clears all recorded statistics and history.
+        """
+        with self.__stats_lock:
+            self.__reset_stats()
+
+    def __reset_stats(self):
+        self.__stats = {
+            'iterations': 0,
+            'overruns': 0,
+            'missed_periods': 0,
+            'read_failures': 0,
+            'controller_errors': 0,
+            'write_failures': 0,
+        }
+        self.__histograms = {
+            'read_latency': LatencyHistogram(),
+            'compute_time': LatencyHistogram(),
+            'write_latency': LatencyHistogram(),
+            'iteration_time': LatencyHistogram(),
+            'jitter': LatencyHistogram(),
+        }
+        self.__history.clear()
+
+    def __run_iteration(self, iteration: int, deadline: float):
+        """
+        Runs a single read, compute, write iteration and records its timing.
+
+        Parameters
+        ----------
+        iteration : int
+            The iteration number.
+        deadline : float
+            When the iteration was scheduled to start, from `time.perf_counter()`.
+        """
+        record = {
+            'iteration': iteration,
+            'jitter_s': None,
+            'read_latency_s': None,
+            'compute_time_s': None,
+            'write_latency_s': None,
+            'iteration_time_s': None,
+            'mv_values': None,
+            'success': False,
+        }
+
+        start_time = time.perf_counter()
+        record['jitter_s'] = start_time - deadline
+
+        channel_status = self.__channel_interface.read_channel_status()
+        read_end_time = time.perf_counter()
+        record['read_latency_s'] = read_end_time - start_time
+
+        if not channel_status:
+            logger.error(
+                f'Control loop iteration {iteration} failed to read channel status')
+            self.__record(record, 'read_failures')
+            return
+
+        try:
+            mv_values = self.__controller(channel_status)
+        except Exception:
+            logger.error(
+                f'Controller raised an exception on iteration {iteration}', exc_info=True)
+            self.__record(record, 'controller_errors')
+            return
+        compute_end_time = time.perf_counter()
+        record['compute_time_s'] = compute_end_time - read_end_time
+        record['mv_values'] = mv_values
+
+        write_success = True
+        if mv_values:
+            mv_results = self.__channel_interface.set_meta_variables(mv_values)
+            write_success = all(
+                result == 'success' for result in mv_results.values())
+        end_time = time.perf_counter()
+        record['write_latency_s'] = end_time - compute_end_time
+        record['iteration_time_s'] = end_time - start_time
+        record['success'] = write_success
+
+        self.__record(record, None if write_success else 'write_failures')
+
+    def __record(self, record: dict, failure: str = None):
+        """
+        Adds an iteration record to the statistics and history.
+
+        Parameters
+        ----------
+        record : dict
+            The iteration record.
+        failure : *optional* : str
+            The failure counter to increment, if the iteration failed.
+        """
+        with self.__stats_lock:
+            self.__stats['iterations'] += 1
+            if failure:
+                self.__stats[failure] += 1
+            for name, histogram in self.__histograms.items():
+                value_s = record[name + '_s']
+                if value_s is not None:
+                    histogram.record(value_s)
+            self.__history.append(record)
@@ -1,11 +1,12 @@
 import socket
 import logging
 import struct
-import dotenv
+import threading
+import time
 import os
-from pydantic import BaseModel
 from .messages import Msg
 from .messages import MessageABC
+from .instrumentation import RequestEvent, OUTCOME_TIMEOUT, OUTCOME_SOCKET_ERROR, OUTCOME_UNPACK_ERROR, OUTCOME_NOT_CONNECTED
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +16,7 @@ class CyclerInterface:
     Class for interfacing with Arbin battery cycler at a cycler level.
     """
 
-    def __init__(self, config: dict, env_path: str = os.path.join(os.getcwd(), '.env')):
+    def __init__(self, config: dict, env_path: str = os.path.join(os.getcwd(), '.env'), request_hooks: list = None):
         """
         Creates a class instance for interfacing with Arbin battery cycler at a cycler level.
 
@@ -35,13 +36,99 @@ class CyclerInterface:
         env_path : *optional* : str
             The path to the `.env` file containing the Arbin CTI username,`ARBIN_CTI_USERNAME`, and password, `ARBIN_CTI_PASSWORD`.
             Defaults to looking in the working directory.
+        request_hooks : *optional* : list
+            Request hooks to install before logging in, so the login is also reported. Defaults to none.
+            See `add_request_hook()`.
         """
+        # Imported on first use as pydantic is slow to import and is only needed to validate configs.
+        from .config import CyclerInterfaceConfig
         self.__config = CyclerInterfaceConfig(**config)
+
+        # Replaced rather than modified so requests can iterate over it without a lock.
+        self.__request_hooks = tuple(request_hooks or ())
+
+        # Held for every request/response exchange so the interface can be shared between threads.
+        # Subclasses can hold it across several exchanges that must not be interleaved.
+        self._comm_lock = threading.RLock()
+
+        # Most recent channel status read for each channel along with when it was read.
+        self.__channel_status_cache = {}
+        self.__channel_status_cache_lock = threading.Lock()
+
         assert (self.__create_connection(
             ip=self.__config.ip_address, port=self.__config.port, timeout_s=self.__config.timeout_s))
         assert (self.__login(env_path))
         self.__num_channels = self.get_login_feedback()['num_channels']
 
+    def add_request_hook(self, hook):
+        """
+        Installs a function that is called after every request/response exchange with the
+        Arbin server, from the thread that made the request. Hooks should return quickly.
+        Exceptions raised by hooks are logged and otherwise ignored.
+
+        Parameters
+        ----------
+        hook : callable
+            Called with a `pyctiarbin.instrumentation.RequestEvent` describing the exchange.
+        """
+        self.__request_hooks = self.__request_hooks + (hook,)
+
+    def remove_request_hook(self, hook):
+        """
+        Removes a hook installed with `add_request_hook()`.
+
+        Parameters
+        ----------
+        hook : callable
+            The hook to remove.
+        """
+        self.__request_hooks = tuple(
+            installed_hook for installed_hook in self.__request_hooks if installed_hook != hook)
+
+    def _start_request(self, command_code: int, channels: list) -> RequestEvent:
+        """
+        Starts timing a request. Call before packing the request and pass the returned event
+        to `_send_receive_msgs()` and then `_finish_request()`.
+
+        Parameters
+        ----------
+        command_code : int
+            The client message command code.
+        channels : list
+            The channels the request applies to, numbered from 1.
+
+        Returns
+        -------
+        event : RequestEvent
+            The event to fill in. None if no request hooks are installed, in which case
+            nothing is timed.
+        """
+        if not self.__request_hooks:
+            return None
+        return RequestEvent(command_code, channels)
+
+    def _finish_request(self, event: RequestEvent, result=None):
+        """
+        Completes the timing of a request and passes it to the request hooks. Call once the
+        responses have been unpacked.
+
+        Parameters
+        ----------
+        event : RequestEvent
+            The event from `_start_request()`. Nothing is done if None.
+        result : *optional*
+            What the request returns to the caller.
+        """
+        if event is None:
+            return
+        event.unpack_time_s = time.perf_counter() - event.network_end_time
+        event.result = result
+        for hook in self.__request_hooks:
+            try:
+                hook(event)
+            except Exception:
+                logger.error('Request hook failed!', exc_info=True)
+
     def get_num_channels(self):
         '''
         Returns the number of channels on the cycler
@@ -74,24 +161,330 @@ class CyclerInterface:
             logger.error(f'Invalid channel value {channel}!')
             return channel_info_msg_rx_dict
 
+        event = self._start_request(
+            Msg.ChannelInfo.Client.command_code, [channel])
         try:
             # Subtract one from the passed channel value to account for zero indexing
             channel_info_msg_tx = Msg.ChannelInfo.Client.pack(
                 {'channel': (channel-1)})
-            response_msg_bin = self._send_receive_msg(
-                channel_info_msg_tx)
-
-            if response_msg_bin:
-                channel_info_msg_rx_dict = Msg.ChannelInfo.Server.unpack(
-                    response_msg_bin)
+            # Cache the reading before releasing the communication lock so a command sent by
+            # another thread cannot be overwritten by a reading taken before it.
+            with self._comm_lock:
+                response_msg_bin = self._send_receive_msg(
+                    channel_info_msg_tx, event)
+
+                if response_msg_bin:
+                    channel_info_msg_rx_dict = Msg.ChannelInfo.Server.unpack(
+                        response_msg_bin)
+                    with self.__channel_status_cache_lock:
+                        self.__channel_status_cache[channel] = (
+                            time.monotonic(), channel_info_msg_rx_dict)
         except Exception as e:
             logger.error(
                 f'Error reading channel status for channel {channel}', exc_info=True)
             logger.error(e)
 
+        self._finish_request(event, channel_info_msg_rx_dict)
         return channel_info_msg_rx_dict
 
-    def _send_receive_msg(self, tx_msg):
+    def read_channel_frame(self, channel: int) -> bytes:
+        """
+        Reads the channel info frame for the passed channel exactly as the cycler sent it,
+        including the trailing checksum, without unpacking it.
+
+        Parameters
+        ----------
+        channel : int
+            The channel to read the frame for.
+
+        Returns
+        -------
+        frame : bytes
+            The complete `ChannelInfo.Server` frame. Empty if there is an issue.
+        """
+        if (channel > self.__num_channels) or (channel < 0):
+            logger.error(f'Invalid channel value {channel}!')
+            return b''
+
+        event = self._start_request(
+            Msg.ChannelInfo.Client.command_code, [channel])
+        # Subtract one from the passed channel value to account for zero indexing
+        channel_info_msg_tx = Msg.ChannelInfo.Client.pack(
+            {'channel': (channel-1)})
+        rx_msgs = self._send_receive_msgs(
+            channel_info_msg_tx, 1, event, include_checksum=True)
+
+        self._finish_request(event)
+        return rx_msgs[0] if rx_msgs else b''
+
+    def get_cached_channel_status(self, channel: int, max_age_s: float = None) -> dict:
+        """
+        Returns the most recent channel status read for the passed channel without
+        communicating with the cycler.
+
+        Parameters
+        ----------
+        channel : int
+            The channel to return the status for.
+        max_age_s : *optional* : float
+            The oldest reading to return in seconds. Defaults to returning any reading.
+
+        Returns
+        -------
+        status : dict
+            A dictionary detailing the status of the channel. Empty if there is no reading
+            or the reading is older than `max_age_s`.
+        """
+        with self.__channel_status_cache_lock:
+            (read_time, channel_status) = self.__channel_status_cache.get(
+                channel, (None, {}))
+
+        if read_time is None or (max_age_s is not None and (time.monotonic() - read_time) > max_age_s):
+            return {}
+        return dict(channel_status)
+
+    def _invalidate_cached_channel_status(self, channel: int):
+        """
+        Drops the cached channel status for the passed channel. Should be called after
+        any command that changes the state of the channel.
+
+        Parameters
+        ----------
+        channel : int
+            The channel to drop the cached status for.
+        """
+        with self.__channel_status_cache_lock:
+            self.__channel_status_cache.pop(channel, None)
+
+    def assign_schedule_to_channels(self, channels: list, schedule_name: str) -> dict:
+        """
+        Assigns a schedule to each of the passed channels. If the channels cover the whole
+        cycler a single assign all channels message is sent. Otherwise the per channel messages
+        are sent together and their responses collected afterwards.
+
+        Parameters
+        ----------
+        channels : list
+            The channels to assign the schedule to.
+        schedule_name : str
+            The name of the schedule file to assign.
+
+        Returns
+        -------
+        results : dict
+            The assign schedule result for each channel, `success` if the schedule was assigned.
+            None if no response was received for the channel.
+        """
+        results = {}
+        valid_channels = []
+        for channel in dict.fromkeys(channels):
+            if (channel > self.__num_channels) or (channel < 1):
+                logger.error(f'Invalid channel value {channel}!')
+                results[channel] = Msg.AssignSchedule.Server.assign_schedule_feedback_codes[16]
+            else:
+                valid_channels.append(channel)
+                results[channel] = None
+
+        if not valid_channels:
+            return results
+
+        event = self._start_request(
+            Msg.AssignSchedule.Client.command_code, valid_channels)
+        if len(valid_channels) == self.__num_channels:
+            assign_schedule_msg_tx_bin = Msg.AssignSchedule.Client.pack(
+                {'channel': 0, 'assign_all_channels': '\x01', 'schedule': schedule_name})
+            response_msgs_bin = self._send_receive_msgs(
+                assign_schedule_msg_tx_bin, self.__num_channels, event)
+            # Responses to an assign all are tagged with the zero-indexed channel.
+            response_channels = [Msg.AssignSchedule.Server.unpack(response_msg_bin)['channel'] + 1
+                                 for response_msg_bin in response_msgs_bin]
+        else:
+            assign_schedule_msg_tx_bin = b''.join([Msg.AssignSchedule.Client.pack(
+                {'channel': (channel-1), 'schedule': schedule_name}) for channel in valid_channels])
+            response_msgs_bin = self._send_receive_msgs(
+                assign_schedule_msg_tx_bin, len(valid_channels), event)
+            response_channels = valid_channels[:len(response_msgs_bin)]
+
+        for channel in valid_channels:
+            self._invalidate_cached_channel_status(channel)
+
+        for channel, response_msg_bin in zip(response_channels, response_msgs_bin):
+            results[channel] = Msg.AssignSchedule.Server.unpack(response_msg_bin)[
+                'result']
+            if results[channel] != 'success':
+                logger.error(
+                    f'Failed to assign schedule {schedule_name} to channel {channel}! Issue: {results[channel]}')
+
+        logger.info(
+            f'Assigned schedule {schedule_name} to {list(results.values()).count("success")} of {len(results)} channels')
+        self._finish_request(event, results)
+        return results
+
+    def start_test_on_channels(self, channels: list, test_name: str, schedule_name: str = None) -> dict:
+        """
+        Starts a test on each of the passed channels with a single start schedule message.
+        If the cycler reports a channel failed to start the remaining channels are started
+        individually so each channel gets its own result.
+
+        Parameters
+        ----------
+        channels : list
+            The channels to start the test on.
+        test_name : str
+            The test name to use.
+        schedule_name : *optional* : str
+            If passed, the schedule is assigned to the channels first and the test is only
+            started on channels the schedule was assigned to.
+
+        Returns
+        -------
+        results : dict
+            The assign or start result for each channel, `success` if the test was started.
+            None if no response was received for the channel.
+        """
+        results = {}
+
+        if not test_name:
+            logger.error("Test name undefined!")
+            return results
+
+        if schedule_name:
+            results = self.assign_schedule_to_channels(channels, schedule_name)
+            start_channels = [channel for channel,
+                              result in results.items() if result == 'success']
+        else:
+            start_channels = []
+            for channel in dict.fromkeys(channels):
+                if (channel > self.__num_channels) or (channel < 1):
+                    logger.error(f'Invalid channel value {channel}!')
+                    results[channel] = Msg.StartSchedule.Server.start_test_feedback_codes[16]
+                else:
+                    start_channels.append(channel)
+
+        if not start_channels:
+            return results
+
+        for channel in start_channels:
+            results[channel] = None
+
+        event = self._start_request(
+            Msg.StartSchedule.Client.command_code, start_channels)
+        start_test_msg_tx_bin = Msg.StartSchedule.Client.pack(
+            {'test_name': test_name, 'channels': [(channel-1) for channel in start_channels]})
+        response_msg_bin = self._send_receive_msg(start_test_msg_tx_bin, event)
+        for channel in start_channels:
+            self._invalidate_cached_channel_status(channel)
+        if not response_msg_bin:
+            self._finish_request(event, results)
+            return results
+
+        start_test_msg_rx_dict = Msg.StartSchedule.Server.unpack(
+            response_msg_bin)
+        self._finish_request(event, start_test_msg_rx_dict)
+        if start_test_msg_rx_dict['result'] == 'success':
+            for channel in start_channels:
+                results[channel] = 'success'
+            logger.info(
+                f'Successfully started test {test_name} on {len(start_channels)} channels')
+            return results
+
+        # The response only names the channel that failed, so start the rest one at a time.
+        failed_channel = start_test_msg_rx_dict['channel'] + 1
+        if failed_channel in results:
+            results[failed_channel] = start_test_msg_rx_dict['result']
+        logger.error(
+            f'Failed to start test {test_name} on channel {failed_channel}. Issue: {start_test_msg_rx_dict["result"]}')
+
+        remaining_channels = [
+            channel for channel in start_channels if channel != failed_channel]
+        if not remaining_channels:
+            return results
+        event = self._start_request(
+            Msg.StartSchedule.Client.command_code, remaining_channels)
+        start_test_msgs_tx_bin = b''.join([Msg.StartSchedule.Client.pack(
+            {'channel': (channel-1), 'test_name': test_name}) for channel in remaining_channels])
+        response_msgs_bin = self._send_receive_msgs(
+            start_test_msgs_tx_bin, len(remaining_channels), event)
+        for channel, response_msg_bin in zip(remaining_channels, response_msgs_bin):
+            results[channel] = Msg.StartSchedule.Server.unpack(response_msg_bin)[
+                'result']
+            if results[channel] != 'success':
+                logger.error(
+                    f'Failed to start test {test_name} on channel {channel}. Issue: {results[channel]}')
+
+        self._finish_request(event, results)
+        return results
+
+    def set_meta_variables_on_channels(self, channel_mv_values: dict) -> dict:
+        """
+        Sets meta variables on several channels at once. The set meta variable messages for
+        every channel are sent together and their responses collected afterwards, so the
+        whole update costs a single round trip. Note the tests must be running.
+
+        Parameters
+        ----------
+        channel_mv_values : dict
+            The meta variable values to set on each channel, keyed on channel. Each value is a
+            dictionary of meta variable values keyed on meta variable number (1 to 16 inclusive).
+
+        Returns
+        -------
+        results : dict
+            The set meta variable result for each meta variable keyed on channel and then meta
+            variable number, `success` if the meta variable was set. None if no response was
+            received for the meta variable.
+        """
+        results = {}
+        requests = []
+        for channel, mv_values in channel_mv_values.items():
+            results[channel] = {}
+            if (channel > self.__num_channels) or (channel < 1):
+                logger.error(f'Invalid channel value {channel}!')
+                for mv_num in mv_values:
+                    results[channel][mv_num] = Msg.SetMetaVariable.Server.mv_result_decoder[16]
+                continue
+            for mv_num, mv_value in mv_values.items():
+                if mv_num not in Msg.SetMetaVariable.Client.mv_channel_codes:
+                    logger.error(f'Invalid meta variable number {mv_num}!')
+                    results[channel][mv_num] = Msg.SetMetaVariable.Server.mv_result_decoder[18]
+                else:
+                    results[channel][mv_num] = None
+                    requests.append((channel, mv_num, mv_value))
+
+        if not requests:
+            return results
+
+        event = self._start_request(
+            Msg.SetMetaVariable.Client.command_code, list(dict.fromkeys(channel for channel, _, _ in requests)))
+        set_mv_msgs_tx_bin = b''.join([Msg.SetMetaVariable.Client.pack(
+            {'channel': (channel-1),
+             'mv_meta_code': Msg.SetMetaVariable.Client.mv_channel_codes[mv_num],
+             'mv_data': mv_value}) for channel, mv_num, mv_value in requests])
+        response_msgs_bin = self._send_receive_msgs(
+            set_mv_msgs_tx_bin, len(requests), event)
+
+        # Responses come back in the order the requests were sent.
+        for (channel, mv_num, mv_value), response_msg_bin in zip(requests, response_msgs_bin):
+            result = Msg.SetMetaVariable.Server.unpack(response_msg_bin)['result']
+            results[channel][mv_num] = result
+            if result != 'success':
+                logger.error(
+                    f'Failed to set meta variable {mv_num} to a value of {mv_value} on channel {channel}! Issue: {result}')
+
+        self._finish_request(event, results)
+        return results
+
+    def close(self):
+        """
+        Closes the connection to the Arbin server. Requests made afterwards fail without
+        reconnecting.
+        """
+        with self._comm_lock:
+            if self.__sock:
+                self.__sock.close()
+                self.__sock = None
+
+    def _send_receive_msg(self, tx_msg, event: RequestEvent = None):
         """
         Sends the passed message and receives the response.
 
@@ -99,65 +492,155 @@ class CyclerInterface:
         ----------
         tx_msg : bytearray
             Message to send.
+        event : *optional* : RequestEvent
+            The event from `_start_request()` to record the exchange in.
 
         Returns
         -------
         rx_msg : bytearray
             Response message..
         """
+        rx_msgs = self._send_receive_msgs(tx_msg, 1, event)
+        return rx_msgs[0] if rx_msgs else b''
 
-        rx_msg = b''
-        send_msg_success = False
+    def _send_receive_msgs(self, tx_msg, num_rx_msgs: int, event: RequestEvent = None,
+                           include_checksum: bool = False) -> list:
+        """
+        Sends the passed message, or several messages concatenated together, in a single
+        send and then receives the expected number of response messages.
 
-        msg_length_format = MessageABC.base_template['msg_length']['format']
-        msg_length_start_byte_idx = MessageABC.base_template['msg_length']['start_byte']
-        msg_length_end_byte_idx = msg_length_start_byte_idx + \
-            struct.calcsize(msg_length_format)
+        Parameters
+        ----------
+        tx_msg : bytearray
+            Message(s) to send.
+        num_rx_msgs : int
+            The number of response messages to receive.
+        event : *optional* : RequestEvent
+            The event from `_start_request()` to record the exchange in.
+        include_checksum : *optional* : bool
+            Whether to keep the checksum that follows each response message. Defaults to
+            False, returning only the `msg_length` bytes of each response.
 
-        if self.__sock:
-            try:
-                self.__sock.sendall(tx_msg)
-                send_msg_success = True
-            except socket.timeout:
-                logger.error(
-                    "Timeout on sending message from Arbin!", exc_info=True)
-                self.__reconnect()
-            except socket.error as e:
-                logger.error(
-                    "Failed to send message to Arbin!", exc_info=True)
-                logger.error(e)
-                self.__reconnect()
+        Returns
+        -------
+        rx_msgs : list
+            The response messages in the order they were received. Shorter than `num_rx_msgs`
+            if there was an issue receiving the responses.
+        """
+        rx_msgs = []
+        send_msg_success = False
+        outcome = None
+        reconnected = False
+
+        with self._comm_lock:
+            if event is not None:
+                network_start_time = time.perf_counter()
+                event.pack_time_s = network_start_time - event.start_time
 
-            if send_msg_success:
+            if self.__sock:
                 try:
-                    # Receive first part of message and determine length of entire message.
-                    rx_msg += self.__sock.recv(self.__config.msg_buffer_size)
-                    expected_rx_msg_len = struct.unpack(
-                        msg_length_format,
-                        rx_msg[msg_length_start_byte_idx:msg_length_end_byte_idx])[0]
-
-                    # Keep reading message in pieces until rx_msg is as long as expected_rx_msg_len.
-                    while len(rx_msg) < (expected_rx_msg_len):
-                        rx_msg += self.__sock.recv(
-                            self.__config.msg_buffer_size)
+                    self.__sock.sendall(tx_msg)
+                    send_msg_success = True
                 except socket.timeout:
                     logger.error(
-                        "Timeout on receiving message from Arbin!", exc_info=True)
-                    self.__reconnect()
+                        "Timeout on sending message from Arbin!", exc_info=True)
+                    outcome = OUTCOME_TIMEOUT
+                    reconnected = self.__reconnect()
                 except socket.error as e:
                     logger.error(
-                        "Error receiving message from Arbin!", exc_info=True)
+                        "Failed to send message to Arbin!", exc_info=True)
                     logger.error(e)
-                    self.__reconnect()
-                except struct.error as e:
-                    logger.error(
-                        "Error unpacking message from Arbin!", exc_info=True)
-                    logger.error(e)
-        else:
-            logger.error(
-                "Cannot send message! Socket does not exist!")
+                    outcome = OUTCOME_SOCKET_ERROR
+                    reconnected = self.__reconnect()
+
+                if send_msg_success:
+                    try:
+                        for _ in range(num_rx_msgs):
+                            rx_msgs.append(
+                                self.__receive_msg(include_checksum))
+                    except socket.timeout:
+                        logger.error(
+                            "Timeout on receiving message from Arbin!", exc_info=True)
+                        outcome = OUTCOME_TIMEOUT
+                        reconnected = self.__reconnect()
+                    except socket.error as e:
+                        logger.error(
+                            "Error receiving message from Arbin!", exc_info=True)
+                        logger.error(e)
+                        outcome = OUTCOME_SOCKET_ERROR
+                        reconnected = self.__reconnect()
+                    except struct.error as e:
+                        logger.error(
+                            "Error unpacking message from Arbin!", exc_info=True)
+                        logger.error(e)
+                        outcome = OUTCOME_UNPACK_ERROR
+            else:
+                logger.error(
+                    "Cannot send message! Socket does not exist!")
+                outcome = OUTCOME_NOT_CONNECTED
+
+            if event is not None:
+                event.network_end_time = time.perf_counter()
+                event.network_time_s = event.network_end_time - network_start_time
+                event.num_msgs = num_rx_msgs
+                event.bytes_sent = len(tx_msg)
+                event.bytes_received = sum(len(rx_msg) for rx_msg in rx_msgs)
+                if outcome is not None:
+                    event.outcome = outcome
+                event.reconnected = reconnected
+
+        return rx_msgs
+
+    def __receive_msg(self, include_checksum: bool = False) -> bytes:
+        """
+        Receives a single message from the Arbin server. Bytes received beyond the end of the
+        message are kept for the next call.
+
+        Parameters
+        ----------
+        include_checksum : *optional* : bool
+            Whether to wait for and return the checksum that follows the message.
+
+        Returns
+        -------
+        rx_msg : bytes
+            The received message.
+        """
+        header_bytes = struct.pack(
+            MessageABC.base_template['header']['format'], MessageABC.base_template['header']['value'])
+        msg_length_format = MessageABC.base_template['msg_length']['format']
+        msg_length_start_byte_idx = MessageABC.base_template['msg_length']['start_byte']
+        msg_length_end_byte_idx = msg_length_start_byte_idx + \
+            struct.calcsize(msg_length_format)
 
-        return rx_msg
+        while True:
+            # Discard anything ahead of the next message header, e.g. trailing checksum bytes
+            # the previous message length did not account for.
+            header_idx = self.__rx_buffer.find(header_bytes)
+            if header_idx < 0:
+                del self.__rx_buffer[:-(len(header_bytes) - 1)]
+            elif header_idx > 0:
+                del self.__rx_buffer[:header_idx]
+
+            if header_idx >= 0 and len(self.__rx_buffer) >= msg_length_end_byte_idx:
+                expected_rx_msg_len = struct.unpack_from(
+                    msg_length_format, self.__rx_buffer, msg_length_start_byte_idx)[0]
+                if expected_rx_msg_len < msg_length_end_byte_idx:
+                    del self.__rx_buffer[:len(header_bytes)]
+                    raise struct.error(
+                        f'Invalid message length {expected_rx_msg_len}!')
+                if include_checksum:
+                    expected_rx_msg_len += struct.calcsize(
+                        MessageABC.checksum_format)
+                if len(self.__rx_buffer) >= expected_rx_msg_len:
+                    rx_msg = bytes(self.__rx_buffer[:expected_rx_msg_len])
+                    del self.__rx_buffer[:expected_rx_msg_len]
+                    return rx_msg
+
+            rx_chunk = self.__sock.recv(self.__config.msg_buffer_size)
+            if not rx_chunk:
+                raise ConnectionError('Connection closed by Arbin server!')
+            self.__rx_buffer += rx_chunk
 
     def __create_connection(self, ip: str, port: int, timeout_s: float) -> bool:
         """
@@ -176,6 +659,7 @@ class CyclerInterface:
             True/False based on whether or not the Arbin server connection was created.
         """
         success = False
+        self.__rx_buffer = bytearray()
 
         try:
             self.__sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -203,6 +687,7 @@ class CyclerInterface:
         success = False
 
         logger.info(f'Loading environment variables from {env_path}')
+        import dotenv
         dotenv.load_dotenv(env_path, override=True)
 
         # Validate username and password are in the .env file.
@@ -213,10 +698,11 @@ class CyclerInterface:
             raise ValueError(
                 'ARBIN_CTI_PASSWORD not set in environment variables.')
 
+        event = self._start_request(Msg.Login.Client.command_code, [])
         login_msg_tx = Msg.Login.Client.pack(
             msg_values={'username': os.getenv('ARBIN_CTI_USERNAME'), 'password': os.getenv('ARBIN_CTI_PASSWORD')})
 
-        response_msg_bin = self._send_receive_msg(login_msg_tx)
+        response_msg_bin = self._send_receive_msg(login_msg_tx, event)
 
         if response_msg_bin:
             login_msg_rx_dict = Msg.Login.Server.unpack(response_msg_bin)
@@ -238,35 +724,28 @@ class CyclerInterface:
 
             self.__login_feedback = login_msg_rx_dict
 
+        self._finish_request(
+            event, self.__login_feedback if response_msg_bin else None)
         return success
 
-    def __reconnect(self):
+    def __reconnect(self) -> bool:
         '''
         Reconnects to the Arbin server.
+
+        Returns
+        -------
+        success : bool
+            True/False based on whether the connection was re-established.
         '''
         logger.info('Reconnecting to Arbin server...')
         self.__sock.close()
-        self.__create_connection(
+        return self.__create_connection(
             ip=self.__config.ip_address, port=self.__config.port, timeout_s=self.__config.timeout_s)
 
 
-class CyclerInterfaceConfig(BaseModel):
-    '''
-    Holds channel config information for the CyclerInterface class.
-
-    Parameters
-    ----------
-        ip_address : str 
-            The IP address of the Arbin host computer.
-        port : int 
-            The TCP port to communicate through.
-        timeout_s : float 
-            How long to wait before timing out on TCP communication. Defaults to 3 seconds. 
-        msg_buffer_size : int 
-             How big of a message buffer to use for sending/receiving messages. 
-            A minimum of 1024 bytes is recommended. Defaults to 4096 bytes. 
-    '''
-    ip_address: str
-    port: int
-    timeout_s: float = 3.0
-    msg_buffer_size: int = 4096
+def __getattr__(name: str):
+    # The config model used to be defined here, keep importing it from here working.
+    if name == 'CyclerInterfaceConfig':
+        from .config import CyclerInterfaceConfig
+        return CyclerInterfaceConfig
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,259 @@
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class RollingStats:
+    """
+    Rolling mean and variance over the last `window_size` values, updated in constant
+    time per value with the windowed form of Welford's algorithm.
+    """
+    __slots__ = ('window_size', 'values', 'mean', 'm2')
+
+    def __init__(self, window_size: int):
+        """
+        Parameters
+        ----------
+        window_size : int
+            The number of most recent values the statistics are computed over.
+        """
+        self.window_size = window_size
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float):
+        """
+        Adds a value to the window, evicting the oldest value if the window is full.
+
+        Parameters
+        ----------
+        value : float
+            The value to add.
+        """
+        if len(self.values) == self.window_size:
+            old_value = self.values.popleft()
+            n = len(self.values)
+            if n:
+                delta = old_value - self.mean
+                self.mean -= delta / n
+                self.m2 -= delta * (old_value - self.mean)
+            else:
+                self.mean = 0.0
+                self.m2 = 0.0
+
+        self.values.append(value)
+        delta = value - self.mean
+        self.mean += delta / len(self.values)
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """
+        The population variance of the values in the window.
+        """
+        n = len(self.values)
+        # Clamp tiny negative values left over from floating point cancellation.
+        return max(self.m2 / n, 0.0) if n else 0.0
+
+
+class ChannelMetricsState:
+    """
+    Running state for the derived metrics of a single channel.
+    """
+    __slots__ = ('voltage', 'current', 'samples', 'prev_test_time_s', 'prev_step_time_s',
+                 'prev_step', 'prev_current_a', 'coulomb_count_ah', 'step_voltage_min_v',
+                 'step_voltage_max_v', 'step_current_min_a', 'step_current_max_a')
+
+    def __init__(self, window_size: int):
+        self.voltage = RollingStats(window_size)
+        self.current = RollingStats(window_size)
+        # (test_time_s, voltage_v) pairs used for the rolling dV/dt.
+        self.samples = deque(maxlen=window_size)
+        self.prev_test_time_s = None
+        self.prev_step_time_s = None
+        self.prev_step = None
+        self.prev_current_a = None
+        self.coulomb_count_ah = 0.0
+        self.reset_step()
+
+    def reset_step(self):
+        """
+        Clears the step level extrema.
+        """
+        self.step_voltage_min_v = float('inf')
+        self.step_voltage_max_v = float('-inf')
+        self.step_current_min_a = float('inf')
+        self.step_current_max_a = float('-inf')
+
+    def reset_test(self):
+        """
+        Clears all running state when a new test starts on the channel.
+        """
+        self.voltage = RollingStats(self.voltage.window_size)
+        self.current = RollingStats(self.current.window_size)
+        self.samples.clear()
+        self.prev_current_a = None
+        self.coulomb_count_ah = 0.0
+        self.reset_step()
+
+
+class DerivedMetrics:
+    """
+    Class for incrementally computing derived metrics from channel readings as they are
+    polled. Each reading updates the metrics of its channel in constant time so there is
+    no need to hold on to, or recompute over, the reading history.
+    """
+
+    def __init__(self, window_size: int = 10):
+        """
+        Creates a derived metrics calculator.
+
+        Parameters
+        ----------
+        window_size : *optional* : int
+            The number of most recent readings per channel the rolling dV/dt, mean and variance
+            are computed over. Defaults to 10.
+        """
+        if window_size < 2:
+            raise ValueError('Window size must be at least 2!')
+        self.__window_size = window_size
+        self.__channel_states = {}
+
+    def update(self, channel_status: dict) -> dict:
+        """
+        Updates the metrics for the channel the passed reading belongs to.
+
+        Parameters
+        ----------
+        channel_status : dict
+            A channel status dictionary as returned by `CyclerInterface.read_channel_status()`.
+
+        Returns
+        -------
+        metrics : dict
+            The derived metrics of the channel after the update. Empty if the reading is empty.
+        """
+        if not channel_status:
+            return {}
+
+        channel = channel_status['channel']
+        state = self.__channel_states.get(channel)
+        if state is None:
+            state = ChannelMetricsState(self.__window_size)
+            self.__channel_states[channel] = state
+
+        test_time_s = channel_status['test_time_s']
+        step_time_s = channel_status['step_time_s']
+        voltage_v = channel_status['voltage_v']
+        current_a = channel_status['current_a']
+        step = channel_status.get('step_and_cycle_format')
+
+        # Test time going backwards means a new test was started on the channel.
+        if state.prev_test_time_s is not None and test_time_s < state.prev_test_time_s:
+            logger.debug(f'Test time reset on channel {channel}')
+            state.reset_test()
+        elif (state.prev_step_time_s is not None and step_time_s < state.prev_step_time_s) or \
+                (step != state.prev_step):
+            state.reset_step()
+
+        # Coulomb counting with the trapezoidal rule between consecutive samples.
+        if state.prev_current_a is not None and test_time_s > state.prev_test_time_s:
+            state.coulomb_count_ah += (state.prev_current_a + current_a) / 2 * \
+                (test_time_s - state.prev_test_time_s) / 3600
+
+        # Duplicate samples (e.g. polling faster than the cycler updates) would skew the
+        # rolling window, so only new readings are added to it.
+        if state.prev_test_time_s is None or test_time_s != state.prev_test_time_s or not state.samples:
+            state.voltage.add(voltage_v)
+            state.current.add(current_a)
+            state.samples.append((test_time_s, voltage_v))
+
+        state.step_voltage_min_v = min(state.step_voltage_min_v, voltage_v)
+        state.step_voltage_max_v = max(state.step_voltage_max_v, voltage_v)
+        state.step_current_min_a = min(state.step_current_min_a, current_a)
+        state.step_current_max_a = max(state.step_current_max_a, current_a)
+
+        state.prev_test_time_s = test_time_s
+        state.prev_step_time_s = step_time_s
+        state.prev_step = step
+        state.prev_current_a = current_a
+
+        return self.__metrics(channel, state)
+
+    def update_many(self, channel_statuses: list) -> list:
+        """
+        Updates the metrics for a batch of readings, e.g. one polling sweep over all channels.
+
+        Parameters
+        ----------
+        channel_statuses : list
+            A list of channel status dictionaries.
+
+        Returns
+        -------
+        metrics : list
+            The derived metrics for each reading, in the same order.
+        """
+        return [self.update(channel_status) for channel_status in channel_statuses]
+
+    def get_metrics(self, channel: int) -> dict:
+        """
+        Returns the current derived metrics for a channel.
+
+        Parameters
+        ----------
+        channel : int
+            The channel to return the metrics for, as reported in the channel readings.
+
+        Returns
+        -------
+        metrics : dict
+            The derived metrics of the channel. Empty if no readings have been seen for the channel.
+        """
+        state = self.__channel_states.get(channel)
+        if state is None:
+            return {}
+        return self.__metrics(channel, state)
+
+    def reset(self, channel: int = None):
+        """
+        Forgets the running state for a channel, or for all channels if none is passed.
+
+        Parameters
+        ----------
+        channel : *optional* : int
+            The channel to reset. Defaults to resetting all channels.
+        """
+        if channel is None:
+            self.__channel_states.clear()
+        else:
+            self.__channel_states.pop(channel, None)
+
+    @staticmethod
+    def __metrics(channel: int, state: ChannelMetricsState) -> dict:
+        """
+        Builds the metrics dictionary from a channel's running state.
+        """
+        (first_time_s, first_voltage_v) = state.samples[0]
+        (last_time_s, last_voltage_v) = state.samples[-1]
+        if last_time_s > first_time_s:
+            dvdt_vbys = (last_voltage_v - first_voltage_v) / \
+                (last_time_s - first_time_s)
+        else:
+            dvdt_vbys = 0.0
+
+        return {
+            'channel': channel,
+            'dvdt_vbys': dvdt_vbys,
+            'voltage_mean_v': state.voltage.mean,
+            'voltage_variance_v2': state.voltage.variance,
+            'current_mean_a': state.current.mean,
+            'current_variance_a2': state.current.variance,
+            'coulomb_count_ah': state.coulomb_count_ah,
+            'step_voltage_min_v': state.step_voltage_min_v,
+            'step_voltage_max_v': state.step_voltage_max_v,
+            'step_current_min_a': state.step_current_min_a,
+            'step_current_max_a': state.step_current_max_a,
+        }
@@ -0,0 +1,121 @@
+import bisect
+
+# Upper bounds of the default latency buckets in seconds, from 50 us to 10 s.
+DEFAULT_LATENCY_BUCKETS_S = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class LatencyHistogram:
+    """
+    Fixed bucket histogram for latency measurements. Recording a value is constant time
+    and memory use does not grow with the number of values recorded.
+    """
+
+    def __init__(self, buckets_s: tuple = DEFAULT_LATENCY_BUCKETS_S):
+        """
+        Creates an empty histogram.
+
+        Parameters
+        ----------
+        buckets_s : *optional* : tuple
+            The sorted upper bounds of the buckets in seconds. Values above the last bound
+            are counted in an overflow bucket. Defaults to `DEFAULT_LATENCY_BUCKETS_S`.
+        """
+        self.buckets_s = tuple(buckets_s)
+        self.counts = [0] * (len(self.buckets_s) + 1)
+        self.count = 0
+        self.sum_s = 0.0
+        self.min_s = None
+        self.max_s = None
+
+    def record(self, value_s: float):
+        """
+        Records a latency.
+
+        Parameters
+        ----------
+        value_s : float
+            The latency in seconds.
+        """
+        self.counts[bisect.bisect_left(self.buckets_s, value_s)] += 1
+        self.count += 1
+        self.sum_s += value_s
+        if self.min_s is None or value_s < self.min_s:
+            self.min_s = value_s
+        if self.max_s is None or value_s > self.max_s:
+            self.max_s = value_s
+
+    def merge(self, other: 'LatencyHistogram'):
+        """
+        Adds the counts of another histogram with the same buckets to this one.
+
+        Parameters
+        ----------
+        other : LatencyHistogram
+            The histogram to merge in.
+        """
+        if other.buckets_s != self.buckets_s:
+            raise ValueError('Cannot merge histograms with different buckets!')
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum_s += other.sum_s
+        if other.min_s is not None:
+            self.min_s = other.min_s if self.min_s is None else min(
+                self.min_s, other.min_s)
+        if other.max_s is not None:
+            self.max_s = other.max_s if self.max_s is None else max(
+                self.max_s, other.max_s)
+
+    def percentile(self, percent: float) -> float:
+        """
+        Estimates a percentile by interpolating within the bucket it falls in.
+
+        Parameters
+        ----------
+        percent : float
+            The percentile to estimate, between 0 and 100.
+
+        Returns
+        -------
+        value_s : float
+            The estimated latency in seconds. None if nothing has been recorded.
+        """
+        if not self.count:
+            return None
+
+        rank = percent / 100 * self.count
+        cumulative_count = 0
+        for idx, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative_count + bucket_count >= rank:
+                lower_s = self.buckets_s[idx - 1] if idx > 0 else self.min_s
+                upper_s = self.buckets_s[idx] if idx < len(
+                    self.buckets_s) else self.max_s
+                # Clamp the bucket to the observed range for tighter estimates.
+                lower_s = max(lower_s, self.min_s)
+                upper_s = min(upper_s, self.max_s)
+                fraction = (rank - cumulative_count) / bucket_count
+                return lower_s + (upper_s - lower_s) * fraction
+            cumulative_count += bucket_count
+        return self.max_s
+
+    def to_dict(self) -> dict:
+        """
+        Returns a summary of the histogram.
+
+        Returns
+        -------
+        summary : dict
+            The count, sum, min, max, mean, p50, p99 and bucket counts keyed on bucket upper bound.
+        """
+        return {
+            'count': self.count,
+            'sum_s': self.sum_s,
+            'min_s': self.min_s,
+            'max_s': self.max_s,
+            'mean_s': (self.sum_s / self.count) if self.count else None,
+            'p50_s': self.percentile(50),
+            'p99_s': self.percentile(99),
+            'buckets': {**dict(zip(self.buckets_s, self.counts)), float('inf'): self.counts[-1]},
+        }
@@ -0,0 +1,80 @@
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+
+class TextHTTPServer:
+    """
+    Minimal HTTP server that answers GET requests on a few paths with generated text, e.g.
+    metrics for a scraper. Serves from a background thread.
+    """
+
+    def __init__(self, ip: str, port: int, routes: dict):
+        """
+        Creates the server. Call `start()` to start serving.
+
+        Parameters
+        ----------
+        ip : str
+            The IP address to serve from. Use '127.0.0.1' to only serve locally.
+        port : int
+            The port to serve from. 0 picks a free port, see `get_port()`.
+        routes : dict
+            A `(content_type, generate_text)` tuple keyed on path. `generate_text` is called
+            with no arguments on every request and returns the response body as a string.
+        """
+        self.__routes = dict(routes)
+        routes = self.__routes
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                route = routes.get(self.path.split('?')[0])
+                if route is None:
+                    self.send_error(404)
+                    return
+                content_type, generate_text = route
+                try:
+                    body = generate_text().encode('utf-8')
+                except Exception:
+                    logger.error(
+                        f'Failed to generate response for {self.path}', exc_info=True)
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self.__httpd = ThreadingHTTPServer((ip, port), RequestHandler)
+        self.__httpd.daemon_threads = True
+        self.__thread = None
+
+    def get_port(self) -> int:
+        """
+        Returns the port the server is bound to.
+        """
+        return self.__httpd.server_address[1]
+
+    def start(self):
+        """
+        Starts serving from a background thread.
+        """
+        self.__thread = threading.Thread(
+            target=self.__httpd.serve_forever, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stops serving and closes the server socket.
+        """
+        if self.__thread is not None:
+            self.__httpd.shutdown()
+            self.__thread.join()
+            self.__thread = None
+        self.__httpd.server_close()
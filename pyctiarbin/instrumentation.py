@@ -0,0 +1,85 @@
+import time
+
+# Outcomes of a request/response exchange.
+OUTCOME_OK = 'ok'
+OUTCOME_TIMEOUT = 'timeout'
+OUTCOME_SOCKET_ERROR = 'socket_error'
+OUTCOME_UNPACK_ERROR = 'unpack_error'
+OUTCOME_NOT_CONNECTED = 'not_connected'
+
+
+class RequestEvent:
+    """
+    Describes a single request/response exchange with the Arbin server. Passed to the
+    request hooks installed on a `CyclerInterface` once the responses have been unpacked.
+
+    Attributes
+    ----------
+    command_code : int
+        The client message command code, e.g. `Msg.ChannelInfo.Client.command_code`.
+    channels : list
+        The channels the request applies to, numbered from 1. Empty for login.
+    num_msgs : int
+        The number of messages sent together in the request.
+    bytes_sent : int
+        The number of bytes sent.
+    bytes_received : int
+        The number of bytes of the responses received.
+    pack_time_s : float
+        Time spent building and packing the request.
+    network_time_s : float
+        Time from sending the request to receiving the last response, or failing to.
+    unpack_time_s : float
+        Time spent unpacking and handling the responses.
+    outcome : str
+        `ok`, `timeout`, `socket_error`, `unpack_error` or `not_connected`.
+    reconnected : bool
+        Whether the connection was re-established after a failure during the exchange.
+    result : object
+        What the request returned to the caller, e.g. the channel status dictionary for
+        channel info requests. None if nothing was returned.
+    """
+    __slots__ = ('command_code', 'channels', 'num_msgs', 'bytes_sent', 'bytes_received',
+                 'pack_time_s', 'network_time_s', 'unpack_time_s', 'outcome', 'reconnected',
+                 'result', 'start_time', 'network_end_time')
+
+    def __init__(self, command_code: int, channels: list):
+        self.command_code = command_code
+        self.channels = channels
+        self.num_msgs = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.pack_time_s = 0.0
+        self.network_time_s = 0.0
+        self.unpack_time_s = 0.0
+        self.outcome = OUTCOME_OK
+        self.reconnected = False
+        self.result = None
+        # perf_counter() timestamps used to split the exchange into its stages.
+        self.start_time = time.perf_counter()
+        self.network_end_time = self.start_time
+
+    @property
+    def total_time_s(self) -> float:
+        """
+        Time spent on the whole exchange.
+        """
+        return self.pack_time_s + self.network_time_s + self.unpack_time_s
+
+    def to_dict(self) -> dict:
+        """
+        Returns the event as a dictionary, without the result.
+        """
+        return {
+            'command_code': self.command_code,
+            'channels': list(self.channels),
+            'num_msgs': self.num_msgs,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'pack_time_s': self.pack_time_s,
+            'network_time_s': self.network_time_s,
+            'unpack_time_s': self.unpack_time_s,
+            'total_time_s': self.total_time_s,
+            'outcome': self.outcome,
+            'reconnected': self.reconnected,
+        }
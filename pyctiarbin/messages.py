@@ -18,6 +18,9 @@ class MessageABC(ABC):
     # Template that is specific to each message type. Should be overwritten in child class
     msg_specific_template = {}
 
+    # Format of the checksum appended after the `msg_length` bytes of every message
+    checksum_format = '<H'
+
     # Base message template that is common for all messages
     base_template = {
         'header': {
@@ -85,12 +88,30 @@ class MessageABC(ABC):
             logger.warning(
                 f'Decoded command code {decoded_msg_dict["command_code"]} does not match what was expected!')
 
-        if decoded_msg_dict['msg_length'] != cls.msg_length:
+        if decoded_msg_dict['msg_length'] != cls.expected_msg_length(decoded_msg_dict):
             logger.warning(
                 f'Decoded message length {decoded_msg_dict["msg_length"]} does not match what was expected!')
 
         return decoded_msg_dict
 
+    @classmethod
+    def expected_msg_length(cls, msg_dict: dict) -> int:
+        """
+        Returns the message length expected for the passed message. Fixed length messages
+        always expect `msg_length`. Variable length messages should overwrite this.
+
+        Parameters
+        ----------
+        msg_dict : dict
+            The decoded message.
+
+        Returns
+        -------
+        msg_length : int
+            The expected message length.
+        """
+        return cls.msg_length
+
     @classmethod
     def pack(cls, msg_values={}) -> bytearray:
         """
@@ -152,7 +173,7 @@ class MessageABC(ABC):
 
         # Append a checksum to the end of the message
         if msg_bin:
-            msg_bin += struct.pack('<H', sum(msg_bin))
+            msg_bin += struct.pack(cls.checksum_format, sum(msg_bin) & 0xFFFF)
 
         return msg_bin
 
@@ -564,6 +585,28 @@ class Msg:
                 },
             }
 
+            # Aux readings start after the fixed fields, one (reading, dt) float pair per reading.
+            aux_start_byte = 1777
+
+            aux_count_names = [
+                'aux_voltage_count',
+                'aux_temperature_count',
+                'aux_pressure_count',
+                'aux_external_count',
+                'aux_flow_count',
+                'aux_ao_count',
+                'aux_di_count',
+                'aux_do_count',
+                'aux_humidity_count',
+                'aux_safety_count',
+                'aux_ph_count',
+                'aux_density_count'
+            ]
+            aux_reading_names = [re.split('_count', aux_count_name)[0]
+                                 for aux_count_name in aux_count_names]
+            aux_list_names = [aux_reading_name + suffix for aux_reading_name in aux_reading_names
+                              for suffix in ('', '_dt')]
+
             # List of staus codes. Each index in the corresponding status code.
             status_code_dict = {
                 0: 'Idle',
@@ -623,7 +666,11 @@ class Msg:
             @classmethod
             def pack(cls, msg_values={}) -> bytearray:
                 """
-                Same as parent method, but handles packing aux measurements.
+                Same as parent method, but handles packing aux measurements. The number of
+                readings of each aux type is set by its count, e.g. `aux_voltage_count`, and the
+                readings are taken from the matching lists, e.g. `aux_voltage` and `aux_voltage_dt`.
+                Missing readings are packed as zeros. The message length grows by 8 bytes per
+                aux reading.
 
                 Parameters
                 ----------
@@ -636,10 +683,67 @@ class Msg:
                 msg : bytearray
                     Packed response message.
                 """
-                # TODO : Modify so that we can aux values can be packed.
-                msg_bin = super().pack(msg_values)
+                template_values = {key: value for key, value in msg_values.items()
+                                   if key not in cls.aux_list_names}
+                msg_bin = super().pack(template_values)
+
+                aux_bin = cls.pack_aux_readings(msg_values)
+                if not (msg_bin and aux_bin):
+                    return msg_bin
+
+                # Insert the aux readings at the end of the fixed fields, update the length and
+                # recalculate the checksum.
+                msg_length = cls.msg_length + len(aux_bin)
+                msg_bin = msg_bin[:cls.aux_start_byte] + aux_bin + \
+                    msg_bin[cls.aux_start_byte:cls.msg_length]
+                struct.pack_into(cls.base_template['msg_length']['format'], msg_bin,
+                                 cls.base_template['msg_length']['start_byte'], msg_length)
+                msg_bin += struct.pack(cls.checksum_format, sum(msg_bin) & 0xFFFF)
                 return msg_bin
 
+            @classmethod
+            def pack_aux_readings(cls, msg_values: dict) -> bytes:
+                """
+                Packs the aux readings of a message as (reading, dt) float pairs grouped by aux
+                type, in a single struct call.
+
+                Parameters
+                ----------
+                msg_values : dict
+                    The aux counts and aux reading lists to pack.
+
+                Returns
+                -------
+                aux_bin : bytes
+                    The packed aux readings. Empty if all the aux counts are zero.
+                """
+                aux_values = []
+                for count_name, reading_name in zip(cls.aux_count_names, cls.aux_reading_names):
+                    count = msg_values.get(count_name, 0)
+                    if not count:
+                        continue
+                    readings = msg_values.get(reading_name, [])
+                    readings_dt = msg_values.get(reading_name + '_dt', [])
+                    if len(readings) != count or len(readings_dt) != count:
+                        logger.warning(
+                            f'Expected {count} {reading_name} readings but got {len(readings)} readings and {len(readings_dt)} dt values!')
+                        readings = list(readings[:count]) + \
+                            [0.0] * (count - len(readings))
+                        readings_dt = list(readings_dt[:count]) + \
+                            [0.0] * (count - len(readings_dt))
+                    # Interleave the readings with their dt values.
+                    aux_values.extend(
+                        value for pair in zip(readings, readings_dt) for value in pair)
+
+                return struct.pack(f'<{len(aux_values)}f', *aux_values)
+
+            @classmethod
+            def expected_msg_length(cls, msg_dict: dict) -> int:
+                """
+                Returns the message length expected for the aux counts of the passed message.
+                """
+                return cls.msg_length + 8 * sum(msg_dict.get(count_name, 0) for count_name in cls.aux_count_names)
+
             @classmethod
             def aux_readings_parser(cls, msg_dict: dict, msg_bin: bytearray, starting_aux_idx=1777):
                 """
@@ -660,51 +764,22 @@ class Msg:
                 msg_dict : dict
                     The message with items decoded into a dictionary
                 """
-                aux_lists = []
-
-                aux_count_name_list = [
-                    'aux_voltage_count',
-                    'aux_temperature_count',
-                    'aux_pressure_count',
-                    'aux_external_count',
-                    'aux_flow_count',
-                    'aux_ao_count',
-                    'aux_di_count',
-                    'aux_do_count',
-                    'aux_humidity_count',
-                    'aux_safety_count',
-                    'aux_ph_count',
-                    'aux_density_count'
-                ]
-
-                # Generate a list of readings for each aux reading.
-                # If count is non-zero then genreate a aux_reading and aux_reading_dt list of that length
-                # Else, generate empty lists for the aux_reading and aux_reading_dt
-                for aux_count_name in aux_count_name_list:
-                    aux_reading_name = re.split('_count', aux_count_name)[0]
-                    aux_dt_name = aux_reading_name + '_dt'
-                    if msg_dict[aux_count_name]:
-                        msg_dict[aux_reading_name] = [0 for x in range(
-                            msg_dict[aux_count_name])]
-                        msg_dict[aux_dt_name] = [0 for x in range(
-                            msg_dict[aux_count_name])]
-                        aux_lists.append(
-                            [msg_dict[aux_reading_name], msg_dict[aux_dt_name]])
-                    else:
-                        msg_dict[aux_reading_name] = []
-                        msg_dict[aux_dt_name] = []
-
-                # For aux readings that have a measurements, add them to the respective reading list.
-                current_aux_idx = starting_aux_idx
-                for readings_list in aux_lists:
-                    for i in range(0, len(readings_list[0])):
-                        # The first list in reading list is reading itself
-                        readings_list[0][i] = struct.unpack(
-                            '<f', msg_bin[current_aux_idx:current_aux_idx+4])[0]
-                        # The second reading in the list is the dt value.
-                        readings_list[1][i] = struct.unpack(
-                            '<f', msg_bin[current_aux_idx+4:current_aux_idx+8])[0]
-                        current_aux_idx += 8
+                # Decode every aux reading and dt value with a single struct call.
+                aux_counts = [msg_dict[aux_count_name]
+                              for aux_count_name in cls.aux_count_names]
+                aux_values = struct.unpack_from(
+                    f'<{2 * sum(aux_counts)}f', msg_bin, starting_aux_idx)
+
+                # Readings of each aux type are stored as (reading, dt) pairs. Aux types with a
+                # zero count get empty aux_reading and aux_reading_dt lists.
+                current_aux_idx = 0
+                for aux_count, aux_reading_name in zip(aux_counts, cls.aux_reading_names):
+                    end_aux_idx = current_aux_idx + 2 * aux_count
+                    msg_dict[aux_reading_name] = list(
+                        aux_values[current_aux_idx:end_aux_idx:2])
+                    msg_dict[aux_reading_name + '_dt'] = list(
+                        aux_values[current_aux_idx + 1:end_aux_idx:2])
+                    current_aux_idx = end_aux_idx
 
                 return msg_dict
 
@@ -724,7 +799,7 @@ class Msg:
                     'start_byte': 20,
                     'value': 0
                 },
-                # Always 0x00 for PyCTI-Arbin since we only work with single channels
+                # 0x00 to assign a single channel, 0x01 to assign all channels
                 'assign_all_channels': {
                     'format': '1s',
                     'start_byte': 24,
@@ -925,6 +1000,69 @@ class Msg:
                 },
             }
 
+            @classmethod
+            def pack(cls, msg_values={}) -> bytearray:
+                """
+                Same as the parent method, but a list of channels can be passed under the
+                `channels` key to start the test on all of them with a single message.
+
+                Parameters
+                ----------
+                msg_values : dict
+                    A dictionary detailing which default values in the message temple should be
+                    updated.
+
+                Returns
+                -------
+                msg_bin : bytearray
+                    Packed message.
+                """
+                channels = msg_values.get('channels')
+                if not channels:
+                    return super().pack({key: value for key, value in msg_values.items() if key != 'channels'})
+
+                msg_values = {key: value for key, value in msg_values.items()
+                              if key not in ('channels', 'msg_length')}
+                msg_values['num_channels_to_start'] = len(channels)
+                msg_values['channel'] = channels[0]
+                msg_bin = super().pack(msg_values)
+                if not msg_bin:
+                    return msg_bin
+
+                # The channel list continues past the first channel in the template. Strip the
+                # checksum, append the remaining channels and then update the length and checksum.
+                channel_item = cls.msg_specific_template['channel']
+                msg_bin = msg_bin[:-2]
+                for channel in channels[1:]:
+                    msg_bin += struct.pack(channel_item['format'], channel)
+                struct.pack_into(cls.base_template['msg_length']['format'], msg_bin,
+                                 cls.base_template['msg_length']['start_byte'],
+                                 cls.msg_length + struct.calcsize(channel_item['format']) * (len(channels) - 1))
+                msg_bin += struct.pack(cls.checksum_format, sum(msg_bin) & 0xFFFF)
+                return msg_bin
+
+            @classmethod
+            def unpack_channels(cls, msg_bin: bytearray) -> list:
+                """
+                Returns the list of all channels a start schedule message applies to.
+
+                Parameters
+                ----------
+                msg_bin : bytearray
+                    The message to unpack.
+
+                Returns
+                -------
+                channels : list
+                    The zero-indexed channels to start.
+                """
+                num_channels_item = cls.msg_specific_template['num_channels_to_start']
+                channel_item = cls.msg_specific_template['channel']
+                num_channels = struct.unpack_from(
+                    num_channels_item['format'], msg_bin, num_channels_item['start_byte'])[0]
+                return list(struct.unpack_from(
+                    '<' + 'H' * num_channels, msg_bin, channel_item['start_byte']))
+
         class Server(MessageABC):
             msg_length = 128
             command_code = 0XBB230004
@@ -1215,3 +1353,11 @@ class Msg:
                     msg_dict['result'] = cls.mv_result_decoder[result]
 
                 return msg_dict
+
+
+# Name of each client command code, shared by everything that configures or reports per
+# command behaviour.
+COMMAND_NAMES = {
+    getattr(Msg, command_name).Client.command_code: command_name
+    for command_name in ('Login', 'ChannelInfo', 'AssignSchedule', 'StartSchedule',
+                         'StopSchedule', 'SetMetaVariable')}
@@ -0,0 +1,199 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class MetaVariableWriter:
+    """
+    Class for asynchronously writing meta variables to a channel. Updates are queued without
+    blocking and a background thread sends them. Updates to a meta variable that are still
+    waiting to be sent are replaced by newer ones so only the latest value is written, and
+    values equal to the last value the cycler acknowledged are not written at all.
+    """
+
+    def __init__(self, channel_interface):
+        """
+        Creates a meta variable writer. Call `start()` to begin writing.
+
+        Parameters
+        ----------
+        channel_interface : ChannelInterface
+            The interface to the channel to write meta variables to.
+        """
+        self.__channel_interface = channel_interface
+
+        self.__condition = threading.Condition()
+        self.__pending = {}
+        self.__last_acknowledged = {}
+        self.__writing = False
+        self.__stop = False
+        self.__writer_thread = None
+
+        self.__stats = {
+            'submitted': 0,
+            'coalesced': 0,
+            'skipped': 0,
+            'written': 0,
+            'failed': 0,
+            'batches': 0,
+        }
+
+    def start(self):
+        """
+        Starts the background thread that writes the queued meta variables.
+        """
+        with self.__condition:
+            if self.__writer_thread is not None and self.__writer_thread.is_alive():
+                raise RuntimeError('Meta variable writer is already running!')
+            self.__stop = False
+            self.__writer_thread = threading.Thread(
+                target=self.__write_loop, daemon=True)
+            self.__writer_thread.start()
+
+    def stop(self, flush: bool = True, timeout_s: float = None):
+        """
+        Stops the background writer thread.
+
+        Parameters
+        ----------
+        flush : *optional* : bool
+            Write any queued meta variables before stopping. Defaults to True.
+        timeout_s : *optional* : float
+            How long to wait for the queued meta variables to be written. Defaults to no limit.
+        """
+        if flush:
+            self.flush(timeout_s)
+        with self.__condition:
+            self.__stop = True
+            self.__condition.notify_all()
+        if self.__writer_thread is not None:
+            self.__writer_thread.join()
+            self.__writer_thread = None
+
+    def set_meta_variable(self, mv_num: int, mv_value: float):
+        """
+        Queues the passed meta variable number `mv_num` to be set to `mv_value`. Returns
+        immediately. Replaces any value for the same meta variable that has not been sent yet.
+
+        Parameters
+        ----------
+        mv_num : int
+            The meta variable number to set. Must be between 1 and 16 (inclusive)
+        mv_value : float
+            The meta variable value to set.
+        """
+        self.set_meta_variables({mv_num: mv_value})
+
+    def set_meta_variables(self, mv_values: dict):
+        """
+        Queues several meta variables to be set. Returns immediately. Replaces any values for
+        the same meta variables that have not been sent yet.
+
+        Parameters
+        ----------
+        mv_values : dict
+            The meta variable values to set keyed on meta variable number.
+        """
+        with self.__condition:
+            for mv_num, mv_value in mv_values.items():
+                self.__stats['submitted'] += 1
+                if mv_num in self.__pending:
+                    self.__stats['coalesced'] += 1
+                self.__pending[mv_num] = mv_value
+            self.__condition.notify_all()
+
+    def flush(self, timeout_s: float = None) -> bool:
+        """
+        Waits until every queued meta variable has been written.
+
+        Parameters
+        ----------
+        timeout_s : *optional* : float
+            How long to wait in seconds. Defaults to no limit.
+
+        Returns
+        -------
+        flushed : bool
+            True if the queue was emptied, False if the wait timed out or the writer is
+            not running.
+        """
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
+        with self.__condition:
+            while self.__pending or self.__writing:
+                if self.__writer_thread is None or not self.__writer_thread.is_alive():
+                    return False
+                wait_s = None if deadline is None else deadline - time.monotonic()
+                if wait_s is not None and wait_s <= 0:
+                    return False
+                self.__condition.wait(wait_s)
+        return True
+
+    def get_last_acknowledged(self) -> dict:
+        """
+        Returns the last value the cycler acknowledged for each meta variable number.
+        """
+        with self.__condition:
+            return dict(self.__last_acknowledged)
+
+    def get_stats(self) -> dict:
+        """
+        Returns the writer counters.
+
+        Returns
+        -------
+        stats : dict
+            The number of meta variable values submitted, replaced by a newer value before
+            being sent (`coalesced`), not sent because they equalled the last acknowledged
+            value (`skipped`), written successfully, failed, and the number of batches sent.
+            Also the number of values currently pending.
+        """
+        with self.__condition:
+            stats = dict(self.__stats)
+            stats['pending'] = len(self.__pending)
+        return stats
+
+    def __write_loop(self):
+        """
+        Sends the queued meta variables until the writer is stopped.
+        """
+        while True:
+            with self.__condition:
+                while not self.__pending and not self.__stop:
+                    self.__condition.wait()
+                if self.__stop:
+                    return
+
+                mv_values = {}
+                for mv_num, mv_value in self.__pending.items():
+                    if self.__last_acknowledged.get(mv_num) == mv_value:
+                        self.__stats['skipped'] += 1
+                    else:
+                        mv_values[mv_num] = mv_value
+                self.__pending = {}
+                self.__writing = bool(mv_values)
+                if not mv_values:
+                    self.__condition.notify_all()
+                    continue
+
+            try:
+                results = self.__channel_interface.set_meta_variables(
+                    mv_values)
+            except Exception:
+                logger.error(
+                    'Failed to write meta variables!', exc_info=True)
+                results = {}
+
+            with self.__condition:
+                self.__stats['batches'] += 1
+                for mv_num, mv_value in mv_values.items():
+                    if results.get(mv_num) == 'success':
+                        self.__stats['written'] += 1
+                        self.__last_acknowledged[mv_num] = mv_value
+                    else:
+                        self.__stats['failed'] += 1
+                        logger.error(
+                            f'Failed to write meta variable {mv_num} value {mv_value}! Issue: {results.get(mv_num)}')
+                self.__writing = False
+                self.__condition.notify_all()
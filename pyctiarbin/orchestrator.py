@@ -0,0 +1,470 @@
+import logging
+import os
+import queue
+import threading
+import time
+from pydantic import BaseModel, field_validator
+from .cycler_interface import CyclerInterface
+from .messages import Msg
+
+logger = logging.getLogger(__name__)
+
+# Feedback results that can clear on their own, so the request is worth retrying.
+# A result of None, meaning no response was received, is also retried.
+TRANSIENT_ASSIGN_RESULTS = (
+    Msg.AssignSchedule.Server.assign_schedule_feedback_codes[17],
+    Msg.AssignSchedule.Server.assign_schedule_feedback_codes[21],
+)
+TRANSIENT_START_RESULTS = (
+    Msg.StartSchedule.Server.start_test_feedback_codes[17],
+    Msg.StartSchedule.Server.start_test_feedback_codes[33],
+)
+
+# Channel statuses that show no test is running, used to check whether a start request whose
+# response was lost went through before retrying it.
+IDLE_STATUSES = (
+    Msg.ChannelInfo.Server.status_code_dict[0],
+    Msg.ChannelInfo.Server.status_code_dict[15],
+    Msg.ChannelInfo.Server.status_code_dict[20],
+)
+
+
+class FleetOrchestrator:
+    """
+    Class for assigning schedules, starting tests and setting meta variable presets on many
+    channels across many cyclers at once. Each cycler is served by its own pool of
+    connections so cyclers are launched in parallel, and the pool size caps how many
+    requests are in flight to any one cycler.
+    """
+
+    def __init__(self, config: dict = {}, env_path: str = os.path.join(os.getcwd(), '.env')):
+        """
+        Creates a fleet orchestrator.
+
+        Parameters
+        ----------
+        config : *optional* : dict
+            A configuration dictionary. May contain the following keys:
+                max_concurrency_per_cycler : *optional* : int
+                    The most connections to open to a single cycler. Defaults to 4.
+                max_retries : *optional* : int
+                    How many times to retry a request that failed with a transient result.
+                    Defaults to 3.
+                retry_delay_s : *optional* : float
+                    How long to wait before retrying a request. Doubles on every retry.
+                    Defaults to 1 second.
+                timeout_s : *optional* : float
+                    How long to wait before timing out on TCP communication. Defaults to 3 seconds.
+                msg_buffer_size : *optional* : int
+                    How big of a message buffer to use for sending/receiving messages.
+                    Defaults to 4096 bytes.
+        env_path : *optional* : str
+            The path to the `.env` file containing the Arbin CTI username,`ARBIN_CTI_USERNAME`, and password, `ARBIN_CTI_PASSWORD`.
+            Defaults to looking in the working directory.
+        """
+        self.__config = FleetOrchestratorConfig(**config)
+        self.__env_path = env_path
+
+    def launch(self, plan: list) -> dict:
+        """
+        Executes the passed plan. Blocks until every entry has been launched or has failed.
+
+        Parameters
+        ----------
+        plan : list
+            A list of dictionaries, one per channel, containing the following keys:
+                ip_address : str
+                    The IP address of the Arbin host computer the channel is on.
+                port : int
+                    The TCP port to communicate through.
+                channel : int
+                    The channel to launch the test on.
+                test_name : str
+                    The test name to use.
+                schedule_name : *optional* : str
+                    The schedule to assign before starting the test. If not set the schedule
+                    already assigned to the channel is used.
+                mv_presets : *optional* : dict
+                    Meta variable values to set once the test is running, keyed on meta
+                    variable number.
+
+        Returns
+        -------
+        report : dict
+            A summary report containing the number of entries, how many succeeded and failed,
+            the failures grouped by result, how long the launch took and the result of each
+            entry in plan order.
+        """
+        start_time = time.perf_counter()
+
+        entries = [FleetPlanEntry(**entry) for entry in plan]
+        results = [None] * len(entries)
+
+        # Entries on the same cycler that share a schedule are launched together, so the
+        # schedule is assigned to all of their channels with a single request.
+        cycler_batches = {}
+        for idx, entry in enumerate(entries):
+            cycler = (entry.ip_address, entry.port)
+            cycler_batches.setdefault(cycler, {}).setdefault(
+                entry.schedule_name, []).append((idx, entry))
+
+        workers = []
+        for cycler, batches in cycler_batches.items():
+            batch_queue = queue.Queue()
+            for batch in batches.values():
+                batch_queue.put(batch)
+            num_workers = min(
+                self.__config.max_concurrency_per_cycler, batch_queue.qsize())
+            for _ in range(num_workers):
+                workers.append(threading.Thread(
+                    target=self.__cycler_worker,
+                    args=(cycler, batch_queue, results),
+                    daemon=True))
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        # Entries left without a result if a worker died before reaching them.
+        for idx, result in enumerate(results):
+            if result is None:
+                results[idx] = self.__entry_result(
+                    entries[idx], 'error', 'Not launched', 0, 0.0)
+
+        failures = {}
+        for result in results:
+            if not result['success']:
+                failure = f'{result["stage"]}: {result["result"]}'
+                failures[failure] = failures.get(failure, 0) + 1
+
+        report = {
+            'total': len(results),
+            'succeeded': sum(result['success'] for result in results),
+            'failed': sum(not result['success'] for result in results),
+            'failures': failures,
+            'retries': sum(result['retries'] for result in results),
+            'num_cyclers': len(cycler_batches),
+            'duration_s': time.perf_counter() - start_time,
+            'results': results,
+        }
+        logger.info(
+            f'Launched {report["succeeded"]} of {report["total"]} channels on {report["num_cyclers"]} cyclers in {report["duration_s"]:.2f} s')
+        return report
+
+    def __cycler_worker(self, cycler: tuple, batch_queue: queue.Queue, results: list):
+        """
+        Opens a connection to a cycler and launches batches of entries from its queue until
+        the queue is empty. The connection is closed once the worker is done.
+
+        Parameters
+        ----------
+        cycler : tuple
+            The IP address and port of the cycler.
+        batch_queue : queue.Queue
+            The queue of batches to launch on this cycler. Each batch is a list of
+            (plan index, plan entry) sharing a schedule.
+        results : list
+            The list to store the result of each plan entry in.
+        """
+        ip_address, port = cycler
+        cycler_interface = None
+        try:
+            try:
+                cycler_interface = CyclerInterface(
+                    {'ip_address': ip_address,
+                     'port': port,
+                     'timeout_s': self.__config.timeout_s,
+                     'msg_buffer_size': self.__config.msg_buffer_size},
+                    env_path=self.__env_path)
+            except Exception:
+                logger.error(
+                    f'Failed to connect to cycler at {ip_address}:{port}!', exc_info=True)
+
+            while True:
+                try:
+                    batch = batch_queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                if cycler_interface is None:
+                    for idx, entry in batch:
+                        results[idx] = self.__entry_result(
+                            entry, 'connect', 'Failed to connect to cycler', 0, 0.0)
+                    continue
+
+                self.__launch_batch(cycler_interface, batch, results)
+        finally:
+            if cycler_interface is not None:
+                cycler_interface.close()
+
+    def __launch_batch(self, cycler_interface: CyclerInterface, batch: list, results: list):
+        """
+        Assigns the shared schedule to every channel of a batch, then starts the test and sets
+        the meta variable presets on each group of channels sharing a test, retrying requests
+        that fail with a transient result. An unexpected exception fails the entries it
+        interrupted without stopping the rest of the batch.
+
+        Parameters
+        ----------
+        cycler_interface : CyclerInterface
+            The connection to the cycler the batch is on.
+        batch : list
+            The (plan index, plan entry) to launch, all sharing a schedule.
+        results : list
+            The list to store the result of each plan entry in.
+        """
+        start_time = time.perf_counter()
+        ip_address, port = batch[0][1].ip_address, batch[0][1].port
+        schedule_name = batch[0][1].schedule_name
+        retries = {entry.channel: 0 for _, entry in batch}
+
+        test_batches = {}
+        if schedule_name:
+            try:
+                assign_results = self.__with_retries(
+                    lambda channels: cycler_interface.assign_schedule_to_channels(
+                        channels, schedule_name),
+                    list(retries), TRANSIENT_ASSIGN_RESULTS, retries)
+            except Exception as e:
+                logger.error(
+                    f'Failed to assign schedule {schedule_name} on cycler at {ip_address}:{port}!', exc_info=True)
+                for idx, entry in batch:
+                    results[idx] = self.__entry_result(
+                        entry, 'error', str(e), retries[entry.channel], time.perf_counter() - start_time)
+                return
+
+            for idx, entry in batch:
+                result = assign_results[entry.channel]
+                if result != 'success':
+                    results[idx] = self.__entry_result(
+                        entry, 'assign', result, retries[entry.channel], time.perf_counter() - start_time)
+                    continue
+                test_batches.setdefault(entry.test_name, []).append((idx, entry))
+        else:
+            for idx, entry in batch:
+                test_batches.setdefault(entry.test_name, []).append((idx, entry))
+
+        for test_name, test_batch in test_batches.items():
+            try:
+                self.__start_test_batch(
+                    cycler_interface, test_name, test_batch, retries, start_time, results)
+            except Exception as e:
+                logger.error(
+                    f'Failed to start test {test_name} on cycler at {ip_address}:{port}!', exc_info=True)
+                for idx, entry in test_batch:
+                    if results[idx] is None:
+                        results[idx] = self.__entry_result(
+                            entry, 'error', str(e), retries[entry.channel],
+                            time.perf_counter() - start_time)
+
+    def __start_test_batch(self, cycler_interface: CyclerInterface, test_name: str, test_batch: list,
+                           retries: dict, start_time: float, results: list):
+        """
+        Starts a test on every channel of a batch with a single request and then sets the meta
+        variable presets of the started channels with a single request.
+
+        Parameters
+        ----------
+        cycler_interface : CyclerInterface
+            The connection to the cycler the batch is on.
+        test_name : str
+            The test name shared by the batch.
+        test_batch : list
+            The (plan index, plan entry) to start the test on.
+        retries : dict
+            The retries made so far on each channel. Updated with the retries made here.
+        start_time : float
+            When the launch of the batch started.
+        results : list
+            The list to store the result of each plan entry in.
+        """
+        start_results = self.__with_retries(
+            lambda channels: cycler_interface.start_test_on_channels(
+                channels, test_name),
+            [entry.channel for _, entry in test_batch], TRANSIENT_START_RESULTS, retries,
+            lambda channels: self.__started_channels(cycler_interface, channels, test_name))
+
+        mv_results = {}
+        channel_mv_presets = {entry.channel: entry.mv_presets for _, entry in test_batch
+                              if entry.mv_presets and start_results[entry.channel] == 'success'}
+        if channel_mv_presets:
+            mv_results = cycler_interface.set_meta_variables_on_channels(
+                channel_mv_presets)
+
+        for idx, entry in test_batch:
+            channel = entry.channel
+            duration_s = time.perf_counter() - start_time
+            if start_results[channel] != 'success':
+                results[idx] = self.__entry_result(
+                    entry, 'start', start_results[channel], retries[channel], duration_s)
+                continue
+
+            channel_mv_results = mv_results.get(channel, {})
+            failed_mv_results = [mv_result for mv_result in channel_mv_results.values()
+                                 if mv_result != 'success']
+            if failed_mv_results:
+                results[idx] = self.__entry_result(
+                    entry, 'mv_presets', failed_mv_results[0], retries[channel], duration_s,
+                    channel_mv_results)
+            else:
+                results[idx] = self.__entry_result(
+                    entry, 'done', 'success', retries[channel], duration_s, channel_mv_results)
+
+    @staticmethod
+    def __started_channels(cycler_interface: CyclerInterface, channels: list, test_name: str) -> list:
+        """
+        Reads the status of each passed channel to find those already running the test, e.g.
+        because the start request went through but its response was lost.
+
+        Parameters
+        ----------
+        cycler_interface : CyclerInterface
+            The connection to the cycler the channels are on.
+        channels : list
+            The channels to check.
+        test_name : str
+            The test name the channels were started with.
+
+        Returns
+        -------
+        started_channels : list
+            The channels running the test.
+        """
+        started_channels = []
+        for channel in channels:
+            channel_status = cycler_interface.read_channel_status(channel)
+            if (channel_status and channel_status['testname'] == test_name
+                    and channel_status['status'] not in IDLE_STATUSES):
+                started_channels.append(channel)
+        return started_channels
+
+    def __with_retries(self, request, channels: list, transient_results: tuple, retries: dict,
+                       confirm_lost=None) -> dict:
+        """
+        Calls the passed request on the passed channels, then again on the channels whose
+        result was transient until none are left or the retries run out.
+
+        Parameters
+        ----------
+        request : function
+            Makes the request on a list of channels and returns the result of each channel.
+        channels : list
+            The channels to make the request on.
+        transient_results : tuple
+            The results worth retrying.
+        retries : dict
+            The retries made on each channel. Updated with the retries made here.
+        confirm_lost : *optional* : function
+            Called with the channels that received no response before they are retried and
+            returns those the request took effect on anyway, which are then counted as
+            successful. Requests that must not be repeated, such as starting a test, should
+            pass this. Defaults to retrying every channel without a response.
+
+        Returns
+        -------
+        results : dict
+            The result of the last attempt on each channel.
+        """
+        retry_delay_s = self.__config.retry_delay_s
+        results = {}
+        num_retries = 0
+        while True:
+            results.update(request(channels))
+            channels = [channel for channel in channels if (results.get(channel) is None)
+                        or (results[channel] in transient_results)]
+
+            lost_channels = [
+                channel for channel in channels if results.get(channel) is None]
+            if confirm_lost is not None and lost_channels:
+                confirmed_channels = confirm_lost(lost_channels)
+                for channel in confirmed_channels:
+                    results[channel] = 'success'
+                channels = [
+                    channel for channel in channels if channel not in confirmed_channels]
+
+            if (not channels) or (num_retries >= self.__config.max_retries):
+                return results
+            num_retries += 1
+            for channel in channels:
+                retries[channel] += 1
+            logger.warning(
+                f'Retrying request on channels {channels} after transient results '
+                f'{[results.get(channel) for channel in channels]}. Retry {num_retries} of {self.__config.max_retries}')
+            time.sleep(retry_delay_s)
+            retry_delay_s *= 2
+
+    @staticmethod
+    def __entry_result(entry: 'FleetPlanEntry', stage: str, result: str, retries: int,
+                       duration_s: float, mv_results: dict = None) -> dict:
+        """
+        Builds the result dictionary for a plan entry.
+        """
+        return {
+            'ip_address': entry.ip_address,
+            'port': entry.port,
+            'channel': entry.channel,
+            'test_name': entry.test_name,
+            'success': result == 'success',
+            'stage': stage,
+            'result': result,
+            'retries': retries,
+            'mv_results': dict(mv_results or {}),
+            'duration_s': duration_s,
+        }
+
+
+class FleetOrchestratorConfig(BaseModel):
+    '''
+    Holds config information for the FleetOrchestrator class.
+
+    Parameters
+    ----------
+        max_concurrency_per_cycler : int
+            The most connections to open to a single cycler. Defaults to 4.
+        max_retries : int
+            How many times to retry a request that failed with a transient result. Defaults to 3.
+        retry_delay_s : float
+            How long to wait before retrying a request. Defaults to 1 second.
+        timeout_s : float
+            How long to wait before timing out on TCP communication. Defaults to 3 seconds.
+        msg_buffer_size : int
+            How big of a message buffer to use for sending/receiving messages. Defaults to 4096 bytes.
+    '''
+    max_concurrency_per_cycler: int = 4
+    max_retries: int = 3
+    retry_delay_s: float = 1.0
+    timeout_s: float = 3.0
+    msg_buffer_size: int = 4096
+
+    @field_validator('max_concurrency_per_cycler')
+    def concurrency_positive(cls, v):
+        if v < 1:
+            raise ValueError('max_concurrency_per_cycler must be at least 1')
+        return v
+
+
+class FleetPlanEntry(BaseModel):
+    '''
+    Holds a single channel of a FleetOrchestrator plan.
+
+    Parameters
+    ----------
+        ip_address : str
+            The IP address of the Arbin host computer the channel is on.
+        port : int
+            The TCP port to communicate through.
+        channel : int
+            The channel to launch the test on.
+        test_name : str
+            The test name to use.
+        schedule_name : *optional* : str
+            The schedule to assign before starting the test.
+        mv_presets : *optional* : dict
+            Meta variable values to set once the test is running.
+    '''
+    ip_address: str
+    port: int
+    channel: int
+    test_name: str
+    schedule_name: str = None
+    mv_presets: dict = {}
@@ -0,0 +1,171 @@
+import threading
+from .histogram import DEFAULT_LATENCY_BUCKETS_S, LatencyHistogram
+from .http_text_server import TextHTTPServer
+from .instrumentation import OUTCOME_OK
+from .messages import COMMAND_NAMES
+
+
+class PrometheusExporter:
+    """
+    Request hook that keeps metrics on the requests made by a `CyclerInterface` and exposes
+    them in the Prometheus exposition format: counters of requests, errors, reconnects and
+    logins, latency histograms per command, whether the connection is up, and the last
+    voltage, current and status read from each channel.
+    """
+
+    def __init__(self, latency_buckets_s: tuple = DEFAULT_LATENCY_BUCKETS_S):
+        """
+        Creates the exporter with every counter at zero. Install it on a `CyclerInterface`
+        or `ChannelInterface` as a request hook, e.g. `request_hooks=[exporter]`.
+
+        Parameters
+        ----------
+        latency_buckets_s : *optional* : tuple
+            The upper bounds of the request latency histogram buckets in seconds. Defaults
+            to `DEFAULT_LATENCY_BUCKETS_S`.
+        """
+        self.__latency_buckets_s = tuple(latency_buckets_s)
+        self.__lock = threading.Lock()
+        self.__requests = {}
+        self.__errors = {}
+        self.__latencies = {}
+        self.__bytes_sent = 0
+        self.__bytes_received = 0
+        self.__reconnects = 0
+        self.__logins = {}
+        self.__connected = None
+        self.__channels = {}
+        self.__http_server = None
+
+    def __call__(self, event):
+        """
+        Records a request. Called by the interface the exporter is installed on.
+
+        Parameters
+        ----------
+        event : RequestEvent
+            The completed request.
+        """
+        command_name = COMMAND_NAMES.get(event.command_code, 'Unknown')
+        with self.__lock:
+            self.__requests[command_name] = self.__requests.get(
+                command_name, 0) + 1
+            if event.outcome != OUTCOME_OK:
+                error_key = (command_name, event.outcome)
+                self.__errors[error_key] = self.__errors.get(error_key, 0) + 1
+
+            latencies = self.__latencies.get(command_name)
+            if latencies is None:
+                latencies = self.__latencies[command_name] = LatencyHistogram(
+                    self.__latency_buckets_s)
+            latencies.record(event.total_time_s)
+
+            self.__bytes_sent += event.bytes_sent
+            self.__bytes_received += event.bytes_received
+            if event.reconnected:
+                self.__reconnects += 1
+            if event.outcome == OUTCOME_OK:
+                self.__connected = True
+            else:
+                # A failed request is still connected only if the interface reconnected.
+                self.__connected = event.reconnected
+
+            if command_name == 'Login':
+                if event.result is None:
+                    login_result = 'error'
+                elif event.result['result'] in ('success', 'already logged in'):
+                    login_result = 'success'
+                else:
+                    login_result = 'fail'
+                self.__logins[login_result] = self.__logins.get(
+                    login_result, 0) + 1
+            elif command_name == 'ChannelInfo' and event.result:
+                self.__channels[event.channels[0]] = (
+                    event.result['voltage_v'], event.result['current_a'], event.result['status'])
+
+    def to_text(self) -> str:
+        """
+        Returns the metrics as plain text, one `name{labels} value` line per value, in the
+        Prometheus exposition format.
+
+        Returns
+        -------
+        text : str
+            The metrics text.
+        """
+        with self.__lock:
+            lines = ['# TYPE pycti_requests_total counter']
+            lines.extend(f'pycti_requests_total{{command="{command_name}"}} {count}'
+                         for command_name, count in self.__requests.items())
+            lines.append('# TYPE pycti_request_errors_total counter')
+            lines.extend(f'pycti_request_errors_total{{command="{command_name}",outcome="{outcome}"}} {count}'
+                         for (command_name, outcome), count in self.__errors.items())
+            lines.append('# TYPE pycti_reconnects_total counter')
+            lines.append(f'pycti_reconnects_total {self.__reconnects}')
+            lines.append('# TYPE pycti_logins_total counter')
+            lines.extend(f'pycti_logins_total{{result="{login_result}"}} {count}'
+                         for login_result, count in self.__logins.items())
+            lines.append('# TYPE pycti_bytes_sent_total counter')
+            lines.append(f'pycti_bytes_sent_total {self.__bytes_sent}')
+            lines.append('# TYPE pycti_bytes_received_total counter')
+            lines.append(f'pycti_bytes_received_total {self.__bytes_received}')
+
+            if self.__connected is not None:
+                lines.append('# TYPE pycti_connected gauge')
+                lines.append(f'pycti_connected {int(self.__connected)}')
+
+            channels = sorted(self.__channels.items())
+            lines.append('# TYPE pycti_channel_voltage_volts gauge')
+            lines.extend(f'pycti_channel_voltage_volts{{channel="{channel}"}} {voltage_v}'
+                         for channel, (voltage_v, _, _) in channels)
+            lines.append('# TYPE pycti_channel_current_amps gauge')
+            lines.extend(f'pycti_channel_current_amps{{channel="{channel}"}} {current_a}'
+                         for channel, (_, current_a, _) in channels)
+            lines.append('# TYPE pycti_channel_status gauge')
+            lines.extend(f'pycti_channel_status{{channel="{channel}",status="{status}"}} 1'
+                         for channel, (_, _, status) in channels)
+
+            lines.append('# TYPE pycti_request_duration_seconds histogram')
+            for command_name, latencies in self.__latencies.items():
+                cumulative_count = 0
+                for upper_s, bucket_count in zip(self.__latency_buckets_s + (float('inf'),), latencies.counts):
+                    cumulative_count += bucket_count
+                    le = '+Inf' if upper_s == float('inf') else repr(upper_s)
+                    lines.append(
+                        f'pycti_request_duration_seconds_bucket{{command="{command_name}",le="{le}"}} {cumulative_count}')
+                lines.append(
+                    f'pycti_request_duration_seconds_sum{{command="{command_name}"}} {latencies.sum_s}')
+                lines.append(
+                    f'pycti_request_duration_seconds_count{{command="{command_name}"}} {latencies.count}')
+        return '\n'.join(lines) + '\n'
+
+    def start_http_server(self, port: int = 0, ip: str = '127.0.0.1') -> int:
+        """
+        Serves the metrics on `/metrics` from a background thread.
+
+        Parameters
+        ----------
+        port : *optional* : int
+            The port to serve from. Defaults to 0, which picks a free port.
+        ip : *optional* : str
+            The IP address to serve from. Defaults to only serving locally.
+
+        Returns
+        -------
+        port : int
+            The port the metrics are served from.
+        """
+        if self.__http_server is not None:
+            raise RuntimeError('Metrics HTTP server is already running!')
+        self.__http_server = TextHTTPServer(ip, port, {
+            '/metrics': ('text/plain; version=0.0.4; charset=utf-8', self.to_text)})
+        self.__http_server.start()
+        return self.__http_server.get_port()
+
+    def stop_http_server(self):
+        """
+        Stops serving the metrics.
+        """
+        if self.__http_server is not None:
+            self.__http_server.stop()
+            self.__http_server = None
@@ -17,6 +17,12 @@ setuptools.setup(
     url="https://github.com/BattGenie/pycti.git",
     packages=setuptools.find_packages(),
     install_requires=requirements,
+    extras_require={
+        'simulation': ['numpy'],
+    },
+    entry_points={
+        'console_scripts': ['pycti=pyctiarbin.cli:main'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -0,0 +1,85 @@
+import pytest
+from pyctiarbin.alerts import AlertEngine, AlertRule
+
+
+def channel_reading(channel=0, voltage_v=3.7, status='Charge', aux_temperature=None):
+    """
+    Builds the subset of a channel status dictionary used by the test rules.
+    """
+    return {
+        'channel': channel,
+        'voltage_v': voltage_v,
+        'status': status,
+        'aux_temperature': aux_temperature if aux_temperature is not None else [25.0, 25.0, 25.0],
+    }
+
+
+@pytest.mark.alerts
+def test_compile_expression():
+    """
+    Test that rule expressions compile into predicates over channel readings.
+    """
+    predicate = AlertRule.compile_expression('aux_temperature[2] > 45')
+    assert (predicate(channel_reading(aux_temperature=[20, 20, 50])))
+    assert (not predicate(channel_reading()))
+
+    predicate = AlertRule.compile_expression(
+        "status == 'Unsafe' or max(aux_temperature) > 60")
+    assert (predicate(channel_reading(status='Unsafe')))
+    assert (predicate(channel_reading(aux_temperature=[61])))
+    assert (not predicate(channel_reading()))
+
+
+@pytest.mark.alerts
+def test_compile_expression_rejects_unsafe_syntax():
+    """
+    Test that anything beyond comparisons over readings is rejected.
+    """
+    for expression in ["__import__('os').system('true')", 'voltage_v.real > 1', 'lambda: 1', 'voltage_v >']:
+        with pytest.raises(ValueError):
+            AlertRule.compile_expression(expression)
+
+
+@pytest.mark.alerts
+def test_alert_duration_and_deduplication():
+    """
+    Test that an alert only fires once the condition holds long enough, and only once.
+    """
+    alerts = []
+    engine = AlertEngine(rules=[AlertRule('voltage_band', 'not (2.5 <= voltage_v <= 4.2)', for_s=5)],
+                         callbacks=[alerts.append])
+
+    assert (engine.evaluate(channel_reading(voltage_v=4.3), timestamp=0) == [])
+    assert (engine.evaluate(channel_reading(voltage_v=4.3), timestamp=4) == [])
+    fired = engine.evaluate(channel_reading(voltage_v=4.3), timestamp=5)
+    assert (len(fired) == 1 and fired[0]['state'] == 'firing')
+    assert (engine.evaluate(channel_reading(voltage_v=4.4), timestamp=6) == [])
+    assert (engine.get_active_alerts() == [('voltage_band', 0)])
+
+    resolved = engine.evaluate(channel_reading(voltage_v=4.0), timestamp=7)
+    assert (len(resolved) == 1 and resolved[0]['state'] == 'resolved')
+    assert ([alert['state'] for alert in alerts] == ['firing', 'resolved'])
+
+    # Dropping back into the band resets the duration.
+    engine.evaluate(channel_reading(voltage_v=4.3), timestamp=8)
+    engine.evaluate(channel_reading(voltage_v=4.0), timestamp=9)
+    assert (engine.evaluate(channel_reading(voltage_v=4.3), timestamp=12) == [])
+
+
+@pytest.mark.alerts
+def test_alert_hysteresis_and_channels():
+    """
+    Test that a clear expression adds hysteresis and alerts are tracked per channel.
+    """
+    engine = AlertEngine(rules=[AlertRule('hot', 'aux_temperature[0] > 45',
+                                          clear_expression='aux_temperature[0] < 40', channels=[0, 1])])
+
+    assert (len(engine.evaluate(channel_reading(channel=0, aux_temperature=[46]))) == 1)
+    # Between the thresholds the alert keeps firing without repeating.
+    assert (engine.evaluate(channel_reading(channel=0, aux_temperature=[42])) == [])
+    assert (len(engine.evaluate(channel_reading(channel=1, aux_temperature=[46]))) == 1)
+    # Channel 2 is not covered by the rule.
+    assert (engine.evaluate(channel_reading(channel=2, aux_temperature=[46])) == [])
+    # Missing aux readings do not satisfy the rule.
+    assert (engine.evaluate(channel_reading(channel=0, aux_temperature=[])) == [])
+    assert (engine.evaluate(channel_reading(channel=0, aux_temperature=[39]))[0]['state'] == 'resolved')
@@ -1,6 +1,10 @@
 import pytest
+import socket
+import struct
+import time
 from helper_test_utils import Constants, TcpClient
 from pyctiarbin.arbinspoofer import ArbinSpoofer
+from pyctiarbin.arbinspoofer.channel_data import ChannelData
 from pyctiarbin.messages import Msg
 
 """
@@ -81,3 +85,200 @@ def test_update_status():
             < Constants.FLOAT_TOLERANCE)
 
     arbin_spoofer.stop()
+
+
+@pytest.mark.arbinspoofer
+def test_channel_data_per_instance():
+    """
+    Check that channel readings are not shared between spoofers and that frames packed
+    straight from the channel store match the message packer.
+    """
+    channel_data_a = ChannelData(4)
+    channel_data_b = ChannelData(2)
+
+    assert (channel_data_a.update_channel_readings(1, {'voltage_v': 3.3}))
+    assert (channel_data_b.fetch_channel_readings(1)['voltage_v'] == 0)
+    assert (channel_data_a.fetch_channel_readings(1)['voltage_v'] == 3.3)
+
+    # Out of range channels, unknown keys and unpackable values are rejected.
+    assert (channel_data_b.fetch_channel_readings(2) == {})
+    assert (not channel_data_b.update_channel_readings(2, {'voltage_v': 1.0}))
+    assert (not channel_data_a.update_channel_readings(1, {'fake_key': 1.0}))
+    assert (not channel_data_a.update_channel_readings(1, {'current_a': 'abc', 'voltage_v': 1.0}))
+    assert (channel_data_a.fetch_channel_readings(1)['voltage_v'] == 3.3)
+
+    assert (channel_data_a.update_channel_readings(
+        1, {'testname': 'fake_test', 'status': 7, 'test_time_s': 12.5}))
+    readings = channel_data_a.fetch_channel_readings(1)
+    assert (channel_data_a.fetch_channel_frame(1) == Msg.ChannelInfo.Server.pack(readings))
+    assert (channel_data_a.fetch_channel_frame(4) == Msg.ChannelInfo.Server.pack())
+
+
+@pytest.mark.arbinspoofer
+def test_selector_server_mode():
+    """
+    Check that the event driven server answers many concurrent clients, including pipelined
+    and split requests, and stops immediately.
+    """
+    config = {**CONFIG_DICT, 'port': 5680, 'server_mode': 'selector'}
+    arbin_spoofer = ArbinSpoofer(config)
+    arbin_spoofer.start()
+    arbin_spoofer.update_channel_status(CHANNEL, {'voltage_v': 3.9})
+
+    clients = [TcpClient(config) for _ in range(200)]
+    tx_msg = Msg.ChannelInfo.Client.pack({'channel': CHANNEL})
+    rx_msg_expected = Msg.ChannelInfo.Server.pack(
+        {'channel': CHANNEL, 'voltage_v': 3.9})
+    for client in clients:
+        assert (client.send_recv_msg(tx_msg) == rx_msg_expected)
+
+    # Pipelined requests are answered in order and split requests are reassembled.
+    sock = socket.create_connection((config['ip'], config['port']), timeout=1)
+    sock.sendall(Msg.Login.Client.pack() + tx_msg[:10])
+    time.sleep(0.05)
+    sock.sendall(tx_msg[10:])
+    rx_msg_expected = Msg.Login.Server.pack(
+        {'num_channels': config['num_channels']}) + rx_msg_expected
+    rx_msg = b''
+    while len(rx_msg) < len(rx_msg_expected):
+        rx_msg += sock.recv(2**16)
+    assert (rx_msg == rx_msg_expected)
+
+    start_time = time.perf_counter()
+    arbin_spoofer.stop()
+    assert (time.perf_counter() - start_time < 0.1)
+    assert (sock.recv(2**16) == b'')
+    sock.close()
+
+
+@pytest.mark.arbinspoofer
+@pytest.mark.parametrize('server_mode', ['threaded', 'selector'])
+def test_server_malformed_msg(server_mode):
+    """
+    Check that a malformed message from one client only closes that client's connection.
+    """
+    config = {**CONFIG_DICT, 'port': 5683, 'server_mode': server_mode}
+    arbin_spoofer = ArbinSpoofer(config)
+    arbin_spoofer.start()
+
+    client = TcpClient(config)
+    tx_msg = Msg.ChannelInfo.Client.pack({'channel': CHANNEL})
+    rx_msg_expected = Msg.ChannelInfo.Server.pack({'channel': CHANNEL})
+    assert (client.send_recv_msg(tx_msg) == rx_msg_expected)
+
+    # A channel info message with a valid length field but a truncated body. The client
+    # message length does not include the header and length fields.
+    malformed_msg = bytearray(tx_msg[:24])
+    malformed_msg[8:12] = struct.pack('<L', len(malformed_msg) - 12)
+    bad_sock = socket.create_connection(
+        (config['ip'], config['port']), timeout=1)
+    bad_sock.sendall(malformed_msg)
+    assert (bad_sock.recv(2**16) == b'')
+    bad_sock.close()
+
+    assert (client.send_recv_msg(tx_msg) == rx_msg_expected)
+    assert (TcpClient(config).send_recv_msg(tx_msg) == rx_msg_expected)
+    arbin_spoofer.stop()
+
+
+@pytest.mark.arbinspoofer
+@pytest.mark.parametrize('server_mode', ['threaded', 'selector'])
+def test_start_port_in_use(server_mode):
+    """
+    Check that starting a spoofer on a port that is already in use raises.
+    """
+    config = {**CONFIG_DICT, 'port': 5684, 'server_mode': server_mode}
+    arbin_spoofer = ArbinSpoofer(config)
+    arbin_spoofer.start()
+
+    second_spoofer = ArbinSpoofer(config)
+    with pytest.raises(OSError):
+        second_spoofer.start()
+    second_spoofer.stop()
+
+    # The running spoofer is unaffected.
+    client = TcpClient(config)
+    assert (client.send_recv_msg(Msg.ChannelInfo.Client.pack({'channel': CHANNEL})) ==
+            Msg.ChannelInfo.Server.pack({'channel': CHANNEL}))
+    arbin_spoofer.stop()
+
+
+@pytest.mark.arbinspoofer
+def test_invalid_server_mode():
+    """
+    Check that an unknown server mode is rejected.
+    """
+    with pytest.raises(ValueError):
+        ArbinSpoofer({**CONFIG_DICT, 'port': 5681, 'server_mode': 'fake_mode'})
+
+
+@pytest.mark.arbinspoofer
+def test_channel_frame_cache():
+    """
+    Check that cached channel frames are reused until the readings change and that frames
+    patched in place match a full repack.
+    """
+    channel_data = ChannelData(2)
+    frame = channel_data.fetch_channel_frame(1)
+    assert (channel_data.fetch_channel_frame(1) is frame)
+
+    updates = [{'voltage_v': 4.1, 'current_a': -2.5},
+               {'testname': 'a much longer test name than before'},
+               {'testname': 'short', 'status': 3, 'charge_capacity_ah': 1.5e3},
+               {'voltage_v': 0.0}]
+    for updated_readings in updates:
+        assert (channel_data.update_channel_readings(1, updated_readings))
+        frame = channel_data.fetch_channel_frame(1)
+        assert (frame == Msg.ChannelInfo.Server.pack(
+            channel_data.fetch_channel_readings(1)))
+        assert (channel_data.fetch_channel_frame(1) is frame)
+
+    # Other channels are untouched.
+    assert (channel_data.fetch_channel_frame(0) == Msg.ChannelInfo.Server.pack())
+
+
+@pytest.mark.arbinspoofer
+def test_spoofer_aux_readings():
+    """
+    Check that the spoofer sends aux readings for the configured aux counts.
+    """
+    config = {**CONFIG_DICT, 'port': 5682, 'num_channels': 2,
+              'aux_counts': [{'aux_temperature_count': 128}, {'aux_voltage_count': 16}]}
+    arbin_spoofer = ArbinSpoofer(config)
+    arbin_spoofer.start()
+    client = TcpClient(config)
+
+    rx_msg = client.send_recv_msg(Msg.ChannelInfo.Client.pack({'channel': 0}))
+    rx_msg_dict = Msg.ChannelInfo.Server.unpack(rx_msg)
+    assert (rx_msg_dict['aux_temperature'] == [0.0] * 128)
+
+    temperatures = [20.0 + i for i in range(128)]
+    assert (arbin_spoofer.update_channel_status(0, {'aux_temperature': temperatures}))
+    rx_msg = client.send_recv_msg(Msg.ChannelInfo.Client.pack({'channel': 0}))
+    assert (len(rx_msg) == len(Msg.ChannelInfo.Server.pack()) + 128 * 8)
+    assert (Msg.ChannelInfo.Server.unpack(rx_msg)['aux_temperature'] == temperatures)
+
+    rx_msg = client.send_recv_msg(Msg.ChannelInfo.Client.pack({'channel': 1}))
+    rx_msg_dict = Msg.ChannelInfo.Server.unpack(rx_msg)
+    assert (rx_msg_dict['aux_voltage_count'] == 16)
+    assert (len(rx_msg_dict['aux_voltage']) == 16)
+
+    arbin_spoofer.stop()
+
+
+@pytest.mark.arbinspoofer
+def test_negative_aux_counts():
+    """
+    Check that negative aux counts are rejected without changing the channel readings.
+    """
+    channel_data = ChannelData(1)
+    assert (channel_data.update_channel_readings(0, {'aux_voltage_count': 2}))
+    frame = channel_data.fetch_channel_frame(0)
+
+    assert (not channel_data.update_channel_readings(
+        0, {'aux_voltage_count': -1, 'aux_voltage': [1.0]}))
+    assert (channel_data.fetch_channel_frame(0) == frame)
+    assert (channel_data.fetch_channel_readings(0)['aux_voltage'] == [0.0, 0.0])
+
+    with pytest.raises(ValueError):
+        ArbinSpoofer({**CONFIG_DICT, 'aux_counts': {'aux_voltage_count': -1}})
@@ -0,0 +1,118 @@
+import json
+import pytest
+from pyctiarbin.benchmarks import codec, end_to_end, import_time, soak
+
+
+@pytest.mark.benchmarks
+def test_codec_benchmarks(tmp_path):
+    """
+    Test that the codec benchmarks cover every message and write comparable JSON results.
+    """
+    output_path = tmp_path / 'codec.json'
+    codec.main(['--min-time', '0.001', '--repeat',
+               '1', '--output', str(output_path)])
+    results = json.loads(output_path.read_text())
+
+    assert (results['metadata']['benchmark'] == 'codec')
+    assert (len(results['results']) == 2 * len(codec.codec_cases()))
+    for aux_count, msg_bytes in [(0, 1781), (16, 1909), (128, 2805)]:
+        result = results['results'][f'ChannelInfo.Server[aux={aux_count}].unpack']
+        assert (result['msg_bytes'] == msg_bytes)
+        assert (result['ns_per_op'] > 0)
+        assert (result['peak_alloc_bytes'] > 0)
+    assert (results['results']['Login.Server.pack']['msg_bytes'] == 8680)
+
+    comparison = codec.compare_results(results, results)
+    assert (all(item['change'] == 0 for item in comparison.values()))
+
+
+@pytest.mark.benchmarks
+def test_end_to_end_benchmark(tmp_path):
+    """
+    Test that the end to end benchmark drives a local spoofer with the requested mix and
+    reports throughput and latency percentiles.
+    """
+    output_path = tmp_path / 'end_to_end.json'
+    end_to_end.main(['--connections', '2', '--channels', '4', '--duration', '0.3', '--warmup', '0.05',
+                     '--mix', '{"read_channel_status": 1, "set_meta_variable": 1}',
+                     '--output', str(output_path)])
+    results = json.loads(output_path.read_text())
+
+    assert (results['requests'] > 0)
+    assert (results['errors'] == 0)
+    assert (results['requests_per_s'] > 0)
+    assert (results['latency']['p50_s'] <= results['latency']['p99.9_s'] <= results['latency']['max_s'])
+    assert (set(results['requests_by_type'].keys()) ==
+            {'read_channel_status', 'set_meta_variable'})
+    assert (results['spoofer']['requests'] > 0)
+
+    with pytest.raises(ValueError):
+        end_to_end.run_end_to_end_benchmark(request_mix={'stop_test': 1})
+
+
+@pytest.mark.benchmarks
+def test_summarize_latencies():
+    """
+    Test the nearest rank latency percentiles.
+    """
+    summary = end_to_end.summarize_latencies(
+        [i / 1000 for i in range(1000, 0, -1)])
+    assert (summary['count'] == 1000)
+    assert (summary['p50_s'] == 0.5)
+    assert (summary['p99_s'] == 0.99)
+    assert (summary['p99.9_s'] == 0.999)
+    assert (summary['max_s'] == 1.0)
+    assert (end_to_end.summarize_latencies([])['p99_s'] is None)
+
+
+@pytest.mark.benchmarks
+def test_soak_test_report():
+    """
+    Test that a short soak test reports memory growth by call site and is checked against
+    the growth thresholds.
+    """
+    results = soak.run_soak_test(
+        num_requests=200, num_channels=4, warmup_requests=20, sample_interval=50, top_sites=5)
+    assert (results['requests'] == 200 and results['errors'] == 0)
+    assert ([sample['requests'] for sample in results['samples']]
+            == [0, 50, 100, 150, 200, 200])
+    assert (results['traced']['growth_bytes'] ==
+            results['samples'][-1]['traced_bytes'] - results['samples'][0]['traced_bytes'])
+    assert (len(results['top_sites']) <= 5)
+    assert (all(site['bytes_per_request'] == site['size_diff_bytes'] / 200
+                for site in results['top_sites']))
+    assert (len(results['gc']['collections']) == 3)
+
+    assert (soak.check_results(results, max_rss_growth_bytes=2**30,
+            max_traced_growth_bytes=2**30) == [])
+    failures = soak.check_results(
+        {**results, 'traced': {**results['traced'], 'growth_bytes': 2}}, max_traced_growth_bytes=1)
+    assert (len(failures) == 1 and failures[0].startswith('Traced memory grew'))
+    assert ('bytes/req' in soak.format_results(results))
+
+
+@pytest.mark.benchmarks
+def test_import_time():
+    """
+    Test that importing the package, the codec and the interfaces does not import the slow
+    dependencies only needed on first use, and that the codec imports faster than they do.
+    """
+    results = import_time.run_import_benchmarks(repeat=3)
+    assert (set(results['results'].keys()) ==
+            set(import_time.IMPORT_CASES.keys()))
+    for case_name, result in results['results'].items():
+        assert (result['lazy_modules_imported'] == []), case_name
+
+    pydantic_result = import_time.measure_import('import pydantic', repeat=3)
+    assert (pydantic_result['lazy_modules_imported'] == ['pydantic'])
+    assert (results['results']['codec']['import_time_s']
+            < pydantic_result['import_time_s'])
+    assert ('codec' in import_time.format_results(results))
+
+    # The config models are still importable from where they used to be defined.
+    from pyctiarbin.cycler_interface import CyclerInterfaceConfig
+    from pyctiarbin.channel_interface import ChannelInterfaceConfig
+    assert (ChannelInterfaceConfig(
+        channel=1, ip_address='127.0.0.1', port=1).channel == 0)
+    assert (CyclerInterfaceConfig(
+        ip_address='127.0.0.1', port=1).timeout_s == 3.0)
@@ -132,3 +132,39 @@ def test_channel_info_server_msg():
     packed_msg = Msg.ChannelInfo.Server.pack(buildable_msg_dict)
     parsed_msg = Msg.ChannelInfo.Server.unpack(packed_msg)
     assert (parsed_msg == msg_dict)
+
+
+@pytest.mark.messages
+def test_channel_info_server_aux_pack():
+    '''
+    Test packing aux readings into a server channel info message and parsing them back
+    '''
+    msg_dict = aux_dict_builder()
+    msg_dict['aux_voltage_count'] = 2
+    msg_dict['aux_temperature_count'] = 3
+    msg_dict['aux_density_count'] = 1
+    msg_dict['aux_voltage'] = [1.0, 2.0]
+    msg_dict['aux_voltage_dt'] = [0.1, 0.2]
+    msg_dict['aux_temperature'] = [25.0, 26.0, 27.0]
+    msg_dict['aux_temperature_dt'] = [0.3, 0.4, 0.5]
+    # Missing readings are packed as zeros.
+    msg_dict['voltage_v'] = 3.7
+
+    packed_msg = Msg.ChannelInfo.Server.pack(msg_dict)
+    assert (len(packed_msg) == len(Msg.ChannelInfo.Server.pack()) + 6 * 8)
+    msg_length = struct.unpack_from('<L', packed_msg, 8)[0]
+    assert (msg_length == Msg.ChannelInfo.Server.msg_length + 6 * 8)
+    assert (struct.unpack('<H', packed_msg[-2:])[0] == sum(packed_msg[:-2]) & 0xFFFF)
+
+    parsed_msg = Msg.ChannelInfo.Server.unpack(packed_msg)
+    for key in ['aux_voltage', 'aux_voltage_dt', 'aux_temperature', 'aux_temperature_dt']:
+        assert (len(parsed_msg[key]) == len(msg_dict[key]))
+        for parsed_value, value in zip(parsed_msg[key], msg_dict[key]):
+            assert (abs(parsed_value - value) < Constants.FLOAT_TOLERANCE)
+    assert (parsed_msg['aux_density'] == [0.0] and parsed_msg['aux_density_dt'] == [0.0])
+    assert (parsed_msg['aux_pressure'] == [])
+    assert (abs(parsed_msg['voltage_v'] - 3.7) < Constants.FLOAT_TOLERANCE)
+
+    # Repacking the parsed message gives the same binary.
+    parsed_msg['status'] = 0
+    assert (Msg.ChannelInfo.Server.pack(parsed_msg) == packed_msg)
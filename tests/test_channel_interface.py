@@ -6,7 +6,7 @@ from pyctiarbin.messages import Msg
 ARBIN_CHANNEL = 1
 
 SPOOFER_CONFIG_DICT = {"ip": "127.0.0.1",
-                       "port": 8956,
+                       "port": 8958,
                        "num_channels": 16}
 
 CHANNEL_INTERFACE_CONFIG = {
@@ -69,4 +69,58 @@ def test_set_meta_variable():
     Test that assigning schedule  works correctly.
     """
     arbin_interface = ChannelInterface(CHANNEL_INTERFACE_CONFIG)
-    assert(arbin_interface.set_meta_variable(mv_num=1, mv_value=4.20))
\ No newline at end of file
+    assert(arbin_interface.set_meta_variable(mv_num=1, mv_value=4.20))
+
+
+@pytest.mark.channel_interface
+def test_set_meta_variables():
+    """
+    Test that setting several meta variables in one round trip works correctly.
+    """
+    arbin_interface = ChannelInterface(CHANNEL_INTERFACE_CONFIG)
+    results = arbin_interface.set_meta_variables({1: 4.20, 2: 1.0, 16: -3.5, 17: 0.0})
+    assert (results == {1: 'success', 2: 'success', 16: 'success',
+                        17: 'Meta code does not exist'})
+
+@pytest.mark.channel_interface
+def test_start_test_skip_assigned_schedule(monkeypatch):
+    """
+    Test that start_test only assigns the schedule when a different one is assigned.
+    """
+    spoofer_config = {**SPOOFER_CONFIG_DICT, 'port': 8957}
+    arbin_spoofer = ArbinSpoofer(spoofer_config)
+    arbin_spoofer.start()
+    channel = 9
+    arbin_interface = ChannelInterface(
+        {**CHANNEL_INTERFACE_CONFIG, 'port': spoofer_config['port'], 'channel': channel+1})
+
+    assign_calls = []
+    monkeypatch.setattr(arbin_interface, 'assign_schedule',
+                        lambda: assign_calls.append(1) or True)
+
+    # The spoofer reports a different schedule so it must be assigned.
+    assert (arbin_interface.start_test(skip_assigned_schedule=True))
+    assert (len(assign_calls) == 1)
+
+    arbin_spoofer.update_channel_status(
+        channel, {'schedule': CHANNEL_INTERFACE_CONFIG['schedule_name']})
+    assert (arbin_interface.start_test(skip_assigned_schedule=True))
+    assert (len(assign_calls) == 1)
+
+    # A recent cached reading is used instead of reading the status again.
+    assert (arbin_interface.read_channel_status()['schedule'] == CHANNEL_INTERFACE_CONFIG['schedule_name'])
+    arbin_spoofer.update_channel_status(channel, {'schedule': 'other.sdx'})
+    assert (arbin_interface.get_cached_channel_status(max_age_s=60))
+    assert (arbin_interface.start_test(skip_assigned_schedule=True, max_status_age_s=60))
+    assert (len(assign_calls) == 1)
+
+    # Starting the test invalidates the cached reading, so the next check reads a fresh status.
+    assert (arbin_interface.get_cached_channel_status() == {})
+    assert (arbin_interface.start_test(skip_assigned_schedule=True, max_status_age_s=60))
+    assert (len(assign_calls) == 2)
+
+    # The default still always assigns.
+    assert (arbin_interface.start_test())
+    assert (len(assign_calls) == 3)
+
+    arbin_spoofer.stop()
@@ -0,0 +1,95 @@
+import pytest
+import time
+from pyctiarbin import CyclerInterface
+from pyctiarbin.arbinspoofer import ArbinSpoofer
+from pyctiarbin.arbinspoofer.channel_data import ChannelData
+from pyctiarbin.arbinspoofer.channel_state import ChannelStateMachine
+
+SPOOFER_CONFIG_DICT = {"ip": "127.0.0.1",
+                       "port": 8968,
+                       "num_channels": 4,
+                       "stateful": {"schedules": ["Rest+207855.sdx"]}}
+
+CYCLER_INTERFACE_CONFIG = {
+    "ip_address": SPOOFER_CONFIG_DICT['ip'],
+    "port": SPOOFER_CONFIG_DICT['port'],
+    "timeout_s": 3,
+    "msg_buffer_size": 2**12
+}
+
+SCHEDULE_NAME = 'Rest+207855.sdx'
+
+
+@pytest.mark.channel_state
+def test_channel_state_machine():
+    """
+    Test the feedback codes and channel readings as a channel moves through its states.
+    """
+    channel_data = ChannelData(2)
+    state_machine = ChannelStateMachine(
+        channel_data, {'test_duration_s': 0.05})
+
+    assert (state_machine.start_test([0], 'test') == (21, 0))
+    assert (state_machine.assign_schedule(0, '') == 18)
+    assert (state_machine.assign_schedule(2, SCHEDULE_NAME) == 16)
+    assert (state_machine.assign_schedule(0, SCHEDULE_NAME) == 0)
+    assert (state_machine.set_meta_variable(0, 52, 1.0) == 17)
+
+    assert (state_machine.start_test([0], '') == (35, 0))
+    assert (state_machine.start_test([0, 1], 'test') == (21, 1))
+    assert (state_machine.get_channel_state(0)['state'] == 'idle')
+    assert (state_machine.start_test([0], 'test') == (0, 0))
+    assert (channel_data.fetch_channel_readings(0)['status'] == 22)
+    assert (channel_data.fetch_channel_readings(0)['testname'] == 'test')
+
+    assert (state_machine.assign_schedule(0, SCHEDULE_NAME) == 20)
+    assert (state_machine.start_test([0], 'test') == (18, 0))
+    assert (state_machine.set_meta_variable(0, 52, 1.0) == 0)
+    assert (state_machine.set_meta_variable(0, 1, 1.0) == 18)
+    assert (state_machine.get_channel_state(0)['mv_values'] == {1: 1.0})
+
+    time.sleep(0.1)
+    assert (state_machine.get_channel_state(0)['state'] == 'finished')
+    assert (channel_data.fetch_channel_readings(0)['status'] == 15)
+    assert (state_machine.assign_schedule(0, SCHEDULE_NAME) == 0)
+
+    assert (state_machine.start_test([0], 'test') == (0, 0))
+    assert (state_machine.stop_test(0) == 0)
+    assert (state_machine.stop_test(5) == 16)
+    assert (state_machine.get_channel_state(0)['state'] == 'idle')
+    assert (channel_data.fetch_channel_readings(0)['status'] == 0)
+
+
+@pytest.mark.channel_state
+def test_stateful_spoofer():
+    """
+    Test that a stateful spoofer sends the feedback codes MITS Pro would.
+    """
+    arbin_spoofer = ArbinSpoofer(SPOOFER_CONFIG_DICT)
+    arbin_spoofer.start()
+    arbin_interface = CyclerInterface(CYCLER_INTERFACE_CONFIG)
+
+    assert (arbin_interface.start_test_on_channels([1], 'fake_test_name') == {
+            1: 'No schedule assigned to channel'})
+    assert (arbin_interface.assign_schedule_to_channels([1, 2], 'missing.sdx') == {
+            1: 'Schedule name not found', 2: 'Schedule name not found'})
+    assert (arbin_interface.start_test_on_channels([1, 2], 'fake_test_name', SCHEDULE_NAME) == {
+            1: 'success', 2: 'success'})
+    assert (arbin_interface.read_channel_status(1)['status'] == 'Running')
+    assert (arbin_interface.read_channel_status(1)['schedule'] == SCHEDULE_NAME)
+
+    # Assigning every channel sends a result per channel.
+    assert (arbin_interface.assign_schedule_to_channels([1, 2, 3, 4], SCHEDULE_NAME) == {
+            1: 'Channel is running', 2: 'Channel is running', 3: 'success', 4: 'success'})
+    # The response names the channel that failed so the rest are started one at a time.
+    assert (arbin_interface.start_test_on_channels([2, 3], 'fake_test_name') == {
+            2: 'Requested channel is running or unsafe', 3: 'success'})
+
+    assert (arbin_interface.set_meta_variables_on_channels({1: {1: 1.0}, 4: {1: 1.0}}) == {
+            1: {1: 'success'}, 4: {1: 'Channel is not running'}})
+    assert (arbin_spoofer.get_state_machine().get_channel_state(0) == {
+            'schedule': SCHEDULE_NAME, 'state': 'running', 'test_name': 'fake_test_name', 'mv_values': {1: 1.0}})
+
+    assert (arbin_interface.read_channel_status(4)['status'] == 'Idle')
+    del arbin_interface
+    arbin_spoofer.stop()
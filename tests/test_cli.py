@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+import threading
+import time
+import pytest
+from pyctiarbin import cli
+from pyctiarbin.arbinspoofer import ArbinSpoofer
+from pyctiarbin.capture import read_capture
+from pyctiarbin.messages import Msg
+
+SPOOFER_CONFIG_DICT = {"ip": "127.0.0.1",
+                       "port": 8972,
+                       "num_channels": 4}
+
+CONNECTION_ARGS = ['--ip', SPOOFER_CONFIG_DICT['ip'],
+                   '--port', str(SPOOFER_CONFIG_DICT['port']), '--timeout', '0.5']
+
+
+@pytest.fixture
+def arbin_spoofer():
+    arbin_spoofer = ArbinSpoofer(SPOOFER_CONFIG_DICT)
+    arbin_spoofer.start()
+    yield arbin_spoofer
+    arbin_spoofer.stop()
+
+
+@pytest.mark.cli
+def test_parse_channels():
+    """
+    Test that channel selections are parsed into channel lists.
+    """
+    assert (cli.parse_channels('1-3,7') == [1, 2, 3, 7])
+    assert (cli.parse_channels('2') == [2])
+    for channels in ('0', '3-1', 'a'):
+        with pytest.raises(Exception):
+            cli.parse_channels(channels)
+
+
+@pytest.mark.cli
+def test_status(arbin_spoofer, capsys):
+    """
+    Test that status prints a row per channel.
+    """
+    assert (cli.main(['status', *CONNECTION_ARGS]) == 0)
+    lines = capsys.readouterr().out.splitlines()
+    assert (lines[0].split()[0] == 'channel')
+    assert ([int(line.split()[0]) for line in lines[1:]] == [1, 2, 3, 4])
+
+
+@pytest.mark.cli
+def test_watch(arbin_spoofer, capsys):
+    """
+    Test that watch streams readings as JSON lines and CSV.
+    """
+    assert (cli.main(['watch', *CONNECTION_ARGS, '--channels',
+            '1,3', '--interval', '0.01', '--count', '2']) == 0)
+    records = [json.loads(line)
+               for line in capsys.readouterr().out.splitlines()]
+    assert ([record['channel'] for record in records] == [1, 3, 1, 3])
+    assert (set(records[0].keys()) == {
+            'timestamp', 'channel', *cli.DEFAULT_WATCH_FIELDS})
+
+    assert (cli.main(['watch', *CONNECTION_ARGS, '--channels', '2', '--interval', '0.01',
+            '--count', '3', '--format', 'csv', '--fields', 'voltage_v,current_a']) == 0)
+    rows = list(csv.reader(io.StringIO(capsys.readouterr().out)))
+    assert (rows[0] == ['timestamp', 'channel', 'voltage_v', 'current_a'])
+    assert (len(rows) == 4 and all(row[1] == '2' for row in rows[1:]))
+
+
+@pytest.mark.cli
+def test_capture(arbin_spoofer, tmp_path):
+    """
+    Test that capture records the channel info frames exactly as the spoofer served them,
+    checksum included.
+    """
+    capture_path = str(tmp_path / 'capture.bin')
+    assert (cli.main(['capture', *CONNECTION_ARGS, '--channels', '1-2',
+            '--interval', '0.01', '--count', '2', '--output', capture_path]) == 0)
+    frames = [frame for _, frame in read_capture(capture_path)]
+    assert ([Msg.ChannelInfo.Server.unpack(frame)['channel']
+            for frame in frames] == [0, 1, 0, 1])
+    served_frames = [bytes(Msg.ChannelInfo.Server.pack({'channel': channel}))
+                     for channel in (0, 1)]
+    assert (frames == served_frames * 2)
+
+
+@pytest.mark.cli
+def test_spoof_and_bench(capsys):
+    """
+    Test that spoof serves a spoofer for the given duration and bench runs a benchmark.
+    """
+    port = SPOOFER_CONFIG_DICT['port'] + 1
+    spoof_thread = threading.Thread(target=cli.main, args=(
+        ['spoof', '--port', str(port), '--num-channels', '2', '--duration', '1.0'],), daemon=True)
+    spoof_thread.start()
+    time.sleep(0.2)
+    assert (cli.main(['status', '--ip', '127.0.0.1',
+            '--port', str(port), '--timeout', '0.5']) == 0)
+    spoof_thread.join()
+    out = capsys.readouterr().out
+    assert (f'Serving 2 channels on 127.0.0.1:{port}' in out)
+    assert (len(out.splitlines()) == 4)
+
+    assert (cli.main(['bench', 'codec', '--min-time', '0.001',
+            '--repeat', '1', '--filter', 'StopSchedule']) == 0)
+    assert ('StopSchedule.Client.pack' in capsys.readouterr().out)
+
+
+@pytest.mark.cli
+def test_bench_default(capsys):
+    """
+    Test that bench runs the end to end benchmark when only its options are passed.
+    """
+    assert (cli.main(['bench', '--duration', '0.2', '--warmup', '0',
+            '--connections', '1', '--channels', '2']) == 0)
+    lines = capsys.readouterr().out.splitlines()
+    assert (lines[0].split()[0] == 'request')
+    assert (lines[-1].split()[0] == 'total')
@@ -0,0 +1,85 @@
+import pytest
+import time
+from pyctiarbin.control_loop import ControlLoop
+from pyctiarbin.histogram import LatencyHistogram
+
+
+class FakeChannelInterface:
+    """
+    Stands in for a ChannelInterface so loop timing does not depend on the network.
+    """
+
+    def __init__(self, read_delay_s=0.0):
+        self.read_delay_s = read_delay_s
+        self.mv_writes = []
+
+    def read_channel_status(self):
+        time.sleep(self.read_delay_s)
+        return {'channel': 0, 'voltage_v': 3.7, 'current_a': 1.0}
+
+    def set_meta_variables(self, mv_values):
+        self.mv_writes.extend(mv_values.items())
+        return {mv_num: 'success' for mv_num in mv_values}
+
+
+@pytest.mark.control_loop
+def test_latency_histogram():
+    """
+    Test the histogram counts and percentile estimates.
+    """
+    histogram = LatencyHistogram(buckets_s=(0.001, 0.01, 0.1))
+    for value_s in [0.0005] * 50 + [0.005] * 49 + [0.5]:
+        histogram.record(value_s)
+
+    assert (histogram.counts == [50, 49, 0, 1])
+    assert (histogram.min_s == 0.0005 and histogram.max_s == 0.5)
+    assert (histogram.percentile(50) <= 0.001)
+    assert (0.001 <= histogram.percentile(90) <= 0.01)
+    assert (histogram.percentile(100) == 0.5)
+
+
+@pytest.mark.control_loop
+def test_control_loop_fixed_rate():
+    """
+    Test that the loop runs read, controller, write at the requested period.
+    """
+    channel_interface = FakeChannelInterface()
+    control_loop = ControlLoop(
+        channel_interface, lambda status: {1: status['voltage_v'], 2: 0.5}, period_s=0.01)
+
+    start_time = time.perf_counter()
+    control_loop.run(num_iterations=20)
+    elapsed_s = time.perf_counter() - start_time
+
+    stats = control_loop.get_stats()
+    assert (stats['iterations'] == 20)
+    assert (stats['write_failures'] == 0)
+    # 20 iterations start at 0, 10, ... 190 ms
+    assert (0.19 <= elapsed_s < 0.5)
+    assert (stats['read_latency']['count'] == 20)
+    assert (stats['jitter']['count'] == 20)
+    assert (len(channel_interface.mv_writes) == 40)
+    assert (channel_interface.mv_writes[:2] == [(1, 3.7), (2, 0.5)])
+    assert (len(control_loop.get_history()) == 20)
+
+
+@pytest.mark.control_loop
+def test_control_loop_overruns_and_stop():
+    """
+    Test that slow iterations are counted as overruns and stop() ends a background loop.
+    """
+    channel_interface = FakeChannelInterface(read_delay_s=0.025)
+    control_loop = ControlLoop(
+        channel_interface, lambda status: None, period_s=0.01)
+    control_loop.run(num_iterations=3)
+
+    stats = control_loop.get_stats()
+    assert (stats['overruns'] == 3)
+    assert (stats['missed_periods'] >= 6)
+    assert (channel_interface.mv_writes == [])
+
+    control_loop.reset_stats()
+    control_loop.start()
+    time.sleep(0.1)
+    control_loop.stop()
+    assert (control_loop.get_stats()['iterations'] > 0)
@@ -39,4 +39,68 @@ def test_read_channel_status():
 
     channel_status_bin_key = Msg.ChannelInfo.Server.pack({'channel': 1})
     channel_status_key = Msg.ChannelInfo.Server.unpack(channel_status_bin_key)
-    assert(channel_status == channel_status_key)
\ No newline at end of file
+    assert(channel_status == channel_status_key)
+
+@pytest.mark.cycler_interface
+def test_read_channel_frame():
+    """
+    Test that reading a channel frame returns it exactly as served, checksum included, and
+    leaves the connection in step for the next request.
+    """
+    arbin_interface = CyclerInterface(CYCLER_INTERFACE_CONFIG)
+    for channel in (ARBIN_CHANNEL, ARBIN_CHANNEL+1):
+        channel_frame = arbin_interface.read_channel_frame(channel)
+        assert (channel_frame == Msg.ChannelInfo.Server.pack({'channel': channel-1}))
+    assert (arbin_interface.read_channel_status(ARBIN_CHANNEL)['channel'] == ARBIN_CHANNEL-1)
+
+@pytest.mark.cycler_interface
+def test_assign_schedule_to_channels():
+    """
+    Test assigning a schedule to a subset of channels and to every channel.
+    """
+    arbin_interface = CyclerInterface(CYCLER_INTERFACE_CONFIG)
+
+    results = arbin_interface.assign_schedule_to_channels(
+        [1, 3, 5, 99], 'Rest+207855.sdx')
+    assert (results == {1: 'success', 3: 'success', 5: 'success',
+                        99: 'channel does not exist'})
+
+    all_channels = list(range(1, arbin_interface.get_num_channels()+1))
+    results = arbin_interface.assign_schedule_to_channels(
+        all_channels, 'Rest+207855.sdx')
+    assert (results == {channel: 'success' for channel in all_channels})
+
+    # The connection should still be in sync after receiving a response per channel.
+    assert (arbin_interface.read_channel_status(channel=(ARBIN_CHANNEL+1))['channel'] == ARBIN_CHANNEL)
+
+
+@pytest.mark.cycler_interface
+def test_start_test_on_channels():
+    """
+    Test assigning a schedule and starting a test on several channels at once.
+    """
+    arbin_interface = CyclerInterface(CYCLER_INTERFACE_CONFIG)
+
+    results = arbin_interface.start_test_on_channels(
+        [2, 4, 6], 'fake_test_name', 'Rest+207855.sdx')
+    assert (results == {2: 'success', 4: 'success', 6: 'success'})
+
+    results = arbin_interface.start_test_on_channels([7, 0], 'fake_test_name')
+    assert (results == {7: 'success', 0: 'Invalid channel index'})
+
+
+@pytest.mark.cycler_interface
+def test_set_meta_variables_on_channels():
+    """
+    Test setting meta variables on several channels in a single round trip.
+    """
+    arbin_interface = CyclerInterface(CYCLER_INTERFACE_CONFIG)
+
+    results = arbin_interface.set_meta_variables_on_channels(
+        {1: {1: 1.0, 2: 2.0}, 3: {4: 4.0}, 99: {1: 1.0}})
+    assert (results == {1: {1: 'success', 2: 'success'},
+                        3: {4: 'success'},
+                        99: {1: 'Set MV Failure'}})
+
+    # The connection should still be in sync after receiving a response per meta variable.
+    assert (arbin_interface.read_channel_status(channel=(ARBIN_CHANNEL+1))['channel'] == ARBIN_CHANNEL)
@@ -0,0 +1,85 @@
+import pytest
+import statistics
+from helper_test_utils import Constants
+from pyctiarbin.derived_metrics import DerivedMetrics, RollingStats
+
+
+def channel_reading(channel, test_time_s, voltage_v, current_a, step_time_s=None, step='[1] 1: Step_A, Charge'):
+    """
+    Builds the subset of a channel status dictionary that DerivedMetrics uses.
+    """
+    return {
+        'channel': channel,
+        'test_time_s': test_time_s,
+        'step_time_s': test_time_s if step_time_s is None else step_time_s,
+        'voltage_v': voltage_v,
+        'current_a': current_a,
+        'step_and_cycle_format': step,
+    }
+
+
+@pytest.mark.derived_metrics
+def test_rolling_stats_matches_full_recompute():
+    """
+    Test that the rolling mean and variance match recomputing over the window.
+    """
+    window_size = 5
+    values = [3.0, 3.2, 3.1, 3.6, 3.4, 3.9, 3.3, 3.8, 4.0, 3.7]
+    rolling_stats = RollingStats(window_size)
+
+    for i, value in enumerate(values):
+        rolling_stats.add(value)
+        window = values[max(0, i - window_size + 1):i + 1]
+        assert (abs(rolling_stats.mean - statistics.fmean(window))
+                < Constants.FLOAT_TOLERANCE)
+        assert (abs(rolling_stats.variance - statistics.pvariance(window))
+                < Constants.FLOAT_TOLERANCE)
+
+
+@pytest.mark.derived_metrics
+def test_dvdt_and_coulomb_count():
+    """
+    Test the rolling dV/dt and the trapezoidal coulomb count.
+    """
+    derived_metrics = DerivedMetrics(window_size=3)
+
+    # Constant 2 A charge with voltage rising at 0.01 V/s for an hour.
+    for test_time_s in range(0, 3601, 60):
+        metrics = derived_metrics.update(channel_reading(
+            0, float(test_time_s), 3.0 + 0.01 * test_time_s, 2.0))
+
+    assert (abs(metrics['dvdt_vbys'] - 0.01) < Constants.FLOAT_TOLERANCE)
+    assert (abs(metrics['coulomb_count_ah'] - 2.0)
+            < Constants.FLOAT_TOLERANCE)
+    assert (metrics == derived_metrics.get_metrics(0))
+
+
+@pytest.mark.derived_metrics
+def test_step_extrema_and_test_reset():
+    """
+    Test that step extrema reset on a new step and all state resets on a new test.
+    """
+    derived_metrics = DerivedMetrics()
+
+    derived_metrics.update(channel_reading(1, 1.0, 3.0, 1.0))
+    metrics = derived_metrics.update(channel_reading(1, 2.0, 3.5, 0.5))
+    assert (metrics['step_voltage_min_v'] == 3.0)
+    assert (metrics['step_voltage_max_v'] == 3.5)
+
+    # Step time going backwards starts a new step.
+    metrics = derived_metrics.update(channel_reading(
+        1, 3.0, 3.4, -1.0, step_time_s=0.5, step='[1] 2: Step_B, Discharge'))
+    assert (metrics['step_voltage_min_v'] == 3.4)
+    assert (metrics['step_voltage_max_v'] == 3.4)
+    assert (metrics['step_current_min_a'] == -1.0)
+    assert (metrics['coulomb_count_ah'] != 0.0)
+
+    # Test time going backwards starts a new test.
+    metrics = derived_metrics.update(channel_reading(1, 0.0, 3.1, 0.0))
+    assert (metrics['coulomb_count_ah'] == 0.0)
+    assert (metrics['voltage_mean_v'] == 3.1)
+
+    # Other channels are tracked independently.
+    assert (derived_metrics.get_metrics(2) == {})
+    derived_metrics.reset(1)
+    assert (derived_metrics.get_metrics(1) == {})
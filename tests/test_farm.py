@@ -0,0 +1,71 @@
+import json
+import socket
+import pytest
+from pyctiarbin import CyclerInterface
+from pyctiarbin.arbinspoofer.farm import SpooferFarm, generate_spoofer_configs
+
+BASE_PORT = 8964
+NUM_SPOOFERS = 4
+
+
+@pytest.mark.farm
+def test_spoofer_farm(tmp_path):
+    """
+    Test that a farm serves every spoofer with its own serial number and shuts down cleanly.
+    """
+    spoofer_configs = generate_spoofer_configs(
+        NUM_SPOOFERS, BASE_PORT, num_channels=4)
+    spoofer_configs[-1]['num_channels'] = 8
+    farm = SpooferFarm(spoofer_configs, num_processes=2)
+
+    manifest = farm.start()
+    assert ([endpoint['port'] for endpoint in manifest] ==
+            list(range(BASE_PORT, BASE_PORT + NUM_SPOOFERS)))
+    assert (len(set(endpoint['pid'] for endpoint in manifest)) == 2)
+
+    manifest_path = tmp_path / 'manifest.json'
+    farm.write_manifest(manifest_path)
+    assert (json.loads(manifest_path.read_text()) == manifest)
+
+    for endpoint in manifest:
+        cycler_interface = CyclerInterface(
+            {'ip_address': endpoint['ip_address'], 'port': endpoint['port']})
+        assert (cycler_interface.get_login_feedback()
+                ['cycler_sn'] == endpoint['cycler_sn'])
+        assert (cycler_interface.get_num_channels()
+                == endpoint['num_channels'])
+        assert (cycler_interface.read_channel_status(1)['channel'] == 0)
+        del cycler_interface
+
+    summary = farm.stop()
+    assert (summary['num_processes'] == 2)
+    assert (summary['num_spoofers'] == NUM_SPOOFERS)
+    assert (summary['terminated'] == 0)
+    assert (all(code == 0 for code in summary['exit_codes'].values()))
+    assert (farm.get_manifest() == [])
+
+
+@pytest.mark.farm
+def test_spoofer_farm_start_failure():
+    """
+    Test that a farm stops every process and raises if a spoofer cannot start.
+    """
+    with pytest.raises(ValueError):
+        SpooferFarm(generate_spoofer_configs(
+            1, BASE_PORT) + generate_spoofer_configs(1, BASE_PORT))
+
+    farm = SpooferFarm(generate_spoofer_configs(
+        2, BASE_PORT, server_mode='unknown'), num_processes=2)
+    with pytest.raises(RuntimeError):
+        farm.start()
+    assert (farm.get_manifest() == [])
+
+    # A port already in use by another listener.
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('127.0.0.1', BASE_PORT))
+        sock.listen()
+        farm = SpooferFarm(generate_spoofer_configs(1, BASE_PORT), num_processes=1)
+        with pytest.raises(RuntimeError):
+            farm.start()
+        assert (farm.get_manifest() == [])
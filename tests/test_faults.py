@@ -0,0 +1,140 @@
+import pytest
+import socket
+import struct
+import time
+from pyctiarbin import ChannelInterface
+from pyctiarbin.messages import Msg
+from pyctiarbin.arbinspoofer import ArbinSpoofer
+from pyctiarbin.arbinspoofer.faults import FaultInjector
+
+SPOOFER_CONFIG_DICT = {"ip": "127.0.0.1",
+                       "port": 8963,
+                       "num_channels": 8}
+
+CHANNEL_INTERFACE_CONFIG = {
+    "channel": 3,
+    "test_name": "fake_test_name",
+    "schedule_name": "Rest+207855.sdx",
+    "ip_address": SPOOFER_CONFIG_DICT['ip'],
+    "port": SPOOFER_CONFIG_DICT['port'],
+    "timeout_s": 0.3,
+    "msg_buffer_size": 4096
+}
+
+
+def start_spoofer(faults: dict) -> ArbinSpoofer:
+    arbin_spoofer = ArbinSpoofer({**SPOOFER_CONFIG_DICT, 'faults': faults})
+    arbin_spoofer.start()
+    return arbin_spoofer
+
+
+@pytest.mark.faults
+def test_fault_config_validation():
+    """
+    Test that unknown fault settings, commands and delay distributions are rejected.
+    """
+    with pytest.raises(ValueError):
+        FaultInjector({'delay': 0.1})
+    with pytest.raises(ValueError):
+        FaultInjector({'commands': {'Logout': {'delay_s': 0.1}}})
+    with pytest.raises(ValueError):
+        ArbinSpoofer({**SPOOFER_CONFIG_DICT, 'server_mode': 'selector',
+                     'faults': {'delay_s': 0.1}})
+
+    # Delay distributions are checked when the injector is created.
+    for delay_s in ({'distribution': 'gaussian', 'mean_s': 0.01},
+                    {'distribution': 'uniform', 'low_s': 0.01},
+                    {'distribution': 'normal', 'mean_s': 0.01, 'stdev_s': 0.001},
+                    {'distribution': 'exponential', 'mean_s': 0},
+                    {'value_s': 'fast'},
+                    'fast'):
+        with pytest.raises(ValueError):
+            FaultInjector({'delay_s': delay_s})
+        with pytest.raises(ValueError):
+            FaultInjector({'commands': {'ChannelInfo': {'delay_s': delay_s}}})
+    FaultInjector({'delay_s': {'distribution': 'uniform', 'low_s': 0.01, 'high_s': 0.02},
+                   'commands': {'Login': {'delay_s': {'value_s': 0.01}}}})
+
+
+@pytest.mark.faults
+def test_response_delay():
+    """
+    Test that responses are delayed for the configured command only.
+    """
+    arbin_spoofer = start_spoofer(
+        {'commands': {'ChannelInfo': {'delay_s': {'distribution': 'uniform', 'low_s': 0.05, 'high_s': 0.1}}}})
+    channel_interface = ChannelInterface(CHANNEL_INTERFACE_CONFIG)
+
+    start_time = time.perf_counter()
+    assert (channel_interface.read_channel_status()['channel'] == 2)
+    assert (time.perf_counter() - start_time >= 0.05)
+    assert (channel_interface.set_meta_variable(1, 1.0))
+    assert (arbin_spoofer.get_fault_injector().get_stats()['delayed'] == 1)
+
+    arbin_spoofer.stop()
+
+
+@pytest.mark.faults
+def test_split_and_coalesced_writes():
+    """
+    Test that the client reassembles responses split into small writes and separates
+    pipelined responses coalesced into a single write.
+    """
+    arbin_spoofer = start_spoofer(
+        {'split_write_bytes': 7, 'coalesce_responses': True})
+    channel_interface = ChannelInterface(CHANNEL_INTERFACE_CONFIG)
+
+    assert (channel_interface.read_channel_status()['channel'] == 2)
+    assert (channel_interface.set_meta_variables({1: 1.0, 2: 2.0, 3: 3.0}) == {
+            1: 'success', 2: 'success', 3: 'success'})
+    stats = arbin_spoofer.get_fault_injector().get_stats()
+    assert (stats['split_writes'] > 0)
+    assert (stats['coalesced'] == 3)
+
+    arbin_spoofer.stop()
+
+
+@pytest.mark.faults
+def test_dropped_responses_and_disconnects():
+    """
+    Test that the client times out on dropped responses, reconnects after mid-frame
+    disconnects, and recovers from both.
+    """
+    for fault in ['drop_probability', 'disconnect_probability']:
+        arbin_spoofer = start_spoofer(
+            {'seed': 1, 'commands': {'ChannelInfo': {fault: 0.5}}})
+        channel_interface = ChannelInterface(CHANNEL_INTERFACE_CONFIG)
+
+        statuses = [channel_interface.read_channel_status()
+                    for _ in range(10)]
+        assert (any(status == {} for status in statuses))
+        assert (all(status['channel'] == 2 for status in statuses if status))
+
+        stats = arbin_spoofer.get_fault_injector().get_stats()
+        assert (stats['dropped' if fault ==
+                'drop_probability' else 'disconnects'] > 0)
+
+        del channel_interface
+        arbin_spoofer.stop()
+
+
+@pytest.mark.faults
+def test_corrupt_checksum():
+    """
+    Test that responses are sent with a checksum that does not match their contents.
+    """
+    arbin_spoofer = start_spoofer({'corrupt_checksum_probability': 1.0})
+
+    with socket.create_connection((SPOOFER_CONFIG_DICT['ip'], SPOOFER_CONFIG_DICT['port']), timeout=3) as s:
+        s.sendall(Msg.ChannelInfo.Client.pack({'channel': 0}))
+        rx_msg = b''
+        while len(rx_msg) < Msg.ChannelInfo.Server.msg_length + 2:
+            rx_msg += s.recv(4096)
+
+    msg_length = Msg.ChannelInfo.Server.msg_length
+    assert (Msg.ChannelInfo.Server.unpack(rx_msg)['channel'] == 0)
+    assert (struct.unpack('<H', rx_msg[msg_length:msg_length + 2])[0]
+            != sum(rx_msg[:msg_length]) & 0xFFFF)
+    assert (arbin_spoofer.get_fault_injector().get_stats()['corrupted'] == 1)
+
+    arbin_spoofer.stop()
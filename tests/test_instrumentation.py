@@ -0,0 +1,96 @@
+import pytest
+from pyctiarbin import CyclerInterface, ChannelInterface
+from pyctiarbin.arbinspoofer import ArbinSpoofer
+from pyctiarbin.messages import Msg
+
+SPOOFER_CONFIG_DICT = {"ip": "127.0.0.1",
+                       "port": 8970,
+                       "num_channels": 4}
+
+CYCLER_INTERFACE_CONFIG = {
+    "ip_address": SPOOFER_CONFIG_DICT['ip'],
+    "port": SPOOFER_CONFIG_DICT['port'],
+    "timeout_s": 0.2,
+    "msg_buffer_size": 2**12
+}
+
+
+@pytest.mark.instrumentation
+def test_request_hooks():
+    """
+    Test that request hooks receive an event describing every exchange.
+    """
+    arbin_spoofer = ArbinSpoofer(SPOOFER_CONFIG_DICT)
+    arbin_spoofer.start()
+
+    events = []
+    arbin_interface = CyclerInterface(
+        CYCLER_INTERFACE_CONFIG, request_hooks=[events.append])
+    assert (events[0].command_code == Msg.Login.Client.command_code)
+    assert (events[0].result['num_channels'] == 4)
+
+    status = arbin_interface.read_channel_status(2)
+    event = events[-1]
+    assert (event.command_code == Msg.ChannelInfo.Client.command_code)
+    assert (event.channels == [2])
+    assert (event.outcome == 'ok')
+    assert (not event.reconnected)
+    assert (event.bytes_sent == len(
+        Msg.ChannelInfo.Client.pack({'channel': 1})))
+    assert (event.bytes_received > 0)
+    assert (event.pack_time_s > 0 and event.network_time_s > 0 and event.unpack_time_s > 0)
+    assert (event.result is status)
+    assert (event.to_dict()['total_time_s'] == pytest.approx(event.total_time_s))
+
+    # Pipelined requests are reported as a single exchange.
+    arbin_interface.set_meta_variables_on_channels({1: {1: 1.0}, 3: {2: 2.0}})
+    assert (events[-1].command_code == Msg.SetMetaVariable.Client.command_code)
+    assert (events[-1].channels == [1, 3])
+    assert (events[-1].num_msgs == 2)
+
+    # A failing hook does not affect the request or the other hooks.
+    def failing_hook(event):
+        raise RuntimeError('hook failure')
+    arbin_interface.add_request_hook(failing_hook)
+    num_events = len(events)
+    assert (arbin_interface.read_channel_status(1))
+    assert (len(events) == num_events + 1)
+
+    arbin_interface.remove_request_hook(events.append)
+    arbin_interface.remove_request_hook(failing_hook)
+    assert (arbin_interface.read_channel_status(1))
+    assert (len(events) == num_events + 1)
+
+    del arbin_interface
+    arbin_spoofer.stop()
+
+
+@pytest.mark.instrumentation
+def test_request_hook_outcomes():
+    """
+    Test that timeouts and reconnects are reported, including from ChannelInterface.
+    """
+    arbin_spoofer = ArbinSpoofer({**SPOOFER_CONFIG_DICT, 'faults': {
+                                 'commands': {'StopSchedule': {'drop_probability': 1.0}}}})
+    arbin_spoofer.start()
+
+    events = []
+    channel_interface = ChannelInterface(
+        {**CYCLER_INTERFACE_CONFIG, 'channel': 2, 'schedule_name': 'schedule.sdx', 'test_name': 'test'})
+    channel_interface.add_request_hook(events.append)
+
+    assert (channel_interface.start_test())
+    assert ([event.command_code for event in events] == [
+            Msg.AssignSchedule.Client.command_code, Msg.StartSchedule.Client.command_code])
+    assert (all(event.channels == [2] and event.outcome ==
+            'ok' for event in events))
+
+    assert (not channel_interface.stop_test())
+    assert (events[-1].command_code == Msg.StopSchedule.Client.command_code)
+    assert (events[-1].outcome == 'timeout')
+    assert (events[-1].reconnected)
+    assert (events[-1].bytes_received == 0)
+    assert (events[-1].result is None)
+
+    del channel_interface
+    arbin_spoofer.stop()
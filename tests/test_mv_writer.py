@@ -0,0 +1,68 @@
+import pytest
+import threading
+from pyctiarbin.mv_writer import MetaVariableWriter
+
+
+class SlowChannelInterface:
+    """
+    Stands in for a ChannelInterface whose writes block until released.
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.write_started = threading.Event()
+        self.release = threading.Event()
+
+    def set_meta_variables(self, mv_values):
+        self.write_started.set()
+        self.release.wait(5)
+        self.batches.append(dict(mv_values))
+        return {mv_num: ('success' if mv_num <= 16 else 'Meta code does not exist')
+                for mv_num in mv_values}
+
+
+@pytest.mark.mv_writer
+def test_mv_writer_coalesces_and_skips():
+    """
+    Test that queued updates are coalesced to the latest value and unchanged values are skipped.
+    """
+    channel_interface = SlowChannelInterface()
+    mv_writer = MetaVariableWriter(channel_interface)
+    mv_writer.start()
+
+    mv_writer.set_meta_variable(1, 1.0)
+    assert (channel_interface.write_started.wait(5))
+    # These arrive while the first write is in flight so only the latest of each is sent.
+    mv_writer.set_meta_variable(1, 2.0)
+    mv_writer.set_meta_variables({1: 3.0, 2: 5.0})
+    channel_interface.release.set()
+    assert (mv_writer.flush(timeout_s=5))
+
+    assert (channel_interface.batches == [{1: 1.0}, {1: 3.0, 2: 5.0}])
+    assert (mv_writer.get_last_acknowledged() == {1: 3.0, 2: 5.0})
+
+    # Unchanged values are not written, failed ones are not acknowledged.
+    mv_writer.set_meta_variables({1: 3.0, 2: 6.0, 17: 1.0})
+    mv_writer.stop()
+    assert (channel_interface.batches[-1] == {2: 6.0, 17: 1.0})
+    assert (mv_writer.get_last_acknowledged() == {1: 3.0, 2: 6.0})
+
+    stats = mv_writer.get_stats()
+    assert (stats['submitted'] == 7)
+    assert (stats['coalesced'] == 1)
+    assert (stats['skipped'] == 1)
+    assert (stats['written'] == 4)
+    assert (stats['failed'] == 1)
+    assert (stats['batches'] == 3)
+    assert (stats['pending'] == 0)
+
+
+@pytest.mark.mv_writer
+def test_mv_writer_flush_not_running():
+    """
+    Test that flushing a writer that was never started does not block.
+    """
+    mv_writer = MetaVariableWriter(SlowChannelInterface())
+    mv_writer.set_meta_variable(1, 1.0)
+    assert (not mv_writer.flush(timeout_s=0.1))
+    assert (mv_writer.get_stats()['pending'] == 1)
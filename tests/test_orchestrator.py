@@ -0,0 +1,197 @@
+import time
+import pytest
+from pyctiarbin import CyclerInterface
+from pyctiarbin.orchestrator import FleetOrchestrator
+from pyctiarbin.arbinspoofer import ArbinSpoofer
+
+SPOOFER_PORTS = [8959, 8960]
+BATCH_SPOOFER_PORT = 8965
+NUM_CHANNELS = 8
+
+ORCHESTRATOR_CONFIG = {
+    'max_concurrency_per_cycler': 3,
+    'max_retries': 2,
+    'retry_delay_s': 0.01,
+}
+
+
+@pytest.fixture(scope='module')
+def arbin_spoofers():
+    spoofers = [ArbinSpoofer({'ip': '127.0.0.1', 'port': port, 'num_channels': NUM_CHANNELS})
+                for port in SPOOFER_PORTS]
+    for spoofer in spoofers:
+        spoofer.start()
+    yield spoofers
+    for spoofer in spoofers:
+        spoofer.stop()
+
+
+def make_plan():
+    return [{'ip_address': '127.0.0.1',
+             'port': port,
+             'channel': channel,
+             'test_name': f'fleet_test_{port}_{channel}',
+             'schedule_name': 'Rest+207855.sdx',
+             'mv_presets': {1: 4.2, 2: 0.5}}
+            for port in SPOOFER_PORTS for channel in range(1, NUM_CHANNELS + 1)]
+
+
+@pytest.mark.orchestrator
+def test_fleet_launch(arbin_spoofers):
+    """
+    Test launching a plan across several cyclers.
+    """
+    report = FleetOrchestrator(ORCHESTRATOR_CONFIG).launch(make_plan())
+
+    assert (report['total'] == len(SPOOFER_PORTS) * NUM_CHANNELS)
+    assert (report['succeeded'] == report['total'])
+    assert (report['failed'] == 0)
+    assert (report['num_cyclers'] == len(SPOOFER_PORTS))
+    assert ([(result['port'], result['channel']) for result in report['results']] ==
+            [(entry['port'], entry['channel']) for entry in make_plan()])
+    assert (report['results'][0]['mv_results'] == {1: 'success', 2: 'success'})
+
+
+@pytest.mark.orchestrator
+def test_fleet_launch_retries(arbin_spoofers, monkeypatch):
+    """
+    Test that transient results are retried and other failures are reported.
+    """
+    assign_schedule_to_channels = CyclerInterface.assign_schedule_to_channels
+    assign_calls = []
+
+    def flaky_assign(self, channels, schedule_name):
+        assign_calls.append(list(channels))
+        results = assign_schedule_to_channels(self, channels, schedule_name)
+        if 1 in channels and len(assign_calls) == 1:
+            results[1] = 'Channel is downloading another schedule currently'
+        if 2 in channels:
+            results[2] = 'Channel is downloading another schedule currently'
+        if 3 in channels:
+            results[3] = 'Schedule name not found'
+        return results
+
+    monkeypatch.setattr(CyclerInterface, 'assign_schedule_to_channels', flaky_assign)
+
+    plan = [entry for entry in make_plan() if entry['port'] == SPOOFER_PORTS[0]]
+    report = FleetOrchestrator(ORCHESTRATOR_CONFIG).launch(plan)
+
+    assert (report['succeeded'] == NUM_CHANNELS - 2)
+    assert (report['failures'] == {
+        'assign: Channel is downloading another schedule currently': 1,
+        'assign: Schedule name not found': 1})
+    assert (assign_calls == [list(range(1, NUM_CHANNELS + 1)), [1, 2], [2]])
+    assert (report['retries'] == 3)
+
+
+@pytest.mark.orchestrator
+def test_fleet_launch_batches(monkeypatch):
+    """
+    Test that channels sharing a schedule and test are launched with one request each, and
+    that every connection is closed once the launch is done.
+    """
+    arbin_spoofer = ArbinSpoofer({'ip': '127.0.0.1', 'port': BATCH_SPOOFER_PORT,
+                                  'num_channels': NUM_CHANNELS, 'metrics': True})
+    arbin_spoofer.start()
+
+    requests = []
+
+    def recorded(method_name):
+        method = getattr(CyclerInterface, method_name)
+
+        def record_request(self, *args):
+            requests.append(method_name)
+            return method(self, *args)
+        return record_request
+
+    for method_name in ('assign_schedule_to_channels', 'start_test_on_channels',
+                        'set_meta_variables_on_channels'):
+        monkeypatch.setattr(CyclerInterface, method_name, recorded(method_name))
+
+    plan = [{'ip_address': '127.0.0.1', 'port': BATCH_SPOOFER_PORT, 'channel': channel,
+             'test_name': 'fleet_test' if channel % 2 else 'other_fleet_test',
+             'schedule_name': 'Rest+207855.sdx', 'mv_presets': {1: 4.2}}
+            for channel in range(1, NUM_CHANNELS + 1)]
+    try:
+        report = FleetOrchestrator(ORCHESTRATOR_CONFIG).launch(plan)
+        # The spoofer sees the connections close shortly after the workers close them.
+        deadline = time.monotonic() + 2.0
+        while arbin_spoofer.get_metrics()['active_connections'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        active_connections = arbin_spoofer.get_metrics()['active_connections']
+    finally:
+        arbin_spoofer.stop()
+
+    assert (report['succeeded'] == NUM_CHANNELS)
+    assert (sorted(requests) == ['assign_schedule_to_channels'] +
+            ['set_meta_variables_on_channels'] * 2 + ['start_test_on_channels'] * 2)
+    assert (active_connections == 0)
+
+
+@pytest.mark.orchestrator
+def test_fleet_launch_lost_start_response(monkeypatch):
+    """
+    Test that a start whose response was lost is not retried on channels already running
+    the test.
+    """
+    arbin_spoofer = ArbinSpoofer({'ip': '127.0.0.1', 'port': BATCH_SPOOFER_PORT,
+                                  'num_channels': NUM_CHANNELS, 'stateful': True})
+    arbin_spoofer.start()
+
+    start_test_on_channels = CyclerInterface.start_test_on_channels
+    start_calls = []
+
+    def lossy_start(self, channels, test_name, schedule_name=None):
+        start_calls.append(list(channels))
+        results = start_test_on_channels(self, channels, test_name, schedule_name)
+        # The test starts on every channel but the response for channel 1 is lost.
+        return {**results, 1: None}
+
+    monkeypatch.setattr(CyclerInterface, 'start_test_on_channels', lossy_start)
+
+    plan = [{'ip_address': '127.0.0.1', 'port': BATCH_SPOOFER_PORT, 'channel': channel,
+             'test_name': 'fleet_test', 'schedule_name': 'Rest+207855.sdx'}
+            for channel in (1, 2)]
+    try:
+        report = FleetOrchestrator(ORCHESTRATOR_CONFIG).launch(plan)
+    finally:
+        arbin_spoofer.stop()
+
+    assert (report['succeeded'] == 2)
+    assert (report['retries'] == 0)
+    assert (start_calls == [[1, 2]])
+
+
+@pytest.mark.orchestrator
+def test_fleet_launch_connect_failure():
+    """
+    Test that entries on an unreachable cycler are reported as failed.
+    """
+    plan = [{'ip_address': '127.0.0.1', 'port': 8961, 'channel': 1, 'test_name': 'fleet_test'}]
+    report = FleetOrchestrator({**ORCHESTRATOR_CONFIG, 'timeout_s': 0.5}).launch(plan)
+    assert (report['failed'] == 1)
+    assert (report['results'][0]['stage'] == 'connect')
+
+
+@pytest.mark.orchestrator
+def test_fleet_launch_unexpected_error(arbin_spoofers, monkeypatch):
+    """
+    Test that an unexpected exception launching an entry is reported and the other entries
+    on the cycler are still launched.
+    """
+    start_test_on_channels = CyclerInterface.start_test_on_channels
+
+    def failing_start(self, channels, test_name, schedule_name=None):
+        if channels[0] == 2:
+            raise KeyError(99)
+        return start_test_on_channels(self, channels, test_name, schedule_name)
+
+    monkeypatch.setattr(CyclerInterface, 'start_test_on_channels', failing_start)
+
+    plan = [entry for entry in make_plan() if entry['port'] == SPOOFER_PORTS[0]]
+    report = FleetOrchestrator({**ORCHESTRATOR_CONFIG, 'max_concurrency_per_cycler': 1}).launch(plan)
+
+    assert (report['total'] == NUM_CHANNELS)
+    assert (report['succeeded'] == NUM_CHANNELS - 1)
+    assert (report['failures'] == {'error: 99': 1})
+    assert (report['results'][1]['stage'] == 'error')
@@ -0,0 +1,103 @@
+import urllib.request
+import pytest
+from pyctiarbin import CyclerInterface
+from pyctiarbin.arbinspoofer import ArbinSpoofer
+from pyctiarbin.prometheus import PrometheusExporter
+
+SPOOFER_CONFIG_DICT = {"ip": "127.0.0.1",
+                       "port": 8971,
+                       "num_channels": 4}
+
+CYCLER_INTERFACE_CONFIG = {
+    "ip_address": SPOOFER_CONFIG_DICT['ip'],
+    "port": SPOOFER_CONFIG_DICT['port'],
+    "timeout_s": 0.2,
+    "msg_buffer_size": 2**12
+}
+
+
+def parse_metrics(text: str) -> dict:
+    """
+    Parses Prometheus exposition text into a value keyed on `name{labels}`.
+    """
+    metrics = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            metrics[name] = float(value)
+    return metrics
+
+
+@pytest.mark.prometheus
+def test_prometheus_exporter():
+    """
+    Test that the exporter counts requests and serves the metrics over HTTP.
+    """
+    arbin_spoofer = ArbinSpoofer({**SPOOFER_CONFIG_DICT, 'faults': {
+                                 'commands': {'SetMetaVariable': {'drop_probability': 1.0}}}})
+    arbin_spoofer.start()
+
+    exporter = PrometheusExporter()
+    arbin_interface = CyclerInterface(
+        CYCLER_INTERFACE_CONFIG, request_hooks=[exporter])
+    for channel in (1, 1, 3):
+        status = arbin_interface.read_channel_status(channel)
+    arbin_interface.set_meta_variables_on_channels({2: {1: 1.0}})
+
+    port = exporter.start_http_server()
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics') as response:
+            assert (response.headers['Content-Type'].startswith('text/plain'))
+            metrics = parse_metrics(response.read().decode('utf-8'))
+    finally:
+        exporter.stop_http_server()
+
+    assert (metrics['pycti_requests_total{command="Login"}'] == 1)
+    assert (metrics['pycti_logins_total{result="success"}'] == 1)
+    assert (metrics['pycti_requests_total{command="ChannelInfo"}'] == 3)
+    assert (metrics['pycti_requests_total{command="SetMetaVariable"}'] == 1)
+    assert (
+        metrics['pycti_request_errors_total{command="SetMetaVariable",outcome="timeout"}'] == 1)
+    assert (metrics['pycti_reconnects_total'] == 1)
+    assert (metrics['pycti_connected'] == 1)
+    assert (metrics['pycti_bytes_sent_total'] > 0)
+
+    assert (metrics['pycti_channel_voltage_volts{channel="3"}']
+            == pytest.approx(status['voltage_v']))
+    assert (metrics['pycti_channel_current_amps{channel="1"}'] is not None)
+    assert (
+        metrics[f'pycti_channel_status{{channel="3",status="{status["status"]}"}}'] == 1)
+    assert ('pycti_channel_voltage_volts{channel="2"}' not in metrics)
+
+    assert (
+        metrics['pycti_request_duration_seconds_count{command="ChannelInfo"}'] == 3)
+    assert (
+        metrics['pycti_request_duration_seconds_bucket{command="ChannelInfo",le="+Inf"}'] == 3)
+    assert (
+        metrics['pycti_request_duration_seconds_bucket{command="SetMetaVariable",le="0.1"}'] == 0)
+
+    del arbin_interface
+    arbin_spoofer.stop()
+
+
+@pytest.mark.prometheus
+def test_prometheus_exporter_disconnected():
+    """
+    Test that the connected gauge drops to zero once the cycler goes away mid-session.
+    """
+    arbin_spoofer = ArbinSpoofer(SPOOFER_CONFIG_DICT)
+    arbin_spoofer.start()
+
+    exporter = PrometheusExporter()
+    arbin_interface = CyclerInterface(
+        CYCLER_INTERFACE_CONFIG, request_hooks=[exporter])
+    assert (arbin_interface.read_channel_status(1))
+    assert (parse_metrics(exporter.to_text())['pycti_connected'] == 1)
+
+    arbin_spoofer.stop()
+    assert (not arbin_interface.read_channel_status(1))
+    metrics = parse_metrics(exporter.to_text())
+    assert (metrics['pycti_connected'] == 0)
+    assert (metrics['pycti_reconnects_total'] == 0)
+
+    del arbin_interface
@@ -0,0 +1,97 @@
+import pytest
+import time
+from helper_test_utils import Constants, TcpClient
+from pyctiarbin.arbinspoofer import ArbinSpoofer
+from pyctiarbin.capture import CaptureWriter, read_capture
+from pyctiarbin.messages import Msg
+
+"""
+Various parameters we will use across all the tests.
+"""
+CONFIG_DICT = {"ip": "127.0.0.1",
+               "port": 5690,
+               "num_channels": 16}
+CAPTURE_VOLTAGES = [3.1, 3.2, 3.3]
+
+
+def write_example_capture(capture_path):
+    """
+    Writes a capture with three readings for channels 0 and 1, one second apart.
+    """
+    with CaptureWriter(capture_path) as writer:
+        for i, voltage in enumerate(CAPTURE_VOLTAGES):
+            for channel in [0, 1]:
+                writer.write(Msg.ChannelInfo.Server.pack(
+                    {'channel': channel, 'voltage_v': voltage + channel, 'test_time_s': i}), timestamp=1000.0 + i)
+
+
+def read_voltage(client, channel):
+    rx_msg = client.send_recv_msg(
+        Msg.ChannelInfo.Client.pack({'channel': channel}))
+    return Msg.ChannelInfo.Server.unpack(rx_msg)['voltage_v']
+
+
+@pytest.mark.arbinspoofer
+def test_capture_round_trip(tmp_path):
+    """
+    Test that frames written to a capture are read back unchanged and in order.
+    """
+    capture_path = str(tmp_path / 'capture.bin')
+    frames = [Msg.ChannelInfo.Server.pack({'channel': i}) for i in range(3)]
+    with CaptureWriter(capture_path) as writer:
+        for i, frame in enumerate(frames):
+            writer.write(frame, timestamp=float(i))
+
+    records = list(read_capture(capture_path))
+    assert ([timestamp for timestamp, _ in records] == [0.0, 1.0, 2.0])
+    assert ([frame for _, frame in records] == frames)
+
+
+@pytest.mark.arbinspoofer
+def test_sequential_replay(tmp_path):
+    """
+    Test that sequential replay serves each channel's frames in order and loops.
+    """
+    capture_path = str(tmp_path / 'capture.bin')
+    write_example_capture(capture_path)
+
+    config = {**CONFIG_DICT, 'port': 5690, 'replay_capture': capture_path}
+    arbin_spoofer = ArbinSpoofer(config)
+    arbin_spoofer.start()
+    client = TcpClient(config)
+
+    for expected_voltage in CAPTURE_VOLTAGES + CAPTURE_VOLTAGES[:1]:
+        assert (abs(read_voltage(client, 0) - expected_voltage)
+                < Constants.FLOAT_TOLERANCE)
+    assert (abs(read_voltage(client, 1) - (CAPTURE_VOLTAGES[0] + 1))
+            < Constants.FLOAT_TOLERANCE)
+
+    # Channels missing from the capture fall back to the static readings.
+    rx_msg = client.send_recv_msg(Msg.ChannelInfo.Client.pack({'channel': 7}))
+    assert (rx_msg == Msg.ChannelInfo.Server.pack({'channel': 7}))
+
+    arbin_spoofer.stop()
+
+
+@pytest.mark.arbinspoofer
+def test_clock_replay(tmp_path):
+    """
+    Test that clock replay serves the latest frame at the accelerated replay clock.
+    """
+    capture_path = str(tmp_path / 'capture.bin')
+    write_example_capture(capture_path)
+
+    config = {**CONFIG_DICT, 'port': 5691, 'replay_capture': capture_path,
+              'replay_mode': 'clock', 'replay_speed': 100, 'replay_loop': False}
+    arbin_spoofer = ArbinSpoofer(config)
+    arbin_spoofer.start()
+    client = TcpClient(config)
+
+    assert (abs(read_voltage(client, 0) - CAPTURE_VOLTAGES[0])
+            < Constants.FLOAT_TOLERANCE)
+    # 0.1 s at 100x is past the end of the two second capture.
+    time.sleep(0.1)
+    assert (abs(read_voltage(client, 0) - CAPTURE_VOLTAGES[-1])
+            < Constants.FLOAT_TOLERANCE)
+
+    arbin_spoofer.stop()
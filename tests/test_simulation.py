@@ -0,0 +1,91 @@
+import pytest
+import time
+from pyctiarbin import ChannelInterface
+from pyctiarbin.arbinspoofer import ArbinSpoofer
+from pyctiarbin.arbinspoofer.channel_data import ChannelData
+
+np = pytest.importorskip('numpy')
+from pyctiarbin.arbinspoofer.simulation import CellSimulation
+
+SPOOFER_CONFIG_DICT = {"ip": "127.0.0.1",
+                       "port": 8962,
+                       "num_channels": 8,
+                       "simulation": {"time_step_s": 1.0, "speed": 200.0}}
+
+CHANNEL_INTERFACE_CONFIG = {
+    "channel": 3,
+    "test_name": "fake_test_name",
+    "schedule_name": "Rest+207855.sdx",
+    "ip_address": SPOOFER_CONFIG_DICT['ip'],
+    "port": SPOOFER_CONFIG_DICT['port'],
+    "timeout_s": 3,
+    "msg_buffer_size": 4096
+}
+
+
+@pytest.mark.simulation
+def test_constant_current_charge():
+    """
+    Test that a constant current charge moves the state of charge and capacities as expected
+    and is cut off at the maximum voltage.
+    """
+    channel_data = ChannelData(2)
+    simulation = CellSimulation(channel_data, {'capacity_ah': [2.0, 1.0], 'initial_soc': 0.2})
+
+    simulation.start_test(0, 'cc_charge')
+    simulation.set_meta_variable(0, 52, 1.0)
+    for _ in range(60):
+        simulation.step(dt_s=60.0)
+
+    readings = channel_data.fetch_channel_readings(0)
+    assert (readings['testname'] == 'cc_charge')
+    assert (readings['status'] == CellSimulation.status_charge)
+    assert (abs(readings['charge_capacity_ah'] - 1.0) < 1e-3)
+    assert (abs(simulation.get_soc()[0] - 0.7) < 1e-6)
+    assert (readings['test_time_s'] == 3600.0)
+    assert (readings['voltage_v'] > channel_data.fetch_channel_readings(1)['voltage_v'])
+    assert (simulation.get_meta_variables(0)[1] == 1.0)
+
+    # Idle channels do not move and ignore meta variables.
+    simulation.set_meta_variable(1, 52, 1.0)
+    assert (simulation.get_soc()[1] == 0.2)
+    assert (channel_data.fetch_channel_readings(1)['status'] == CellSimulation.status_idle)
+
+    # Charging continues until the voltage limit cuts the current off.
+    for _ in range(200):
+        simulation.step(dt_s=60.0)
+    readings = channel_data.fetch_channel_readings(0)
+    assert (readings['current_a'] == 0.0)
+    assert (readings['status'] == CellSimulation.status_rest)
+    assert (readings['voltage_v'] <= 4.2)
+
+    simulation.stop_test(0)
+    assert (channel_data.fetch_channel_readings(0)['status'] == CellSimulation.status_idle)
+
+
+@pytest.mark.simulation
+def test_simulated_spoofer():
+    """
+    Test that a simulated spoofer reacts to start, meta variable and stop messages.
+    """
+    arbin_spoofer = ArbinSpoofer(SPOOFER_CONFIG_DICT)
+    arbin_spoofer.start()
+
+    channel_interface = ChannelInterface(CHANNEL_INTERFACE_CONFIG)
+    assert (channel_interface.start_test())
+    assert (channel_interface.set_meta_variables({1: -2.0}) == {1: 'success'})
+    time.sleep(0.2)
+
+    status = channel_interface.read_channel_status()
+    assert (status['status'] == 'Discharge')
+    assert (status['testname'] == 'fake_test_name')
+    assert (status['schedule'] == 'Rest+207855.sdx')
+    assert (abs(status['current_a'] + 2.0) < 1e-6)
+    assert (status['test_time_s'] > 0)
+    assert (status['discharge_capacity_ah'] > 0)
+    assert (status['discharge_energy_wh'] > 0)
+
+    assert (channel_interface.stop_test())
+    assert (channel_interface.read_channel_status()['status'] == 'Idle')
+
+    arbin_spoofer.stop()
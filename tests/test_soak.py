@@ -0,0 +1,18 @@
+import os
+import pytest
+from pyctiarbin.benchmarks import soak
+
+# Override to soak for longer, e.g. PYCTI_SOAK_REQUESTS=1000000.
+NUM_REQUESTS = int(os.environ.get('PYCTI_SOAK_REQUESTS', 200000))
+
+
+@pytest.mark.soak
+def test_read_channel_status_soak():
+    """
+    Test that polling channel status for a long run does not grow memory. Deselected by
+    default as it takes several minutes, run with `pytest -m soak`.
+    """
+    results = soak.run_soak_test(num_requests=NUM_REQUESTS)
+    print(soak.format_results(results))
+    failures = soak.check_results(results)
+    assert (not failures), '\n'.join(failures)
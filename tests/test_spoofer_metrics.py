@@ -0,0 +1,69 @@
+import json
+import pytest
+import time
+import urllib.request
+from pyctiarbin import CyclerInterface
+from pyctiarbin.arbinspoofer import ArbinSpoofer
+
+SPOOFER_CONFIG_DICT = {"ip": "127.0.0.1",
+                       "port": 8969,
+                       "num_channels": 4,
+                       "metrics": {"http_port": 0}}
+
+
+@pytest.mark.spoofer_metrics
+@pytest.mark.parametrize('server_mode', ['threaded', 'selector'])
+def test_spoofer_metrics(server_mode):
+    """
+    Test that the spoofer counts requests, bytes and connections and serves them over HTTP.
+    """
+    arbin_spoofer = ArbinSpoofer(
+        {**SPOOFER_CONFIG_DICT, 'server_mode': server_mode})
+    arbin_spoofer.start()
+
+    arbin_interface = CyclerInterface(
+        {'ip_address': SPOOFER_CONFIG_DICT['ip'], 'port': SPOOFER_CONFIG_DICT['port']})
+    for channel in range(1, 5):
+        assert (arbin_interface.read_channel_status(channel))
+    assert (arbin_interface.set_meta_variables_on_channels({1: {1: 1.0, 2: 2.0}}))
+
+    metrics = arbin_spoofer.get_metrics()
+    assert (metrics['active_connections'] == 1)
+    assert (metrics['total_connections'] == 1)
+    assert (metrics['requests'] == 7)
+    assert (metrics['requests_per_s'] > 0)
+    channel_info = metrics['commands']['ChannelInfo']
+    assert (channel_info['requests'] == 4)
+    assert (channel_info['service_time']['count'] == 4)
+    assert (channel_info['bytes_out'] == 4 * 1781)
+    assert (metrics['commands']['SetMetaVariable']['requests'] == 2)
+    assert (metrics['bytes_in'] == sum(command['bytes_in']
+            for command in metrics['commands'].values()))
+
+    base_url = f'http://127.0.0.1:{arbin_spoofer.get_metrics_http_port()}'
+    with urllib.request.urlopen(base_url + '/metrics') as response:
+        text = response.read().decode('utf-8')
+    assert ('pycti_spoofer_requests_total{command="ChannelInfo"} 4' in text)
+    assert ('pycti_spoofer_service_time_seconds_count{command="Login"} 1' in text)
+    with urllib.request.urlopen(base_url + '/metrics.json') as response:
+        assert (json.loads(response.read())['requests'] == 7)
+
+    del arbin_interface
+    # Give the spoofer a moment to notice the client disconnected.
+    deadline = time.monotonic() + 2
+    while arbin_spoofer.get_metrics()['active_connections'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert (arbin_spoofer.get_metrics()['active_connections'] == 0)
+
+    arbin_spoofer.stop()
+
+
+@pytest.mark.spoofer_metrics
+def test_spoofer_without_metrics():
+    """
+    Test that metrics are off by default.
+    """
+    arbin_spoofer = ArbinSpoofer(
+        {key: value for key, value in SPOOFER_CONFIG_DICT.items() if key != 'metrics'})
+    assert (arbin_spoofer.get_metrics() == {})
+    assert (arbin_spoofer.get_metrics_http_port() is None)
@@ -42,4 +42,22 @@ def test_start_schedule_server_msg():
     buildable_msg_dict['result'] = '\0'
     packed_msg = Msg.StartSchedule.Server.pack(buildable_msg_dict)
     parsed_msg = Msg.StartSchedule.Server.unpack(packed_msg)
-    assert (parsed_msg == msg_dict)
\ No newline at end of file
+    assert (parsed_msg == msg_dict)
+
+@pytest.mark.messages
+def test_start_schedule_client_msg_multiple_channels():
+    '''
+    Test packing a client start schedule request message for several channels
+    '''
+    channels = [3, 7, 12]
+    packed_msg = Msg.StartSchedule.Client.pack(
+        {'test_name': 'sample_test_name', 'channels': channels})
+
+    # Each additional channel adds a ushort to the message.
+    assert (len(packed_msg) == len(Msg.StartSchedule.Client.pack()) + 2*(len(channels)-1))
+    assert (Msg.StartSchedule.Client.unpack_channels(packed_msg) == channels)
+
+    parsed_msg = Msg.StartSchedule.Client.unpack(packed_msg)
+    assert (parsed_msg['num_channels_to_start'] == len(channels))
+    assert (parsed_msg['channel'] == channels[0])
+    assert (parsed_msg['msg_length'] == Msg.StartSchedule.Client.msg_length + 2*(len(channels)-1))